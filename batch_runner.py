@@ -0,0 +1,170 @@
+"""Batch Runner per Blog Generator
+Elabora molti BlogInput da file JSONL/YAML con un pool di worker limitato
+"""
+
+import json
+import os
+import time
+import yaml
+import logging
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Dict, Iterator, Optional, Tuple
+from checkpoint import new_run_id
+from input_manager import BlogInput
+
+logger = logging.getLogger(__name__)
+
+# Generatore riutilizzato da ciascun processo worker (solo executor "process")
+_process_generator = None
+
+
+def iter_batch_records(batch_file: str) -> Iterator[Tuple[int, Any]]:
+    """Legge i record del batch in streaming, restituendo (indice, record o eccezione di parsing)"""
+    with open(batch_file, 'r', encoding='utf-8') as file:
+        if batch_file.endswith('.yaml') or batch_file.endswith('.yml'):
+            index = 0
+            for document in yaml.safe_load_all(file):
+                records = document if isinstance(document, list) else [document]
+                for record in records:
+                    if record is None:
+                        continue
+                    yield index, record
+                    index += 1
+            return
+
+        index = 0
+        for line in file:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield index, json.loads(line)
+            except json.JSONDecodeError as e:
+                yield index, e
+            index += 1
+
+
+def _init_process_worker(config_path: str, prompts_path: str, config: Dict[str, Any]) -> None:
+    """Crea il generatore del processo worker con la configurazione effettiva (override da CLI compresi)"""
+    global _process_generator
+    from blog_generator import BlogGeneratorEnhanced, setup_logging
+    setup_logging()
+    _process_generator = BlogGeneratorEnhanced(config_path=config_path, prompts_path=prompts_path, config=config)
+
+
+def _run_job_in_process(input_data: Dict[str, Any], output_dir: str, run_id: str) -> Dict[str, Any]:
+    """Esegue un job in un processo worker, riusando il generatore del processo"""
+    return _run_job(_process_generator, BlogInput(**input_data), output_dir, run_id)
+
+
+def _run_job(generator, blog_input: BlogInput, output_dir: str, run_id: str) -> Dict[str, Any]:
+    """Esegue un singolo job e salva i suoi output (parziale se alcune varianti sono fallite)"""
+    result_data = generator.run(blog_input, run_id=run_id)
+    files = generator.save_outputs(result_data, blog_input, output_dir, run_id)
+    job = {
+        'status': 'completed',
+        'files': files,
+        'execution_time': result_data['execution_time']
+    }
+    if result_data.get('failed'):
+        job['status'] = 'partial'
+        job['failed_variants'] = result_data['failed']
+    return job
+
+
+class BatchRunner:
+    """Esegue job di generazione in parallelo e scrive un manifest dei risultati"""
+
+    def __init__(self, generator, workers: Optional[int] = None, executor: Optional[str] = None,
+                 output_dir: str = "."):
+        batch_config = generator.input_manager.get_batch_config()
+        self.generator = generator
+        self.workers = max(1, workers or batch_config.get('workers', 4))
+        self.executor_type = executor or batch_config.get('executor', 'thread')
+        self.max_pending = self.workers * batch_config.get('queue_factor', 2)
+        self.output_dir = output_dir
+
+    def _create_executor(self) -> Executor:
+        """Crea il pool di worker configurato"""
+        if self.executor_type == 'process':
+            input_manager = self.generator.input_manager
+            return ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_process_worker,
+                initargs=(input_manager.config_path, self.generator.prompts_path, input_manager.config)
+            )
+        return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='blog-batch')
+
+    def _submit(self, pool: Executor, blog_input: BlogInput, run_id: str) -> Future:
+        """Invia un job al pool"""
+        if self.executor_type == 'process':
+            return pool.submit(_run_job_in_process, blog_input.to_dict(), self.output_dir, run_id)
+        return pool.submit(_run_job, self.generator, blog_input, self.output_dir, run_id)
+
+    def run(self, batch_file: str) -> Dict[str, Any]:
+        """Elabora tutti i record del file batch e restituisce un riepilogo"""
+        # Timestamp più suffisso casuale: due batch avviati nello stesso secondo non condividono run ID e manifest
+        batch_id = new_run_id()
+        os.makedirs(self.output_dir, exist_ok=True)
+        manifest_path = os.path.join(self.output_dir, f"batch_manifest_{batch_id}.jsonl")
+        summary = {'succeeded': 0, 'partial': 0, 'failed': 0, 'manifest': manifest_path}
+        start_time = time.monotonic()
+
+        logger.info(f"Avvio batch {batch_id} da {batch_file} con {self.workers} worker ({self.executor_type})")
+
+        with open(manifest_path, 'w', encoding='utf-8') as manifest, self._create_executor() as pool:
+            def record(entry: Dict[str, Any]) -> None:
+                summary[{'completed': 'succeeded', 'partial': 'partial'}.get(entry['status'], 'failed')] += 1
+                manifest.write(json.dumps(entry, ensure_ascii=False) + '\n')
+                manifest.flush()
+
+            def collect(done) -> None:
+                for future in done:
+                    entry = pending.pop(future)
+                    try:
+                        entry.update(future.result())
+                        if entry['status'] == 'partial':
+                            logger.warning(f"Job {entry['run_id']} completato in parte ({entry['topic']}): varianti "
+                                           f"fallite {', '.join(entry['failed_variants'])}")
+                        else:
+                            logger.info(f"Job {entry['run_id']} completato: {entry['topic']}")
+                    except Exception as e:
+                        entry['status'] = 'failed'
+                        entry['error'] = str(e)
+                        logger.error(f"Job {entry['run_id']} fallito ({entry['topic']}): {e}")
+                    record(entry)
+
+            pending: Dict[Future, Dict[str, Any]] = {}
+            for index, data in iter_batch_records(batch_file):
+                run_id = f"{batch_id}_{index:04d}"
+                entry = {'run_id': run_id, 'index': index, 'topic': None}
+
+                try:
+                    if isinstance(data, Exception):
+                        raise data
+                    blog_input = BlogInput(**data)
+                    entry['topic'] = blog_input.topic
+                    if not blog_input.validate():
+                        raise ValueError("Input non valido")
+                except Exception as e:
+                    entry['status'] = 'failed'
+                    entry['error'] = f"Record non valido: {e}"
+                    logger.error(f"Record {index} del batch scartato: {e}")
+                    record(entry)
+                    continue
+
+                # Limita i job in coda per non caricare l'intero file in memoria
+                if len(pending) >= self.max_pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+
+                pending[self._submit(pool, blog_input, run_id)] = entry
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+
+        summary['execution_time'] = time.monotonic() - start_time
+        logger.info(f"Batch {batch_id} completato: {summary['succeeded']} riusciti, {summary['partial']} parziali, "
+                    f"{summary['failed']} falliti in {summary['execution_time']:.2f} secondi")
+        return summary
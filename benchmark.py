@@ -0,0 +1,390 @@
+"""Benchmark offline per Blog Generator
+Misura l'overhead della pipeline con LLM e Tavily simulati, senza chiamate API a pagamento
+"""
+
+import argparse
+import copy
+import hashlib
+import json
+import os
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import logging
+from typing import Any, Dict, List
+
+import yaml
+
+logger = logging.getLogger(__name__)
+
+_WORDS = ("costiera amalfitana ristorante mare vista terrazza pesce fresco tradizione cucina "
+          "turisti spiaggia limoni borgo panorama stagione prenotazione qualità ospitalità").split()
+
+# Marcatori per riconoscere lo stage dal prompt ricevuto dal finto LLM (dal più specifico)
+STAGE_MARKERS = [
+    ('stitching', 'FINE SEZIONE PRECEDENTE'),
+    ('drafting', 'SEZIONE DA SCRIVERE'),
+    ('optimization', 'Articolo Markdown finale ottimizzato'),
+    ('drafting', 'Bozza Markdown completa'),
+    ('outline', 'Struttura YAML dettagliata'),
+    ('analysis', 'raccomandazioni strategiche'),
+    ('research', 'Report JSON strutturato'),
+]
+
+
+def _words(seed: str, count: int) -> str:
+    """Genera testo deterministico di `count` parole"""
+    offset = int(hashlib.md5(seed.encode('utf-8')).hexdigest(), 16)
+    return " ".join(_WORDS[(offset + i * 7) % len(_WORDS)] for i in range(count))
+
+
+def _percentile(values: List[float], percentile: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(percentile / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _peak_rss_mb() -> float:
+    """Picco di memoria residente del processo (ru_maxrss è in KB su Linux, byte su macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+class StubTimer:
+    """Tempo speso nei backend simulati, per stage, per separarlo dall'overhead di orchestrazione"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.seconds: Dict[str, float] = {}
+        self.calls: Dict[str, int] = {}
+
+    def sleep(self, stage: str, seconds: float) -> None:
+        time.sleep(seconds)
+        with self._lock:
+            self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+            self.calls[stage] = self.calls.get(stage, 0) + 1
+
+
+class StubTavilyClient:
+    """Sostituto deterministico di TavilyClient con latenza e dimensione configurabili"""
+
+    def __init__(self, timer: StubTimer, latency: float = 0.3, content_words: int = 80):
+        self.timer = timer
+        self.latency = latency
+        self.content_words = content_words
+
+    def search(self, query: str, max_results: int = 5, **kwargs) -> Dict[str, Any]:
+        self.timer.sleep('research', self.latency)
+        digest = hashlib.md5(query.encode('utf-8')).hexdigest()[:8]
+        return {'results': [
+            {
+                'title': f"Risultato {index} per {query}",
+                'url': f"https://esempio.it/{digest}/{index}",
+                'content': _words(f"{query}{index}", self.content_words),
+                'score': round(1 - index / (max_results + 1), 3),
+                'raw_content': None
+            }
+            for index in range(max_results)
+        ]}
+
+
+def _create_stub_llm_class():
+    """Crea la classe del finto LLM come BaseLLM di CrewAI (import differito)"""
+    from crewai.llms.base_llm import BaseLLM
+
+    class StubLLM(BaseLLM):
+        """LLM deterministico locale: risponde con output plausibili per ogni stage"""
+
+        def __init__(self, model: str, timer: StubTimer, latency: float, output_words: int):
+            super().__init__(model=model)
+            self.timer = timer
+            self.latency = latency
+            self.output_words = output_words
+
+        @staticmethod
+        def _prompt_text(messages: Any) -> str:
+            if isinstance(messages, str):
+                return messages
+            return "\n".join(str(m.get('content', '')) if isinstance(m, dict) else str(getattr(m, 'content', m))
+                             for m in messages)
+
+        def _answer(self, prompt: str) -> str:
+            stage = next((name for name, marker in STAGE_MARKERS if marker in prompt), 'unknown')
+            self.timer.sleep(stage, self.latency)
+            words = self.output_words
+            if stage == 'research':
+                return json.dumps({
+                    'facts': [_words(f"fatto{i}", 20) for i in range(max(1, words // 20))],
+                    'sources': [{'url': f"https://fonte.it/{i}", 'title': f"Fonte {i}"} for i in range(5)],
+                    'keywords': {'primary': _WORDS[:5], 'secondary': _WORDS[5:15], 'long_tail': _WORDS[:5]},
+                    'opportunities': [_words('opportunita', 15)],
+                    'market_insights': [_words('mercato', 25)]
+                }, ensure_ascii=False)
+            if stage == 'analysis':
+                return json.dumps({'raccomandazioni': [_words(f"racc{i}", 20) for i in range(max(1, words // 20))]},
+                                  ensure_ascii=False)
+            if stage == 'outline':
+                sections = max(2, words // 60)
+                return yaml.safe_dump({
+                    'h1': 'Titolo di benchmark',
+                    'introduzione': {'parole': 200, 'punti': [_words('intro', 12)]},
+                    'sezioni': [{'h2': f"Sezione {i}", 'punti': [_words(f"sez{i}", 12)], 'parole': 300}
+                                for i in range(sections)],
+                    'conclusione': {'parole': 200, 'cta': _words('cta', 8)}
+                }, allow_unicode=True, sort_keys=False)
+            if stage == 'stitching':
+                return _words('transizione', 25)
+            return f"## {stage.capitalize()}\n\n" + _words(prompt[-64:], words)
+
+        def call(self, messages, tools=None, callbacks=None, available_functions=None, **kwargs) -> str:
+            answer = self._answer(self._prompt_text(messages))
+            return f"Thought: Ho tutte le informazioni necessarie\nFinal Answer: {answer}"
+
+        def stream(self, messages):
+            """Emula lo streaming di ChatOpenAI restituendo l'output a blocchi"""
+            answer = self._answer(self._prompt_text(messages))
+            for start in range(0, len(answer), 64):
+                yield answer[start:start + 64]
+
+        def supports_function_calling(self) -> bool:
+            return False
+
+    return StubLLM
+
+
+def create_benchmark_generator(config_path: str, prompts_path: str, work_dir: str, llm_latency: float,
+                               tavily_latency: float, output_words: int, use_caches: bool = False):
+    """Crea un BlogGeneratorEnhanced che usa backend simulati e scrive solo in work_dir"""
+    from blog_generator import BlogGeneratorEnhanced
+    logging.getLogger().setLevel(logging.WARNING)
+
+    with open(config_path, 'r', encoding='utf-8') as file:
+        config = yaml.safe_load(file)
+    config = copy.deepcopy(config)
+    config.setdefault('search_cache', {}).update({'enabled': use_caches, 'path': os.path.join(work_dir, 'tavily.sqlite')})
+    config.setdefault('stage_cache', {}).update({'enabled': use_caches, 'directory': os.path.join(work_dir, 'stages')})
+    config.setdefault('knowledge_store', {}).update({'enabled': use_caches, 'path': os.path.join(work_dir, 'knowledge.sqlite')})
+    config.setdefault('checkpoint', {})['directory'] = os.path.join(work_dir, 'checkpoints')
+    config.setdefault('streaming', {})['directory'] = os.path.join(work_dir, 'stream')
+    config.setdefault('output', {}).update({'save_intermediate': False, 'generate_analytics': True})
+    config.setdefault('rate_limits', {})['enabled'] = False
+    config.setdefault('archive', {})['path'] = os.path.join(work_dir, 'runs.sqlite')
+    config['metrics'] = {'jsonl_path': os.path.join(work_dir, 'metrics.jsonl'), 'prometheus_path': ''}
+    bench_config_path = os.path.join(work_dir, 'config.yaml')
+    with open(bench_config_path, 'w', encoding='utf-8') as file:
+        yaml.safe_dump(config, file, allow_unicode=True)
+
+    timer = StubTimer()
+    stub_llm_class = _create_stub_llm_class()
+
+    class BenchmarkGenerator(BlogGeneratorEnhanced):
+        def _setup_tavily(self):
+            return StubTavilyClient(timer, tavily_latency)
+
+        def create_llm(self, model_name: str):
+            return stub_llm_class(model_name, timer, llm_latency, output_words)
+
+        def create_chat_model(self, model_name: str):
+            return stub_llm_class(model_name, timer, llm_latency, output_words)
+
+    generator = BenchmarkGenerator(config_path=bench_config_path, prompts_path=prompts_path)
+    generator.stub_timer = timer
+    return generator
+
+
+def _stage_overhead(metrics_path: str, timer: StubTimer, runs: int) -> Dict[str, Dict[str, float]]:
+    """Overhead di orchestrazione medio per stage: tempo misurato meno tempo dei backend simulati"""
+    wall: Dict[str, float] = {}
+    if os.path.exists(metrics_path):
+        with open(metrics_path, 'r', encoding='utf-8') as file:
+            for line in file:
+                for stage, values in json.loads(line)['stages'].items():
+                    wall[stage] = wall.get(stage, 0.0) + values['wall_seconds']
+    report = {}
+    for stage, seconds in wall.items():
+        backend = timer.seconds.get(stage, 0.0) + (timer.seconds.get('stitching', 0.0) if stage == 'drafting' else 0.0)
+        report[stage] = {
+            'wall_seconds_avg': seconds / max(runs, 1),
+            'backend_seconds_avg': backend / max(runs, 1),
+            'overhead_seconds_avg': (seconds - backend) / max(runs, 1)
+        }
+    return report
+
+
+def benchmark_pipeline(args: argparse.Namespace) -> Dict[str, Any]:
+    """Esegue la pipeline (run() e batch) a diversi livelli di concorrenza"""
+    from batch_runner import BatchRunner
+
+    results = []
+    for concurrency in args.concurrency:
+        with tempfile.TemporaryDirectory(prefix='blog-bench-') as work_dir:
+            generator = create_benchmark_generator(
+                args.config, args.prompts, work_dir, args.llm_latency,
+                args.tavily_latency, args.output_words, args.use_caches
+            )
+            topics = [{'topic': f"Benchmark {concurrency}-{index}", 'word_count': args.output_words}
+                      for index in range(args.runs)]
+            start = time.monotonic()
+
+            if concurrency == 1:
+                from input_manager import BlogInput
+                latencies = []
+                for topic in topics:
+                    run_start = time.monotonic()
+                    generator.run(BlogInput(**topic))
+                    latencies.append(time.monotonic() - run_start)
+                failed = 0
+            else:
+                batch_file = os.path.join(work_dir, 'batch.jsonl')
+                with open(batch_file, 'w', encoding='utf-8') as file:
+                    file.writelines(json.dumps(topic) + "\n" for topic in topics)
+                summary = BatchRunner(generator, workers=concurrency, executor='thread',
+                                      output_dir=os.path.join(work_dir, 'output')).run(batch_file)
+                with open(summary['manifest'], 'r', encoding='utf-8') as file:
+                    entries = [json.loads(line) for line in file]
+                latencies = [entry['execution_time'] for entry in entries if entry['status'] == 'completed']
+                failed = summary['failed']
+
+            elapsed = time.monotonic() - start
+            results.append({
+                'concurrency': concurrency,
+                'runs': args.runs,
+                'failed': failed,
+                'elapsed_seconds': elapsed,
+                'throughput_runs_per_minute': 60 * len(latencies) / elapsed if elapsed else 0.0,
+                'latency_p50_seconds': _percentile(latencies, 50),
+                'latency_p95_seconds': _percentile(latencies, 95),
+                'latency_mean_seconds': statistics.mean(latencies) if latencies else 0.0,
+                'peak_rss_mb': _peak_rss_mb(),
+                'stage_overhead': _stage_overhead(os.path.join(work_dir, 'metrics.jsonl'),
+                                                  generator.stub_timer, len(latencies))
+            })
+    return {'benchmark': 'pipeline', 'settings': {
+        'llm_latency': args.llm_latency, 'tavily_latency': args.tavily_latency,
+        'output_words': args.output_words, 'use_caches': args.use_caches
+    }, 'results': results}
+
+
+def print_pipeline_report(report: Dict[str, Any]) -> None:
+    print(f"\n{'conc':>4} {'runs':>5} {'fail':>4} {'run/min':>8} {'p50 s':>8} {'p95 s':>8} {'RSS MB':>8}")
+    for row in report['results']:
+        print(f"{row['concurrency']:>4} {row['runs']:>5} {row['failed']:>4} "
+              f"{row['throughput_runs_per_minute']:>8.1f} {row['latency_p50_seconds']:>8.2f} "
+              f"{row['latency_p95_seconds']:>8.2f} {row['peak_rss_mb']:>8.1f}")
+        for stage, values in row['stage_overhead'].items():
+            print(f"       {stage:<13} wall {values['wall_seconds_avg']:.3f}s  "
+                  f"overhead {values['overhead_seconds_avg'] * 1000:.1f} ms")
+
+
+# Comandi CLI che non generano articoli e devono avviarsi senza caricare i sottosistemi pesanti
+STARTUP_COMMANDS = {
+    'help': ['--help'],
+    'generate-template': ['--generate-template'],
+    'dry-run': ['--topic', 'Benchmark di avvio', '--dry-run']
+}
+HEAVY_MODULES = ['crewai', 'langchain_openai', 'langchain_core', 'tavily', 'litellm', 'httpx', 'tiktoken']
+
+
+def benchmark_startup(args: argparse.Namespace) -> Dict[str, Any]:
+    """Misura il tempo di avvio dei comandi leggeri della CLI in processi separati"""
+    script = os.path.abspath(os.path.join(os.path.dirname(__file__), 'blog_generator.py'))
+    env = dict(os.environ, OPENROUTER_API_KEY='', TAVILY_API_KEY='')
+    results = []
+
+    with tempfile.TemporaryDirectory(prefix='blog-startup-') as work_dir:
+        shutil.copy(args.config, os.path.join(work_dir, 'config.yaml'))
+        shutil.copy(args.prompts, os.path.join(work_dir, 'prompts.yaml'))
+
+        for name, command in STARTUP_COMMANDS.items():
+            timings = []
+            returncode = 0
+            for _ in range(args.repeat):
+                start = time.monotonic()
+                completed = subprocess.run([sys.executable, script, *command], cwd=work_dir, env=env,
+                                           stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+                timings.append(time.monotonic() - start)
+                returncode = returncode or completed.returncode
+            results.append({
+                'command': name,
+                'returncode': returncode,
+                'log_file_created': os.path.exists(os.path.join(work_dir, 'blog_generator.log')),
+                'min_ms': min(timings) * 1000,
+                'median_ms': statistics.median(timings) * 1000
+            })
+
+        probe = (f"import sys; sys.path.insert(0, {os.path.dirname(script)!r}); import blog_generator; "
+                 f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+        loaded = subprocess.run([sys.executable, '-c', probe], cwd=work_dir, env=env,
+                                capture_output=True, text=True)
+
+    return {
+        'benchmark': 'startup',
+        'settings': {'repeat': args.repeat},
+        'results': results,
+        'heavy_modules_on_import': [m for m in loaded.stdout.strip().split(',') if m] if loaded.returncode == 0 else None
+    }
+
+
+def print_startup_report(report: Dict[str, Any]) -> None:
+    print(f"\n{'comando':<18} {'esito':>5} {'min ms':>8} {'mediana ms':>11} {'log':>4}")
+    for row in report['results']:
+        print(f"{row['command']:<18} {row['returncode']:>5} {row['min_ms']:>8.1f} {row['median_ms']:>11.1f} "
+              f"{'sì' if row['log_file_created'] else 'no':>4}")
+    heavy = report['heavy_modules_on_import']
+    if heavy is None:
+        print("\nImport di blog_generator non riuscito")
+    else:
+        print(f"\nModuli pesanti caricati da 'import blog_generator': {', '.join(heavy) or 'nessuno'}")
+
+
+def setup_argument_parser() -> argparse.ArgumentParser:
+    """Configura il parser degli argomenti del benchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark offline del Blog Generator con backend simulati")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    pipeline = subparsers.add_parser('pipeline', help="Throughput, latenze e overhead per stage della pipeline")
+    pipeline.add_argument("--runs", type=int, default=8, help="Esecuzioni per livello di concorrenza")
+    pipeline.add_argument("--concurrency", type=int, nargs='+', default=[1, 4], help="Livelli di concorrenza")
+    pipeline.add_argument("--llm-latency", type=float, default=0.2, help="Latenza simulata per chiamata LLM (s)")
+    pipeline.add_argument("--tavily-latency", type=float, default=0.1, help="Latenza simulata per ricerca (s)")
+    pipeline.add_argument("--output-words", type=int, default=300, help="Parole generate per risposta LLM")
+    pipeline.add_argument("--use-caches", action="store_true", help="Mantiene attive cache ricerche, stage e knowledge store (nella directory di lavoro)")
+    pipeline.add_argument("--config", type=str, default="config.yaml", help="Configurazione di partenza")
+    pipeline.add_argument("--prompts", type=str, default="prompts.yaml", help="File dei prompt")
+    pipeline.add_argument("--json", type=str, help="Salva il report in formato JSON")
+
+    startup = subparsers.add_parser('startup', help="Tempo di avvio di help, template e dry run")
+    startup.add_argument("--repeat", type=int, default=5, help="Ripetizioni per comando")
+    startup.add_argument("--config", type=str, default="config.yaml", help="Configurazione da usare")
+    startup.add_argument("--prompts", type=str, default="prompts.yaml", help="File dei prompt")
+    startup.add_argument("--json", type=str, help="Salva il report in formato JSON")
+
+    return parser
+
+
+def main():
+    """Funzione principale"""
+    args = setup_argument_parser().parse_args()
+
+    if args.command == 'pipeline':
+        report = benchmark_pipeline(args)
+        print_pipeline_report(report)
+    else:
+        report = benchmark_startup(args)
+        print_startup_report(report)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2, ensure_ascii=False)
+        print(f"\nReport salvato in: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,41 +3,199 @@ Sistema completo per la generazione di articoli SEO ottimizzati in italiano
 """
 
 from dotenv import load_dotenv
-from crewai import Agent, Task, Crew
-from langchain_openai import ChatOpenAI
-from crewai.tools import tool
-from typing import Any, Dict, List, Optional
-from tavily import TavilyClient
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
 import os
 import json
 import yaml
 import argparse
 import logging
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
+from dataclasses import dataclass, field
 from datetime import datetime
 from input_manager import InputManager, BlogInput
+from batch_runner import BatchRunner, iter_batch_records
+from search_cache import SearchCache
+from stage_cache import StageCache
+from checkpoint import CheckpointStore, new_run_id
+from section_drafting import parse_outline_sections, boundary_excerpts, assemble_article
+from streaming import StreamSink, consume_stream
+from context_compactor import CONTEXT_SEPARATOR, compact_context, estimate_tokens, parse_json_output
+from seo_analyzer import SEOAnalyzer, format_report_diff
+from knowledge_store import KnowledgeStore
+from run_archive import RunArchive
+from search_shaping import ResultShaper
+from rate_limiter import LIMITERS, is_retryable
+from dag_scheduler import DAGScheduler
+from stage_validators import (REPAIRABLE_STAGES, StageValidationError, parse_stage_output, strip_draft_notes,
+                              validate_stage_output)
+from prompt_compiler import PromptCompiler, cached_token_report
+from metrics import METRICS, RunMetrics, export_jsonl
+
+# CrewAI, LangChain, Tavily e il pool HTTP vengono importati solo dai percorsi che generano articoli
+if TYPE_CHECKING:
+    from crewai import Agent, Task, LLM
+    from langchain_openai import ChatOpenAI
+    from tavily import TavilyClient
+    from llm_pool import LLMClientPool
 
 load_dotenv()
 
-# Setup logging
-logging.basicConfig(
-    level=logging.INFO, 
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('blog_generator.log'),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
+def setup_logging(log_file: Optional[str] = 'blog_generator.log') -> None:
+    """Configura il logging su console e, se indicato, su file"""
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        handlers.insert(0, logging.FileHandler(log_file))
+    logging.basicConfig(
+        level=logging.INFO, 
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=handlers
+    )
+
+# Stage della pipeline in ordine di esecuzione, con gli stage da cui ricevono il contesto
+STAGE_DEPENDENCIES = {
+    'research': [],
+    'analysis': ['research'],
+    'outline': ['research', 'analysis'],
+    'drafting': ['research', 'analysis', 'outline'],
+    'optimization': ['research', 'analysis', 'outline', 'drafting']
+}
+STAGES = list(STAGE_DEPENDENCIES)
+
+# Stage secondari di SEO tecnico: dipendono da ricerca e outline, non dalla bozza,
+# quindi vengono eseguiti in parallelo a stesura e ottimizzazione
+SIDE_STAGE_DEPENDENCIES = {
+    'meta_tags': ['research', 'outline'],
+    'faq': ['research', 'outline'],
+    'internal_links': ['outline'],
+    'schema': ['outline', 'meta_tags', 'faq']
+}
+SIDE_STAGES = list(SIDE_STAGE_DEPENDENCIES)
+ALL_STAGE_DEPENDENCIES = {**STAGE_DEPENDENCIES, **SIDE_STAGE_DEPENDENCIES}
+# Stage eseguiti una sola volta per tutte le varianti di un input (usano i campi dell'input base)
+VARIANT_SHARED_STAGES = ['research', 'analysis']
+
+AGENT_PROFILES = {
+    # Research Agent - usa modello economico
+    'research': {
+        'role': 'Ricercatore Esperto',
+        'goal': 'Raccogliere informazioni web via Tavily per la generazione di articoli blog',
+        'backstory': 'Sei un ricercatore esperto specializzato in ricerche web, estrazione di fatti chiave, statistiche e fonti affidabili per supportare la creazione di contenuti di alta qualità. Ti concentri su informazioni recenti e fattuali per evitare allucinazioni.'
+    },
+    # Analysis Agent - nuovo step intermedio con modello economico
+    'analysis': {
+        'role': 'Analista Strategico',
+        'goal': 'Analizzare la ricerca e identificare opportunità strategiche per il contenuto',
+        'backstory': 'Sei un analista di contenuti esperto in strategia SEO italiana, specializzato nell\'identificare gap informativi, angoli unici e opportunità di posizionamento per massimizzare l\'efficacia del contenuto.'
+    },
+    # Outline Agent
+    'outline': {
+        'role': 'Editor SEO',
+        'goal': 'Creare una struttura dettagliata per l\'articolo blog basata sulla ricerca',
+        'backstory': 'Sei un editor SEO esperto che progetta strutture di articoli coinvolgenti e ottimizzate per i motori di ricerca con flusso logico, titoli e stime di parole per garantire una copertura completa.'
+    },
+    # Drafting Agent
+    'drafting': {
+        'role': 'Copywriter Blogger',
+        'goal': 'Scrivere una bozza completa dell\'articolo blog basata sulla struttura e ricerca',
+        'backstory': 'Sei un blogger esperto che scrive contenuti coinvolgenti e conversazionali che integrano fatti in modo fluido, mantiene le migliori pratiche SEO e garantisce la leggibilità per il pubblico.'
+    },
+    # Optimization Agent
+    'optimization': {
+        'role': 'Ottimizzatore SEO e Revisore',
+        'goal': 'Ottimizzare la bozza per SEO, lunghezza, coerenza e qualità',
+        'backstory': 'Sei un ottimizzatore SEO esperto ed editor che critica e perfeziona i contenuti per massima visibilità sui motori di ricerca, accuratezza fattuale e lucidatura professionale.'
+    },
+    # Technical SEO Agent - meta tag, link interni e dati strutturati, modello economico
+    'technical_seo': {
+        'role': 'Specialista SEO Tecnico',
+        'goal': 'Produrre meta tag, dati strutturati e link interni coerenti con l\'articolo',
+        'backstory': 'Sei uno specialista SEO tecnico che conosce le linee guida di Google su snippet, dati strutturati schema.org e architettura dei link interni, e produce output JSON precisi e validi.'
+    },
+    # Stitching Agent - transizioni tra sezioni scritte in parallelo, modello economico
+    'stitching': {
+        'role': 'Editor di Continuità',
+        'goal': 'Rendere fluide le transizioni tra sezioni di un articolo scritte separatamente',
+        'backstory': 'Sei un editor italiano attento al ritmo e alla coerenza dei testi, specializzato nel collegare sezioni scritte da autori diversi con transizioni brevi e naturali.'
+    }
+}
+
+# Profilo dell'agente che esegue ciascuno stage secondario
+SIDE_STAGE_PROFILES = {
+    'meta_tags': 'technical_seo',
+    'faq': 'drafting',
+    'internal_links': 'technical_seo',
+    'schema': 'technical_seo'
+}
+
+# Stage senza tool che possono essere eseguiti in streaming diretto dall'LLM
+STREAMABLE_STAGES = ['drafting', 'optimization']
+
+TASK_EXPECTED_OUTPUTS = {
+    'research': "Report JSON strutturato con facts, sources, keywords, opportunities e market_insights",
+    'analysis': "JSON con raccomandazioni strategiche per outline e contenuto",
+    'outline': "Struttura YAML dettagliata per l'articolo con sezioni, punti elenco e stime parole",
+    'drafting': "Bozza Markdown completa dell'articolo, seguita da ---NOTE REDAZIONALI--- con conteggio parole e note SEO",
+    'optimization': "Articolo Markdown finale ottimizzato e report delle modifiche",
+    'meta_tags': "JSON con title, description, slug, og_title e og_description",
+    'faq': "JSON con questions: array di oggetti question/answer",
+    'internal_links': "JSON con links: array di oggetti anchor/url/section/reason",
+    'schema': "JSON-LD schema.org con @context e @graph"
+}
+
+class RunCancelled(Exception):
+    """Esecuzione interrotta su richiesta prima di uno stage (gli stage completati restano nei checkpoint)"""
+
+@dataclass
+class RunContext:
+    """Stato di una singola esecuzione, isolato tra job concorrenti"""
+    run_id: str
+    search_stats: Dict[str, int] = field(default_factory=lambda: {'hits': 0, 'misses': 0, 'coalesced': 0})
+    streaming: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    context_tokens: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    seo_analysis: Dict[str, Any] = field(default_factory=dict)
+    knowledge: Dict[str, Any] = field(default_factory=dict)
+    cascade: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    metrics: RunMetrics = None
+    # Output grezzi, risultati tipizzati, chiavi di cache e provenienza degli stage
+    outputs: Dict[str, str] = field(default_factory=dict)
+    stage_results: Dict[str, Any] = field(default_factory=dict)
+    stage_keys: Dict[str, str] = field(default_factory=dict)
+    completed: Dict[str, str] = field(default_factory=dict)
+    reused_stages: List[str] = field(default_factory=list)
+    resumed_stages: List[str] = field(default_factory=list)
+    shared_stages: List[str] = field(default_factory=list)
+    # Deduplica e contatori dei risultati di ricerca passati agli agenti (None se disabilitato)
+    result_shaper: Optional[ResultShaper] = None
+    
+    def __post_init__(self):
+        if self.metrics is None:
+            self.metrics = RunMetrics(self.run_id)
+
 class BlogGeneratorEnhanced:
     """Generatore di blog avanzato con sistema di input completo"""
     
-    def __init__(self, config_path: str = "config.yaml", prompts_path: str = "prompts.yaml"):
-        self.input_manager = InputManager(config_path)
+    def __init__(self, config_path: str = "config.yaml", prompts_path: str = "prompts.yaml",
+                 config: Optional[Dict[str, Any]] = None):
+        self.input_manager = InputManager(config_path, config)
+        self.prompts_path = prompts_path
         self.prompts = self.load_prompts(prompts_path)
-        self.tavily_client = self._setup_tavily()
-        self.agents = {}
-        self.tasks = {}
+        self.prompt_compiler = PromptCompiler(
+            self.prompts, self.input_manager.get_prompt_cache_config().get('split_templates', True)
+        )
+        self._tavily_client = None
+        self._tavily_lock = threading.Lock()
+        # Gli archivi SQLite vengono aperti al primo uso: dry run e validazioni non creano file
+        self._stores: Dict[str, Any] = {}
+        self._stores_lock = threading.Lock()
+        self.stage_cache = self._setup_stage_cache()
+        self.checkpoints = self._setup_checkpoints()
+        LIMITERS.configure(self.input_manager.get_rate_limits_config())
         
     def load_prompts(self, prompts_path: str) -> Dict[str, str]:
         """Carica i prompt migliorati"""
@@ -60,147 +218,651 @@ class BlogGeneratorEnhanced:
             logger.error("Impossibile caricare i prompt")
             raise
     
-    def _setup_tavily(self) -> TavilyClient:
+    def _setup_tavily(self) -> 'TavilyClient':
         """Configura il client Tavily"""
+        from tavily import TavilyClient
         api_key = os.getenv("TAVILY_API_KEY")
         if not api_key:
             raise ValueError("TAVILY_API_KEY non trovata nelle variabili d'ambiente")
         return TavilyClient(api_key=api_key)
     
-    def create_llm(self, model_name: str) -> ChatOpenAI:
-        """Crea istanza ChatOpenAI con configurazione OpenRouter"""
+    @property
+    def tavily_client(self) -> 'TavilyClient':
+        """Client Tavily creato alla prima ricerca, così i percorsi senza ricerche non richiedono la chiave"""
+        with self._tavily_lock:
+            if self._tavily_client is None:
+                self._tavily_client = self._setup_tavily()
+            return self._tavily_client
+    
+    def _lazy_store(self, name: str, setup: Callable[[], Any]) -> Any:
+        """Crea l'archivio alla prima richiesta (None se disabilitato da configurazione)"""
+        with self._stores_lock:
+            if name not in self._stores:
+                self._stores[name] = setup()
+            return self._stores[name]
+    
+    @property
+    def search_cache(self) -> Optional[SearchCache]:
+        return self._lazy_store('search_cache', self._setup_search_cache)
+    
+    @property
+    def knowledge_store(self) -> Optional[KnowledgeStore]:
+        return self._lazy_store('knowledge_store', self._setup_knowledge_store)
+    
+    @property
+    def run_archive(self) -> Optional[RunArchive]:
+        return self._lazy_store('run_archive', self._setup_run_archive)
+    
+    def _setup_search_cache(self) -> Optional[SearchCache]:
+        """Configura la cache persistente delle ricerche Tavily"""
+        cache_config = self.input_manager.get_search_cache_config()
+        if not cache_config.get('enabled', True):
+            return None
+        return SearchCache(
+            path=cache_config.get('path', '.cache/tavily_cache.sqlite'),
+            ttl_seconds=cache_config.get('ttl_hours', 72) * 3600,
+            max_entries=cache_config.get('max_entries', 5000)
+        )
+    
+    def _setup_stage_cache(self) -> Optional[StageCache]:
+        """Configura la cache degli output degli stage"""
+        cache_config = self.input_manager.get_stage_cache_config()
+        if not cache_config.get('enabled', True):
+            return None
+        return StageCache(cache_config.get('directory', '.cache/stages'))
+    
+    def _setup_checkpoints(self) -> Optional[CheckpointStore]:
+        """Configura il salvataggio dei checkpoint per stage"""
+        checkpoint_config = self.input_manager.get_checkpoint_config()
+        if not checkpoint_config.get('enabled', True):
+            return None
+        return CheckpointStore(checkpoint_config.get('directory', '.checkpoints'))
+    
+    def _setup_knowledge_store(self) -> Optional[KnowledgeStore]:
+        """Configura l'archivio locale delle ricerche passate"""
+        knowledge_config = self.input_manager.get_knowledge_store_config()
+        if not knowledge_config.get('enabled', True):
+            return None
+        return KnowledgeStore(
+            path=knowledge_config.get('path', '.cache/knowledge.sqlite'),
+            max_age_days=knowledge_config.get('max_age_days', 30),
+            similarity_threshold=knowledge_config.get('similarity_threshold', 0.5)
+        )
+    
+    def _setup_run_archive(self) -> Optional[RunArchive]:
+        """Configura l'archivio append-only delle esecuzioni"""
+        archive_config = self.input_manager.get_archive_config()
+        if not archive_config.get('enabled', False):
+            return None
+        return RunArchive(
+            path=archive_config.get('path', '.archive/runs.sqlite'),
+            compression_level=archive_config.get('compression_level', 6)
+        )
+    
+    def _loose_files_enabled(self) -> bool:
+        """Indica se scrivere i file sciolti (intermedi e analytics) oltre all'archivio"""
+        archive_config = self.input_manager.get_archive_config()
+        return not archive_config.get('enabled', False) or archive_config.get('loose_files', False)
+    
+    def _llm_pool(self) -> 'LLMClientPool':
+        """Restituisce il pool di client LLM condiviso dal processo"""
+        from llm_pool import OPENROUTER_BASE_URL, get_llm_pool
         api_key = os.getenv("OPENROUTER_API_KEY")
         if not api_key:
             raise ValueError("OPENROUTER_API_KEY non trovata nelle variabili d'ambiente")
+        llm_config = self.input_manager.get_llm_config()
+        settings = dict(llm_config, rate_limited=self.input_manager.get_rate_limits_config().get('enabled', True))
+        return get_llm_pool(api_key, llm_config.get('base_url', OPENROUTER_BASE_URL), settings)
+    
+    def create_llm(self, model_name: str) -> 'LLM':
+        """Restituisce l'LLM degli agenti per il modello, riusato tra agenti ed esecuzioni"""
+        return self._llm_pool().agent_llm(model_name)
+    
+    def create_chat_model(self, model_name: str) -> 'ChatOpenAI':
+        """Restituisce il ChatOpenAI per chiamate dirette (streaming), riusato tra esecuzioni"""
+        return self._llm_pool().chat_model(model_name)
+    
+    def call_with_limits(self, provider: str, fn: Callable[[], Any], model: Optional[str] = None,
+                         run_context: Optional[RunContext] = None, stage: Optional[str] = None) -> Any:
+        """Esegue una chiamata al provider rispettando i rate limit condivisi e ritentando gli errori transitori"""
+        if not self.input_manager.get_rate_limits_config().get('enabled', True):
+            return fn()
         
-        # Configura environment per OpenRouter
-        os.environ["OPENAI_API_KEY"] = api_key
-        os.environ["OPENAI_API_BASE"] = "https://openrouter.ai/api/v1"
-        os.environ["OPENAI_BASE_URL"] = "https://openrouter.ai/api/v1"
-        
-        # Rimuovi chiavi Anthropic per evitare conflitti
-        if "ANTHROPIC_API_KEY" in os.environ:
-            del os.environ["ANTHROPIC_API_KEY"]
-        
-        return ChatOpenAI(
-            model=model_name,
-            openai_api_key=api_key,
-            openai_api_base="https://openrouter.ai/api/v1",
-            default_headers={
-                "HTTP-Referer": "http://localhost:3000",
-                "X-Title": "Blog Generator Enhanced"
-            }
+        def on_retry(error: BaseException, attempt: int, delay: float) -> None:
+            if run_context is not None:
+                run_context.metrics.add(stage or provider, 'retries')
+        
+        return LIMITERS.call(provider, fn, model=model, on_retry=on_retry)
+    
+    def call_llm(self, fn: Callable[[], Any], run_context: Optional[RunContext] = None,
+                 stage: Optional[str] = None) -> Any:
+        """Esegue una crew o uno streaming: rate limit e retry agiscono sulle singole richieste HTTP del pool"""
+        if run_context is None:
+            return fn()
+        with LIMITERS.retry_listener(lambda error, attempt, delay: run_context.metrics.add(stage, 'retries')):
+            return fn()
+    
+    def search_tavily(self, query: str, max_results: int = 5,
+                      run_context: Optional[RunContext] = None) -> List[Dict[str, Any]]:
+        """Esegue una ricerca Tavily passando dalla cache se abilitata"""
+        def search() -> List[Dict[str, Any]]:
+            if run_context is None:
+                return self.tavily_client.search(query=query, max_results=max_results)["results"]
+            with run_context.metrics.tool_call('tavily_search'):
+                return self.tavily_client.search(query=query, max_results=max_results)["results"]
+        
+        def fetch() -> List[Dict[str, Any]]:
+            return self.call_with_limits('tavily', search, run_context=run_context, stage='research')
+        
+        if self.search_cache is None:
+            return fetch()
+        search_stats = run_context.search_stats if run_context is not None else None
+        return self.search_cache.get_or_fetch(query, max_results, fetch, search_stats)
+    
+    def create_result_shaper(self) -> Optional[ResultShaper]:
+        """Crea lo shaper dei risultati di ricerca per un nuovo run (None se disabilitato)"""
+        shaping_config = self.input_manager.get_tavily_config().get('result_shaping', {})
+        if not shaping_config.get('enabled', True):
+            return None
+        return ResultShaper(
+            max_tokens_per_result=shaping_config.get('max_tokens_per_result', 120),
+            fields=shaping_config.get('fields', ['title', 'url', 'content', 'score', 'published_date']),
+            dedupe=shaping_config.get('dedupe', True),
+            min_score=shaping_config.get('min_score', 0.0)
         )
     
-    def create_tavily_tool(self):
+    def format_search_results(self, query: str, results: List[Dict[str, Any]],
+                              run_context: Optional[RunContext] = None,
+                              errors: Optional[List[Dict[str, Any]]] = None) -> str:
+        """Serializza i risultati per l'agente, compattati e deduplicati se lo shaping è attivo"""
+        payload = results if errors is None else {'results': results, 'errors': errors}
+        raw_text = json.dumps(payload, indent=2, ensure_ascii=False)
+        if run_context is None or run_context.result_shaper is None:
+            return raw_text
+        return run_context.result_shaper.shape(query, results, raw_text, errors)
+    
+    def create_tavily_tool(self, run_context: Optional[RunContext] = None):
         """Crea il tool Tavily per gli agenti"""
+        from crewai.tools import tool
+        
         @tool
         def tavily_search(query: str) -> str:
             """Ricerca web usando Tavily per risultati e riassunti rilevanti"""
+            if run_context is not None:
+                run_context.metrics.add('research', 'tool_calls')
             try:
-                results = self.tavily_client.search(query=query, max_results=5)
-                return json.dumps(results["results"], indent=2, ensure_ascii=False)
+                results = self.search_tavily(query, max_results=5, run_context=run_context)
+                return self.format_search_results(query, results, run_context)
             except Exception as e:
                 logger.error(f"Errore nella ricerca Tavily: {e}")
                 return json.dumps({"error": f"Ricerca fallita: {str(e)}"}, indent=2)
         return tavily_search
     
-    def setup_agents(self, blog_input: BlogInput) -> None:
-        """Configura tutti gli agenti con i modelli appropriati"""
+    def search_tavily_many(self, queries: List[str], max_results: int = 5,
+                           run_context: Optional[RunContext] = None) -> Dict[str, Any]:
+        """Esegue più ricerche Tavily in parallelo e unisce i risultati deduplicati per URL"""
+        queries = list(dict.fromkeys(q.strip() for q in queries if q and q.strip()))
+        max_parallel = self.input_manager.get_tavily_config().get('max_parallel_queries', 5)
+        merged: Dict[str, Dict[str, Any]] = {}
+        errors = []
         
-        # Research Agent - usa modello economico
-        self.agents['research'] = Agent(
-            role='Ricercatore Esperto',
-            goal='Raccogliere informazioni web via Tavily per la generazione di articoli blog',
-            backstory='Sei un ricercatore esperto specializzato in ricerche web, estrazione di fatti chiave, statistiche e fonti affidabili per supportare la creazione di contenuti di alta qualità. Ti concentri su informazioni recenti e fattuali per evitare allucinazioni.',
-            llm=self.create_llm(self.input_manager.get_model_config('research')),
-            tools=[self.create_tavily_tool()],
-            verbose=True
-        )
+        with ThreadPoolExecutor(max_workers=max(1, min(max_parallel, len(queries) or 1)),
+                                thread_name_prefix='tavily') as pool:
+            futures = {pool.submit(self.search_tavily, query, max_results, run_context): query
+                       for query in queries}
+            for future in as_completed(futures):
+                query = futures[future]
+                try:
+                    results = future.result()
+                except Exception as e:
+                    logger.error(f"Errore nella ricerca Tavily per '{query}': {e}")
+                    errors.append({'query': query, 'error': str(e)})
+                    continue
+                
+                for result in results:
+                    url = result.get('url') or result.get('content', '')
+                    existing = merged.get(url)
+                    if existing is None:
+                        merged[url] = dict(result, queries=[query])
+                        continue
+                    existing['queries'].append(query)
+                    if result.get('score', 0) > existing.get('score', 0):
+                        merged[url] = dict(result, queries=existing['queries'])
         
-        # Analysis Agent - nuovo step intermedio con modello economico
-        self.agents['analysis'] = Agent(
-            role='Analista Strategico',
-            goal='Analizzare la ricerca e identificare opportunità strategiche per il contenuto',
-            backstory='Sei un analista di contenuti esperto in strategia SEO italiana, specializzato nell\'identificare gap informativi, angoli unici e opportunità di posizionamento per massimizzare l\'efficacia del contenuto.',
-            llm=self.create_llm(self.input_manager.get_model_config('analysis')),
-            verbose=True
-        )
+        ranked = sorted(merged.values(), key=lambda r: r.get('score', 0), reverse=True)
+        return {'results': ranked, 'errors': errors}
+    
+    def create_tavily_multi_tool(self, run_context: Optional[RunContext] = None):
+        """Crea il tool Tavily multi-query per gli agenti"""
+        from crewai.tools import tool
         
-        # Outline Agent
-        self.agents['outline'] = Agent(
-            role='Editor SEO',
-            goal='Creare una struttura dettagliata per l\'articolo blog basata sulla ricerca',
-            backstory='Sei un editor SEO esperto che progetta strutture di articoli coinvolgenti e ottimizzate per i motori di ricerca con flusso logico, titoli e stime di parole per garantire una copertura completa.',
-            llm=self.create_llm(self.input_manager.get_model_config('outline')),
-            verbose=True
-        )
+        @tool
+        def tavily_multi_search(queries: List[str]) -> str:
+            """Esegue in parallelo una lista di ricerche web Tavily e restituisce i risultati unificati e deduplicati per URL"""
+            if run_context is not None:
+                run_context.metrics.add('research', 'tool_calls')
+            merged = self.search_tavily_many(queries, max_results=5, run_context=run_context)
+            return self.format_search_results(' '.join(queries), merged['results'], run_context, merged['errors'])
+        return tavily_multi_search
+    
+    def create_knowledge_tool(self, run_context: Optional[RunContext] = None):
+        """Crea il tool di ricerca nel knowledge store locale per gli agenti"""
+        from crewai.tools import tool
         
-        # Drafting Agent
-        self.agents['drafting'] = Agent(
-            role='Copywriter Blogger',
-            goal='Scrivere una bozza completa dell\'articolo blog basata sulla struttura e ricerca',
-            backstory='Sei un blogger esperto che scrive contenuti coinvolgenti e conversazionali che integrano fatti in modo fluido, mantiene le migliori pratiche SEO e garantisce la leggibilità per il pubblico.',
-            llm=self.create_llm(self.input_manager.get_model_config('drafting')),
+        @tool
+        def knowledge_search(query: str) -> str:
+            """Cerca fatti e fonti raccolti in ricerche precedenti recenti (locale, nessun costo): usalo prima di Tavily"""
+            if run_context is not None:
+                run_context.metrics.add('research', 'tool_calls')
+            with run_context.metrics.tool_call('knowledge_search') if run_context is not None else nullcontext():
+                results = self.knowledge_store.search(
+                    query, self.input_manager.get_knowledge_store_config().get('max_results', 10))
+            return json.dumps(results, indent=2, ensure_ascii=False)
+        return knowledge_search
+    
+    def create_agent(self, stage: str, run_context: Optional[RunContext] = None,
+                     model_name: Optional[str] = None) -> 'Agent':
+        """Crea l'agente di uno stage con il modello indicato (default: il primo della cascata)"""
+        from crewai import Agent
+        profile = AGENT_PROFILES[stage]
+        tools = []
+        if stage == 'research':
+            tools = [self.create_tavily_multi_tool(run_context), self.create_tavily_tool(run_context)]
+            if self.knowledge_store is not None:
+                tools.insert(0, self.create_knowledge_tool(run_context))
+        return Agent(
+            role=profile['role'],
+            goal=profile['goal'],
+            backstory=profile['backstory'],
+            llm=self.create_llm(model_name or self.input_manager.get_model_config(stage)),
+            tools=tools,
             verbose=True
         )
+    
+    def build_context(self, stage: str, outputs: Dict[str, str],
+                      run_context: Optional[RunContext] = None) -> str:
+        """Compone il contesto di uno stage dagli output degli stage da cui dipende, compattato entro il budget"""
+        dependencies = [dep for dep in ALL_STAGE_DEPENDENCIES[stage] if dep in outputs]
+        raw_context = CONTEXT_SEPARATOR.join(outputs[dep] for dep in dependencies)
+        compaction_config = self.input_manager.get_context_compaction_config()
+        if not dependencies or not compaction_config.get('enabled', False):
+            return raw_context
         
-        # Optimization Agent
-        self.agents['optimization'] = Agent(
-            role='Ottimizzatore SEO e Revisore',
-            goal='Ottimizzare la bozza per SEO, lunghezza, coerenza e qualità',
-            backstory='Sei un ottimizzatore SEO esperto ed editor che critica e perfeziona i contenuti per massima visibilità sui motori di ricerca, accuratezza fattuale e lucidatura professionale.',
-            llm=self.create_llm(self.input_manager.get_model_config('optimization')),
+        context = compact_context(
+            [(dep, outputs[dep]) for dep in dependencies],
+            compaction_config.get('budgets', {}).get(stage, 0),
+            compaction_config.get('research_digest', {})
+        )
+        if run_context is not None:
+            run_context.context_tokens[stage] = {
+                'before': estimate_tokens(raw_context),
+                'after': estimate_tokens(context)
+            }
+            logger.info(f"Contesto dello stage {stage} compattato: "
+                        f"{run_context.context_tokens[stage]['before']} -> {run_context.context_tokens[stage]['after']} token")
+        return context
+    
+    def stage_description(self, stage: str, blog_input: BlogInput, outputs: Dict[str, str],
+                          run_context: Optional[RunContext] = None) -> str:
+        """Compone la descrizione del task di uno stage con il contesto degli stage precedenti"""
+        description = self.prompt_compiler.render(f"{stage}_description", **blog_input.to_dict())
+        context = self.build_context(stage, outputs, run_context)
+        if context:
+            description += f"\n\nCONTESTO DAI TASK PRECEDENTI:\n\n{context}"
+        if stage == 'research' and self.knowledge_store is not None:
+            description += self.prior_research_context(blog_input, run_context)
+        seo_analysis_config = self.input_manager.get_seo_analysis_config()
+        if (stage == 'optimization' and seo_analysis_config.get('enabled', False)
+                and seo_analysis_config.get('mode', 'gate') in ('gate', 'diff')):
+            report = run_context.seo_analysis.get('draft') if run_context is not None else None
+            report = report or self.create_seo_analyzer(blog_input, outputs).analyze(
+                strip_draft_notes(outputs['drafting']))
+            description += f"\n\nANALISI SEO LOCALE DELLA BOZZA (metriche da correggere):\n{format_report_diff(report)}"
+        return description
+    
+    def prior_research_context(self, blog_input: BlogInput, run_context: Optional[RunContext] = None) -> str:
+        """Contesto iniziale con le ricerche recenti su topic quasi duplicati, se presenti"""
+        knowledge_config = self.input_manager.get_knowledge_store_config()
+        prior = self.knowledge_store.prior_research(
+            blog_input.topic,
+            max_topics=knowledge_config.get('max_prior_topics', 3),
+            max_facts=knowledge_config.get('max_prior_facts', 20)
+        )
+        if prior is None:
+            return ""
+        if run_context is not None:
+            run_context.knowledge['similar_topics'] = prior['topics']
+            run_context.metrics.set('research', 'knowledge_topics', len(prior['topics']))
+        logger.info(f"Ricerca pre-alimentata da {len(prior['topics'])} topic simili: "
+                    f"{', '.join(match['topic'] for match in prior['topics'])}")
+        return ("\n\nRICERCHE PRECEDENTI SU TOPIC SIMILI (già verificate; cerca con Tavily solo ciò che manca o è datato):\n\n"
+                + json.dumps(prior, ensure_ascii=False, separators=(',', ':')))
+    
+    def create_task(self, stage: str, agent: 'Agent', blog_input: BlogInput, outputs: Dict[str, str],
+                    run_context: Optional[RunContext] = None) -> 'Task':
+        """Crea il task di uno stage includendo il contesto degli stage precedenti"""
+        from crewai import Task
+        return Task(
+            description=self.stage_description(stage, blog_input, outputs, run_context),
+            agent=agent,
+            expected_output=TASK_EXPECTED_OUTPUTS[stage]
+        )
+    
+    def create_seo_analyzer(self, blog_input: BlogInput, outputs: Dict[str, str]) -> SEOAnalyzer:
+        """Crea l'analizzatore SEO con le keyword della ricerca (o il topic) e i target di seo_config"""
+        research = parse_json_output(outputs.get('research', ''))
+        keywords = research.get('keywords') if isinstance(research, dict) else None
+        if isinstance(keywords, dict):
+            primary, secondary = keywords.get('primary') or [], keywords.get('secondary') or []
+        else:
+            primary, secondary = (keywords or [])[:1], (keywords or [])[1:]
+        primary = [k for k in primary if isinstance(k, str)] or [blog_input.topic]
+        return SEOAnalyzer(
+            self.input_manager.get_seo_config(),
+            primary_keywords=primary,
+            secondary_keywords=[k for k in secondary if isinstance(k, str)],
+            target_website=blog_input.target_website,
+            word_count=blog_input.word_count
+        )
+    
+    def run_prompt(self, profile: str, model_name: str, description: str, expected_output: str,
+                   run_context: Optional[RunContext] = None, stage: Optional[str] = None) -> str:
+        """Esegue un singolo prompt con un agente senza tool e ne restituisce l'output"""
+        from crewai import Agent, Task, Crew
+        agent = Agent(
+            role=AGENT_PROFILES[profile]['role'],
+            goal=AGENT_PROFILES[profile]['goal'],
+            backstory=AGENT_PROFILES[profile]['backstory'],
+            llm=self.create_llm(model_name),
             verbose=True
         )
+        task = Task(description=description, agent=agent, expected_output=expected_output)
+        output = self.call_llm(Crew(agents=[agent], tasks=[task], verbose=True).kickoff, run_context, stage or profile)
+        if run_context is not None:
+            run_context.metrics.record_usage(stage or profile, output.token_usage)
+        return output.raw
     
-    def setup_tasks(self, blog_input: BlogInput) -> None:
-        """Configura tutti i task con i prompt migliorati"""
+    def draft_by_sections(self, blog_input: BlogInput, outputs: Dict[str, str],
+                          run_context: Optional[RunContext] = None,
+                          model_name: Optional[str] = None) -> Optional[str]:
+        """Scrive le sezioni dell'outline in parallelo e le ricompone con transizioni"""
+        title, sections = parse_outline_sections(outputs['outline'])
+        if len(sections) < 2:
+            logger.warning("Outline senza sezioni riconoscibili, uso la stesura in un'unica chiamata")
+            return None
+        
+        drafting_config = self.input_manager.get_drafting_config()
+        fan_out = max(1, drafting_config.get('max_parallel_sections', 4))
+        drafting_model = model_name or self.input_manager.get_model_config('drafting')
+        stitch_model = drafting_config.get('stitch_model') or self.input_manager.get_model_config('analysis')
         input_dict = blog_input.to_dict()
+        context = self.build_context('drafting', outputs, run_context)
         
-        # Research Task
-        self.tasks['research'] = Task(
-            description=self.prompts["research_description"].format(**input_dict),
-            agent=self.agents['research'],
-            expected_output="Report JSON strutturato con facts, sources, keywords, opportunities e market_insights"
-        )
+        def draft(index: int) -> str:
+            description = self.prompt_compiler.render(
+                "section_drafting_description",
+                section_index=index + 1,
+                section_count=len(sections),
+                section_title=sections[index]['title'],
+                section_spec=sections[index]['spec'],
+                section_words=max(150, blog_input.word_count // len(sections)),
+                **input_dict
+            )
+            description += f"\n\nCONTESTO DAI TASK PRECEDENTI:\n\n{context}"
+            return self.run_prompt('drafting', drafting_model, description,
+                                   "Markdown della sola sezione richiesta, a partire dal titolo H2",
+                                   run_context, 'drafting')
         
-        # Analysis Task - nuovo step intermedio
-        self.tasks['analysis'] = Task(
-            description=self.prompts["analysis_description"].format(**input_dict),
-            agent=self.agents['analysis'],
-            context=[self.tasks['research']],
-            expected_output="JSON con raccomandazioni strategiche per outline e contenuto"
-        )
+        def stitch(index: int) -> str:
+            previous_excerpt, next_excerpt = boundary_excerpts(drafts[index], drafts[index + 1])
+            description = self.prompt_compiler.render(
+                "section_transition_description",
+                previous_excerpt=previous_excerpt,
+                next_excerpt=next_excerpt,
+                **input_dict
+            )
+            try:
+                return self.run_prompt('stitching', stitch_model, description, "Transizione di 1-2 frasi",
+                                       run_context, 'drafting')
+            except Exception as e:
+                logger.warning(f"Transizione {index + 1} non generata, sezioni unite senza raccordo: {e}")
+                return ""
         
-        # Outline Task
-        self.tasks['outline'] = Task(
-            description=self.prompts["outline_description"].format(**input_dict),
-            agent=self.agents['outline'],
-            context=[self.tasks['research'], self.tasks['analysis']],
-            expected_output="Struttura YAML dettagliata per l'articolo con sezioni, punti elenco e stime parole"
-        )
+        logger.info(f"Stesura di {len(sections)} sezioni in parallelo (max {fan_out})")
+        with ThreadPoolExecutor(max_workers=fan_out, thread_name_prefix='drafting') as pool:
+            drafts = list(pool.map(draft, range(len(sections))))
+            transitions = list(pool.map(stitch, range(len(sections) - 1)))
         
-        # Drafting Task
-        self.tasks['drafting'] = Task(
-            description=self.prompts["drafting_description"].format(**input_dict),
-            agent=self.agents['drafting'],
-            context=[self.tasks['research'], self.tasks['analysis'], self.tasks['outline']],
-            expected_output="Bozza Markdown completa dell'articolo con conteggio parole e note SEO"
-        )
+        return assemble_article(title, drafts, transitions)
+    
+    def stream_stage(self, stage: str, blog_input: BlogInput, outputs: Dict[str, str],
+                     run_context: RunContext, model_name: Optional[str] = None) -> str:
+        """Esegue uno stage senza tool chiamando direttamente l'LLM in streaming"""
+        from langchain_core.messages import HumanMessage, SystemMessage
+        streaming_config = self.input_manager.get_streaming_config()
+        profile = AGENT_PROFILES[stage]
+        messages = [
+            SystemMessage(content=f"Sei {profile['role']}. {profile['backstory']}\n"
+                                  f"Il tuo obiettivo personale: {profile['goal']}"),
+            HumanMessage(content=f"{self.stage_description(stage, blog_input, outputs, run_context)}\n\n"
+                                 f"Output atteso: {TASK_EXPECTED_OUTPUTS[stage]}")
+        ]
+        
+        path = None
+        if streaming_config.get('write_file', True):
+            path = os.path.join(streaming_config.get('directory', 'stream'), f"{run_context.run_id}_{stage}.md")
+        
+        model_name = model_name or self.input_manager.get_model_config(stage)
+        llm = self.create_chat_model(model_name)
+        
+        def stream() -> Tuple[str, Dict[str, Any]]:
+            # Un nuovo tentativo riscrive il file di streaming dall'inizio
+            with StreamSink(path, streaming_config.get('stdout', False)) as sink:
+                return consume_stream(llm.stream(messages), sink)
+        
+        text, stats = self.call_llm(stream, run_context, stage)
+        
+        run_context.streaming[stage] = stats
+        run_context.metrics.record_usage(stage, stats.get('usage'))
+        first_token = stats['time_to_first_token_seconds']
+        logger.info(f"Stage {stage} in streaming completato in {stats['total_time_seconds']:.2f} secondi "
+                    f"(primo token dopo {first_token if first_token is not None else float('nan'):.2f} secondi)")
+        return text
+    
+    def run_stage(self, stage: str, blog_input: BlogInput, outputs: Dict[str, str],
+                  run_context: RunContext) -> str:
+        """Esegue un singolo stage risalendo la cascata di modelli e ne restituisce l'output"""
+        seo_analysis_config = self.input_manager.get_seo_analysis_config()
+        validation_config = self.input_manager.get_validation_config()
+        if stage == 'optimization' and seo_analysis_config.get('enabled', False):
+            # Si valuta l'articolo come verrebbe pubblicato, senza le note redazionali della bozza
+            article = strip_draft_notes(outputs['drafting'])
+            report = self.create_seo_analyzer(blog_input, outputs).analyze(article)
+            run_context.seo_analysis['draft'] = report
+            if seo_analysis_config.get('mode', 'gate') == 'gate' and report['passed']:
+                errors = validate_stage_output(stage, article, blog_input.word_count, validation_config)
+                if not errors:
+                    logger.info("La bozza supera tutti i controlli SEO locali, ottimizzazione LLM saltata")
+                    run_context.metrics.set(stage, 'seo_gate', 'skipped')
+                    return article
+                logger.info(f"La bozza supera i controlli SEO ma non la validazione finale ({'; '.join(errors)}), "
+                            f"ottimizzazione LLM eseguita")
+        
+        # Cascata di modelli: dal più economico, si passa al successivo solo se la validazione fallisce
+        models = self.input_manager.get_model_cascade(stage)
+        cascade = run_context.cascade.setdefault(stage, {'models_tried': [], 'errors': {}, 'escalations': 0, 'repairs': 0})
+        for index, model_name in enumerate(models):
+            last_model = index == len(models) - 1
+            cascade['models_tried'].append(model_name)
+            try:
+                output = self.execute_stage_with_retries(stage, model_name, blog_input, outputs, run_context)
+            except Exception as e:
+                # Richieste non valide o non autorizzate (4xx, template) fallirebbero con ogni modello della cascata
+                if last_model or not is_retryable(e):
+                    raise
+                errors = [f"errore di esecuzione: {e}"]
+            else:
+                cascade['final_model'] = model_name
+                run_context.metrics.set(stage, 'model', model_name)
+                errors = validate_stage_output(stage, output, blog_input.word_count, validation_config)
+                if errors and stage in REPAIRABLE_STAGES:
+                    output, errors = self.repair_stage_output(stage, model_name, output, errors, blog_input,
+                                                              run_context, cascade)
+                if not errors:
+                    return output
+            
+            cascade['errors'][model_name] = errors
+            if last_model:
+                if stage in validation_config.get('fail_on_invalid', REPAIRABLE_STAGES):
+                    raise StageValidationError(stage, errors)
+                logger.warning(f"Output dello stage {stage} non valido anche con {model_name}: {'; '.join(errors)}")
+                return output
+            cascade['escalations'] += 1
+            run_context.metrics.add(stage, 'escalations')
+            logger.info(f"Output dello stage {stage} con {model_name} non valido ({'; '.join(errors)}), "
+                        f"passo a {models[index + 1]}")
+    
+    def execute_stage_with_retries(self, stage: str, model_name: str, blog_input: BlogInput,
+                                   outputs: Dict[str, str], run_context: RunContext) -> str:
+        """Riesegue solo lo stage fallito per errori transitori, con il contesto a monte già prodotto, fino a max_stage_attempts volte"""
+        attempts = max(1, self.input_manager.get_validation_config().get('max_stage_attempts', 2))
+        for attempt in range(1, attempts + 1):
+            try:
+                return self.execute_stage(stage, model_name, blog_input, outputs, run_context)
+            except Exception as e:
+                # Autenticazione, 4xx, template e validazione falliscono di nuovo: ripetere consuma solo token
+                if attempt == attempts or not is_retryable(e):
+                    raise
+                run_context.metrics.add(stage, 'retries')
+                logger.warning(f"Stage {stage} fallito con {model_name} ({e}), nuovo tentativo {attempt + 1}/{attempts}")
+    
+    def repair_stage_output(self, stage: str, model_name: str, output: str, errors: List[str],
+                            blog_input: BlogInput, run_context: RunContext,
+                            cascade: Dict[str, Any]) -> Tuple[str, List[str]]:
+        """Chiede allo stesso modello di correggere il formato di un output strutturato non valido"""
+        validation_config = self.input_manager.get_validation_config()
+        for _ in range(validation_config.get('max_repairs', 1)):
+            description = self.prompt_compiler.render(
+                "stage_repair_description",
+                stage=stage,
+                errors="\n".join(f"- {error}" for error in errors),
+                expected_output=TASK_EXPECTED_OUTPUTS[stage],
+                output=output
+            )
+            try:
+                repaired = self.run_prompt(stage, model_name, description, TASK_EXPECTED_OUTPUTS[stage],
+                                           run_context, stage)
+            except Exception as e:
+                logger.warning(f"Riparazione dell'output dello stage {stage} non riuscita: {e}")
+                break
+            cascade['repairs'] += 1
+            repaired_errors = validate_stage_output(stage, repaired, blog_input.word_count, validation_config)
+            logger.info(f"Output dello stage {stage} riparato con {model_name}: "
+                        f"{'valido' if not repaired_errors else '; '.join(repaired_errors)}")
+            if len(repaired_errors) <= len(errors):
+                output, errors = repaired, repaired_errors
+            if not errors:
+                break
+        return output, errors
+    
+    def execute_stage(self, stage: str, model_name: str, blog_input: BlogInput, outputs: Dict[str, str],
+                      run_context: RunContext) -> str:
+        """Esegue uno stage con un modello specifico (sezioni parallele, streaming o crew dedicata)"""
+        if stage == 'drafting' and self.input_manager.get_drafting_config().get('mode') == 'sections':
+            article = self.draft_by_sections(blog_input, outputs, run_context, model_name)
+            if article is not None:
+                return article
+        
+        streaming_config = self.input_manager.get_streaming_config()
+        if streaming_config.get('enabled', False) and stage in streaming_config.get('stages', STREAMABLE_STAGES):
+            return self.stream_stage(stage, blog_input, outputs, run_context, model_name)
         
-        # Optimization Task
-        self.tasks['optimization'] = Task(
-            description=self.prompts["optimization_description"].format(**input_dict),
-            agent=self.agents['optimization'],
-            context=[self.tasks['research'], self.tasks['analysis'], self.tasks['outline'], self.tasks['drafting']],
-            expected_output="Articolo Markdown finale ottimizzato e report delle modifiche"
+        from crewai import Crew
+        agent = self.create_agent(stage, run_context, model_name)
+        task = self.create_task(stage, agent, blog_input, outputs, run_context)
+        crew = Crew(agents=[agent], tasks=[task], verbose=True)
+        output = self.call_llm(crew.kickoff, run_context, stage)
+        run_context.metrics.record_usage(stage, output.token_usage)
+        return output.raw
+    
+    def stage_options(self, stage: str) -> Dict[str, Any]:
+        """Opzioni di configurazione che modificano l'output di uno stage"""
+        options = {}
+        compaction_config = self.input_manager.get_context_compaction_config()
+        if ALL_STAGE_DEPENDENCIES[stage] and compaction_config.get('enabled', False):
+            options['context_compaction'] = {
+                'budget': compaction_config.get('budgets', {}).get(stage, 0),
+                'research_digest': compaction_config.get('research_digest', {})
+            }
+        if stage == 'drafting':
+            drafting_options = dict(self.input_manager.get_drafting_config())
+            if drafting_options.get('mode') == 'sections':
+                drafting_options['prompts'] = [self.prompts["section_drafting_description"],
+                                               self.prompts["section_transition_description"]]
+            options['drafting'] = drafting_options
+        seo_analysis_config = self.input_manager.get_seo_analysis_config()
+        if stage == 'optimization' and seo_analysis_config.get('enabled', False):
+            options['seo_analysis'] = {
+                'mode': seo_analysis_config.get('mode', 'gate'),
+                'seo_config': self.input_manager.get_seo_config()
+            }
+        if stage in SIDE_STAGES:
+            options['seo_config'] = self.input_manager.get_seo_config()
+        if self.prompt_compiler.split:
+            options['prompt_layout'] = 'split'
+        if len(self.input_manager.get_model_cascade(stage)) > 1:
+            options['validation'] = self.input_manager.get_validation_config()
+        return options
+    
+    def stage_cache_key(self, stage: str, blog_input: BlogInput, stage_keys: Dict[str, str]) -> str:
+        """Calcola la chiave di cache dello stage, concatenata a quelle degli stage a monte"""
+        return StageCache.make_key(
+            stage,
+            ','.join(self.input_manager.get_model_cascade(stage)),
+            self.prompts[f"{stage}_description"],
+            blog_input.to_dict(),
+            [stage_keys[dep] for dep in ALL_STAGE_DEPENDENCIES[stage] if dep in stage_keys],
+            extra={
+                'agent': AGENT_PROFILES[SIDE_STAGE_PROFILES.get(stage, stage)],
+                'expected_output': TASK_EXPECTED_OUTPUTS[stage],
+                'options': self.stage_options(stage)
+            }
+        )
+    
+    def side_stages(self) -> List[str]:
+        """Stage secondari abilitati (lo schema solo se output.include_schema è attivo)"""
+        side_config = self.input_manager.get_side_stages_config()
+        if not side_config.get('enabled', False):
+            return []
+        stages = [stage for stage in SIDE_STAGES if stage in side_config.get('stages', SIDE_STAGES)]
+        if not self.input_manager.get_output_config().get('include_schema', False):
+            stages = [stage for stage in stages if stage != 'schema']
+        return stages
+    
+    def run_side_stage(self, stage: str, blog_input: BlogInput, outputs: Dict[str, str],
+                       run_context: RunContext) -> str:
+        """Esegue uno stage secondario con un singolo prompt senza tool"""
+        seo_config = self.input_manager.get_seo_config()
+        description = self.prompt_compiler.render(
+            f"{stage}_description",
+            meta_title_max=seo_config.get('meta_title_max', 60),
+            meta_desc_max=seo_config.get('meta_desc_max', 155),
+            internal_links_min=seo_config.get('internal_links_min', 3),
+            **blog_input.to_dict()
         )
+        context = self.build_context(stage, outputs, run_context)
+        if context:
+            description += f"\n\nCONTESTO DAI TASK PRECEDENTI:\n\n{context}"
+        return self.run_prompt(SIDE_STAGE_PROFILES[stage], self.input_manager.get_model_config(stage),
+                               description, TASK_EXPECTED_OUTPUTS[stage], run_context, stage)
     
     def save_intermediate_results(self, results: Dict[str, Any], blog_input: BlogInput) -> None:
         """Salva risultati intermedi se configurato"""
         if not self.input_manager.get_output_config().get('save_intermediate', False):
             return
+        if not self._loose_files_enabled():
+            # Gli output degli stage sono già nell'archivio delle esecuzioni
+            return
         
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         topic_clean = blog_input.topic.replace(' ', '_').replace('/', '_').lower()
@@ -209,16 +871,19 @@ class BlogGeneratorEnhanced:
             filename = f"intermediate_{task_name}_{topic_clean}_{timestamp}.json"
             try:
                 with open(filename, 'w', encoding='utf-8') as file:
-                    json.dump(result, file, indent=2, ensure_ascii=False)
+                    json.dump(result, file, indent=2, ensure_ascii=False, default=str)
                 logger.info(f"Risultato intermedio salvato: {filename}")
             except Exception as e:
                 logger.error(f"Errore nel salvare risultato intermedio {task_name}: {e}")
     
-    def save_final_result(self, result: Any, blog_input: BlogInput) -> str:
+    def save_final_result(self, result: Any, blog_input: BlogInput, output_dir: str = ".",
+                          run_id: Optional[str] = None) -> str:
         """Salva il risultato finale in un file markdown"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        # Il run ID inizia già con un timestamp: lo sostituisce invece di esservi accodato
+        run_tag = run_id or datetime.now().strftime("%Y%m%d_%H%M%S")
         topic_clean = blog_input.topic.replace(' ', '_').replace('/', '_').lower()
-        filename = f"blog_{topic_clean}_{timestamp}.md"
+        os.makedirs(output_dir, exist_ok=True)
+        filename = os.path.join(output_dir, f"blog_{topic_clean}_{run_tag}.md")
         
         try:
             with open(filename, 'w', encoding='utf-8') as file:
@@ -233,63 +898,370 @@ class BlogGeneratorEnhanced:
             logger.error(f"Errore nel salvare il file finale: {e}")
             raise
     
-    def generate_analytics_report(self, blog_input: BlogInput, execution_time: float) -> Dict[str, Any]:
+    def save_outputs(self, result_data: Dict[str, Any], blog_input: BlogInput, output_dir: str = ".",
+                     run_id: Optional[str] = None) -> Dict[str, Any]:
+        """Salva articolo finale e analytics, restituisce i percorsi dei file creati (per variante, se presenti)"""
+        if 'variants' in result_data:
+            return {name: self.save_outputs(data, result_data['inputs'][name], output_dir, data['run_id'])
+                    for name, data in result_data['variants'].items()}
+        
+        files = {'article': self.save_final_result(result_data['result'], blog_input, output_dir, run_id)}
+        
+        # Meta tag, FAQ, link interni e schema: consegnati insieme all'articolo
+        if result_data.get('side_outputs'):
+            seo_file = files['article'][:-len('.md')] + '_seo.json'
+            with open(seo_file, 'w', encoding='utf-8') as f:
+                json.dump(result_data['side_outputs'], f, indent=2, ensure_ascii=False)
+            files['seo'] = seo_file
+        
+        if self.run_archive is not None:
+            files['archive'] = self.run_archive.path
+        
+        # Salva analytics se abilitato
+        if result_data['analytics'] and self._loose_files_enabled():
+            analytics_file = files['article'][:-len('.md')] + '_analytics.json'
+            with open(analytics_file, 'w', encoding='utf-8') as f:
+                json.dump(result_data['analytics'], f, indent=2, ensure_ascii=False)
+            files['analytics'] = analytics_file
+        
+        return files
+    
+    def generate_analytics_report(self, blog_input: BlogInput, execution_time: float,
+                                  run_info: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Genera report analytics dell'esecuzione"""
         if not self.input_manager.get_output_config().get('generate_analytics', False):
             return {}
         
-        return {
+        report = {
             'timestamp': datetime.now().isoformat(),
             'input_config': blog_input.to_dict(),
             'execution_time_seconds': execution_time,
             'models_used': {
-                agent_type: self.input_manager.get_model_config(agent_type)
-                for agent_type in ['research', 'analysis', 'outline', 'drafting', 'optimization']
+                agent_type: self.input_manager.get_model_cascade(agent_type)
+                for agent_type in STAGES + self.side_stages()
             },
             'seo_config': self.input_manager.get_seo_config(),
             'status': 'completed'
         }
+        report.update(run_info or {})
+        return report
+    
+    def archive_run(self, run_id: str, blog_input: BlogInput, status: str, outputs: Dict[str, str],
+                    execution_time: float, result: Optional[str] = None,
+                    analytics: Optional[Dict[str, Any]] = None, error: str = "") -> None:
+        """Aggiunge l'esecuzione all'archivio; un errore di archiviazione non fa fallire il run"""
+        if self.run_archive is None:
+            return
+        try:
+            self.run_archive.archive_run(run_id, blog_input.topic, status, blog_input.to_dict(), outputs,
+                                         result, analytics, execution_time, error)
+        except sqlite3.Error as e:
+            logger.error(f"Errore nell'archiviazione del run {run_id}: {e}")
+    
+    def export_metrics(self, run_context: RunContext, blog_input: BlogInput, status: str,
+                       execution_time: float) -> None:
+        """Registra le metriche dell'esecuzione ed esegue gli export JSONL/Prometheus configurati"""
+        METRICS.observe(run_context.metrics, status)
+        metrics_config = self.input_manager.get_metrics_config()
+        try:
+            if metrics_config.get('jsonl_path'):
+                export_jsonl(metrics_config['jsonl_path'], {
+                    'run_id': run_context.run_id,
+                    'timestamp': datetime.now().isoformat(),
+                    'topic': blog_input.topic,
+                    'status': status,
+                    'execution_time_seconds': execution_time,
+                    **run_context.metrics.to_dict()
+                })
+            if metrics_config.get('prometheus_path'):
+                METRICS.write_prometheus(metrics_config['prometheus_path'])
+        except OSError as e:
+            logger.error(f"Errore nell'export delle metriche: {e}")
     
-    def run(self, blog_input: BlogInput) -> Dict[str, Any]:
-        """Esegue il processo completo di generazione del blog"""
+    def resume(self, run_id: str) -> Tuple[BlogInput, Dict[str, Any]]:
+        """Riprende un'esecuzione interrotta dal primo stage non completato"""
+        if self.checkpoints is None:
+            raise ValueError("Checkpoint disabilitati nella configurazione, impossibile riprendere")
+        blog_input = BlogInput(**self.checkpoints.load_run(run_id)['input'])
+        logger.info(f"Ripresa del run {run_id}")
+        return blog_input, self.run(blog_input, run_id=run_id)
+    
+    def plan(self, blog_input: BlogInput) -> Dict[str, Any]:
+        """Descrive gli stage che un'esecuzione eseguirebbe, senza chiamare LLM o Tavily"""
         if not blog_input.validate():
             raise ValueError("Input non valido")
         
-        logger.info(f"Avvio generazione blog per topic: {blog_input.topic}")
-        start_time = datetime.now()
+        drafting_config = self.input_manager.get_drafting_config()
+        streaming_config = self.input_manager.get_streaming_config()
+        stage_keys: Dict[str, str] = {}
+        stages = []
+        for stage in STAGES + self.side_stages():
+            stage_keys[stage] = self.stage_cache_key(stage, blog_input, stage_keys)
+            if stage in SIDE_STAGE_DEPENDENCIES:
+                mode = 'parallel'
+            elif stage == 'drafting' and drafting_config.get('mode') == 'sections':
+                mode = 'sections'
+            elif streaming_config.get('enabled', False) and stage in streaming_config.get('stages', STREAMABLE_STAGES):
+                mode = 'streaming'
+            else:
+                mode = 'crew'
+            stages.append({
+                'stage': stage,
+                'model': ' → '.join(self.input_manager.get_model_cascade(stage)),
+                'mode': mode,
+                'cached': self.stage_cache is not None and self.stage_cache.get(stage_keys[stage]) is not None
+            })
         
-        try:
-            # Setup agenti e task
-            self.setup_agents(blog_input)
-            self.setup_tasks(blog_input)
+        return {
+            'topic': blog_input.topic,
+            'stages': stages,
+            'variants': [name for name, _ in blog_input.variant_inputs()],
+            'missing_keys': [name for name in ('OPENROUTER_API_KEY', 'TAVILY_API_KEY') if not os.getenv(name)]
+        }
+    
+    def execute_pipeline_stage(self, stage: str, blog_input: BlogInput, run_context: RunContext,
+                               should_cancel: Optional[Callable[[], bool]] = None,
+                               shared_context: Optional[RunContext] = None) -> None:
+        """Esegue uno stage riusando, nell'ordine, checkpoint, output condivisi tra varianti e cache"""
+        run_id = run_context.run_id
+        outputs, stage_keys = run_context.outputs, run_context.stage_keys
+        if should_cancel is not None and should_cancel():
+            raise RunCancelled(f"Run {run_id} annullato prima dello stage {stage}")
+        # Uno stage condiviso mantiene la chiave del run che lo ha prodotto, così le chiavi a valle restano coerenti
+        shared = shared_context is not None and stage in shared_context.outputs
+        if shared:
+            stage_keys[stage] = shared_context.stage_keys[stage]
+        else:
+            stage_keys[stage] = self.stage_cache_key(stage, blog_input, stage_keys)
+        
+        # Modello iniziale della cascata; run_stage registra quello che ha prodotto l'output
+        run_context.metrics.set(stage, 'model', self.input_manager.get_model_config(stage))
+        with run_context.metrics.stage(stage):
+            # Stage già completato in un tentativo precedente dello stesso run
+            if stage in run_context.completed:
+                logger.info(f"Stage {stage} ripreso dal checkpoint del run {run_id}")
+                outputs[stage] = run_context.completed[stage]
+                run_context.stage_results[stage] = parse_stage_output(stage, outputs[stage])
+                run_context.resumed_stages.append(stage)
+                run_context.metrics.set(stage, 'source', 'checkpoint')
+                return
             
-            # Crea crew
-            crew = Crew(
-                agents=list(self.agents.values()),
-                tasks=list(self.tasks.values()),
-                verbose=True
+            # Riusa l'output condiviso tra le varianti dello stesso input, oppure quello in cache
+            # se modello, prompt e campi di input usati non sono cambiati
+            cached = self.stage_cache.get(stage_keys[stage]) if self.stage_cache and not shared else None
+            if shared:
+                outputs[stage] = shared_context.outputs[stage]
+                run_context.shared_stages.append(stage)
+                run_context.metrics.set(stage, 'source', 'shared')
+            elif cached is not None:
+                logger.info(f"Stage {stage} riutilizzato dalla cache")
+                outputs[stage] = cached
+                run_context.reused_stages.append(stage)
+                run_context.metrics.set(stage, 'source', 'stage_cache')
+                run_context.metrics.add(stage, 'cache_hits')
+            else:
+                logger.info(f"Esecuzione stage {stage}")
+                if stage in SIDE_STAGE_DEPENDENCIES:
+                    outputs[stage] = self.run_side_stage(stage, blog_input, outputs, run_context)
+                else:
+                    outputs[stage] = self.run_stage(stage, blog_input, outputs, run_context)
+                run_context.metrics.set(stage, 'source', 'executed')
+                if stage == 'research' and self.knowledge_store is not None:
+                    self.knowledge_store.add_research(blog_input.topic, outputs[stage], run_id)
+                if self.stage_cache:
+                    # Un output accettato con avvisi di validazione non va riusato dai run successivi
+                    errors = validate_stage_output(stage, outputs[stage], blog_input.word_count,
+                                                   self.input_manager.get_validation_config())
+                    if errors:
+                        logger.info(f"Output dello stage {stage} non salvato in cache: {'; '.join(errors)}")
+                    else:
+                        self.stage_cache.put(stage_keys[stage], stage, outputs[stage])
+        
+        run_context.stage_results[stage] = parse_stage_output(stage, outputs[stage])
+        if self.checkpoints:
+            self.checkpoints.save_stage(run_id, stage, outputs[stage], run_context.stage_results[stage])
+    
+    def run(self, blog_input: BlogInput, run_id: Optional[str] = None,
+            should_cancel: Optional[Callable[[], bool]] = None,
+            shared_context: Optional[RunContext] = None) -> Dict[str, Any]:
+        """Esegue il processo completo di generazione del blog (interrompibile tra uno stage e l'altro)"""
+        if not blog_input.validate():
+            raise ValueError("Input non valido")
+        if blog_input.variants and shared_context is None:
+            return self.run_variants(blog_input, run_id, should_cancel)
+        
+        run_id = run_id or new_run_id()
+        logger.info(f"Avvio generazione blog per topic: {blog_input.topic} (run {run_id})")
+        start_time = time.monotonic()
+        
+        # Stato locale al singolo job, isolato tra esecuzioni concorrenti
+        run_context = RunContext(run_id=run_id, result_shaper=self.create_result_shaper())
+        
+        outputs, stage_results = run_context.outputs, run_context.stage_results
+        # Fuori dal try: un checkpoint di un altro input non va marcato come fallito
+        if self.checkpoints:
+            self.checkpoints.start(run_id, blog_input.to_dict())
+            run_context.completed = self.checkpoints.load_stages(run_id)
+        try:
+            # Pipeline principale in catena, stage secondari in parallelo appena pronti i loro input
+            side_stages = self.side_stages()
+            scheduler = DAGScheduler(
+                {**STAGE_DEPENDENCIES,
+                 **{stage: [dep for dep in SIDE_STAGE_DEPENDENCIES[stage] if dep in STAGE_DEPENDENCIES or dep in side_stages]
+                    for stage in side_stages}},
+                max_workers=1 + self.input_manager.get_side_stages_config().get('max_parallel', 4),
+                optional=side_stages
             )
+            dag_report = scheduler.run(
+                lambda stage: self.execute_pipeline_stage(stage, blog_input, run_context, should_cancel, shared_context))
+            logger.info(f"Percorso critico: {' → '.join(dag_report['critical_path'])} "
+                        f"({dag_report['critical_path_seconds']:.1f}s su {dag_report['sequential_seconds']:.1f}s in sequenza)")
             
-            # Esegui generazione
-            result = crew.kickoff(inputs=blog_input.to_dict())
+            result = outputs['optimization']
+            self.save_intermediate_results(
+                {stage: stage_results[stage] if stage_results[stage] is not None else outputs[stage] for stage in outputs},
+                blog_input)
+            run_context.metrics.add('research', 'cache_hits',
+                                    run_context.search_stats['hits'] + run_context.search_stats['coalesced'])
+            
+            # Metriche SEO locali della bozza e dell'articolo finale
+            if self.input_manager.get_seo_analysis_config().get('enabled', False):
+                draft_article = strip_draft_notes(outputs['drafting'])
+                draft_report, final_report = self.create_seo_analyzer(blog_input, outputs).analyze_many(
+                    [draft_article, result])
+                run_context.seo_analysis.setdefault('draft', draft_report)
+                run_context.seo_analysis['final'] = final_report
+                run_context.seo_analysis['optimization_skipped'] = result == draft_article
+            
+            # Quota dei token di input serviti dalla prompt cache del provider
+            prompt_cache_report = {}
+            if self.input_manager.get_prompt_cache_config().get('report', True):
+                prompt_cache_report = cached_token_report(run_context.metrics.to_dict()['stages'])
+                if 'total' in prompt_cache_report:
+                    logger.info(f"Prompt cache del provider: {prompt_cache_report['total']['cached_ratio']:.0%} "
+                                f"dei token di input ({prompt_cache_report['total']['cached_prompt_tokens']} token)")
+            
+            # Token dei risultati di ricerca prima e dopo lo shaping (per le varianti, quelli della ricerca condivisa)
+            search_context = shared_context if shared_context is not None else run_context
+            search_shaping = search_context.result_shaper.report() if search_context.result_shaper else {}
+            if search_shaping.get('calls') and shared_context is None:
+                logger.info(f"Risultati di ricerca compattati: {search_shaping['tokens_before']} → "
+                            f"{search_shaping['tokens_after']} token (-{search_shaping['reduction']:.0%})")
             
             # Calcola tempo di esecuzione
-            execution_time = (datetime.now() - start_time).total_seconds()
+            execution_time = time.monotonic() - start_time
             
             # Genera analytics
-            analytics = self.generate_analytics_report(blog_input, execution_time)
+            analytics = self.generate_analytics_report(blog_input, execution_time, {
+                'run_id': run_id,
+                'tavily_cache': run_context.search_stats,
+                'search_shaping': search_shaping,
+                'streaming': run_context.streaming,
+                'context_tokens': run_context.context_tokens,
+                'seo_analysis': run_context.seo_analysis,
+                'stages_reused': run_context.reused_stages,
+                'stages_resumed': run_context.resumed_stages,
+                'stages_shared': run_context.shared_stages,
+                'shared_run_id': shared_context.run_id if shared_context is not None else None,
+                'knowledge_store': run_context.knowledge,
+                'rate_limits': LIMITERS.snapshot(),
+                'model_cascade': run_context.cascade,
+                'prompt_cache': prompt_cache_report,
+                'dag': dag_report,
+                'stage_metrics': run_context.metrics.to_dict()
+            })
             
+            if self.checkpoints:
+                self.checkpoints.set_status(run_id, 'completed')
+            self.export_metrics(run_context, blog_input, 'completed', execution_time)
+            self.archive_run(run_id, blog_input, 'completed', outputs, execution_time, result, analytics)
             logger.info(f"Generazione completata in {execution_time:.2f} secondi")
             
             return {
+                'run_id': run_id,
                 'result': result,
+                'stage_outputs': outputs,
+                'stage_results': stage_results,
+                'side_outputs': {stage: stage_results.get(stage) or outputs[stage]
+                                 for stage in SIDE_STAGES if stage in outputs},
                 'analytics': analytics,
                 'execution_time': execution_time
             }
             
         except Exception as e:
             logger.error(f"Errore durante la generazione: {e}")
+            status = 'cancelled' if isinstance(e, RunCancelled) else 'failed'
+            self.export_metrics(run_context, blog_input, status, time.monotonic() - start_time)
+            self.archive_run(run_id, blog_input, status, outputs, time.monotonic() - start_time, error=str(e))
+            if self.checkpoints:
+                self.checkpoints.set_status(run_id, status, str(e))
+                logger.info(f"Esecuzione riprendibile con: --resume {run_id}")
             raise
+    
+    def run_shared_stages(self, blog_input: BlogInput, run_id: str,
+                          should_cancel: Optional[Callable[[], bool]] = None) -> RunContext:
+        """Esegue una sola volta gli stage condivisi da tutte le varianti (ricerca e analisi)"""
+        start_time = time.monotonic()
+        run_context = RunContext(run_id=run_id, result_shaper=self.create_result_shaper())
+        if self.checkpoints:
+            self.checkpoints.start(run_id, blog_input.to_dict())
+            run_context.completed = self.checkpoints.load_stages(run_id)
+        try:
+            for stage in VARIANT_SHARED_STAGES:
+                self.execute_pipeline_stage(stage, blog_input, run_context, should_cancel)
+        except Exception as e:
+            status = 'cancelled' if isinstance(e, RunCancelled) else 'failed'
+            self.export_metrics(run_context, blog_input, status, time.monotonic() - start_time)
+            if self.checkpoints:
+                self.checkpoints.set_status(run_id, status, str(e))
+                logger.info(f"Esecuzione riprendibile con: --resume {run_id}")
+            raise
+        self.export_metrics(run_context, blog_input, 'completed', time.monotonic() - start_time)
+        return run_context
+    
+    def run_variants(self, blog_input: BlogInput, run_id: Optional[str] = None,
+                     should_cancel: Optional[Callable[[], bool]] = None) -> Dict[str, Any]:
+        """Esegue ricerca e analisi una volta, poi outline, stesura e ottimizzazione di ogni variante in parallelo"""
+        run_id = run_id or new_run_id()
+        variants = blog_input.variant_inputs()
+        start_time = time.monotonic()
+        logger.info(f"Avvio di {len(variants)} varianti per topic: {blog_input.topic} (run {run_id})")
+        
+        # Il checkpoint del run condiviso conserva l'input con le varianti: --resume riprende l'intero gruppo
+        shared_context = self.run_shared_stages(blog_input, run_id, should_cancel)
+        
+        max_parallel = max(1, self.input_manager.get_variants_config().get('max_parallel', 3))
+        results: Dict[str, Dict[str, Any]] = {}
+        failed: Dict[str, str] = {}
+        with ThreadPoolExecutor(max_workers=max_parallel, thread_name_prefix='variant') as pool:
+            futures = {
+                pool.submit(self.run, variant_input, f"{run_id}_{name}", should_cancel, shared_context): name
+                for name, variant_input in variants
+            }
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    failed[name] = str(e)
+                    logger.error(f"Variante {name} del run {run_id} fallita: {e}")
+        
+        if not results:
+            raise RuntimeError(f"Tutte le varianti del run {run_id} sono fallite: {failed}")
+        if self.checkpoints:
+            self.checkpoints.set_status(run_id, 'failed' if failed else 'completed',
+                                        json.dumps(failed, ensure_ascii=False) if failed else "")
+        execution_time = time.monotonic() - start_time
+        logger.info(f"{len(results)}/{len(variants)} varianti completate in {execution_time:.2f} secondi")
+        return {
+            'run_id': run_id,
+            'variants': {name: results[name] for name, _ in variants if name in results},
+            'inputs': {name: variant_input for name, variant_input in variants},
+            'failed': failed,
+            'shared_stages': VARIANT_SHARED_STAGES,
+            'shared_metrics': shared_context.metrics.to_dict(),
+            'execution_time': execution_time
+        }
 
 def setup_argument_parser() -> argparse.ArgumentParser:
     """Configura il parser degli argomenti della command line"""
@@ -309,8 +1281,17 @@ Esempi di utilizzo:
 3. Da file di configurazione:
    python blog_generator_enhanced.py --input-file config_articolo.yaml
 
-4. Genera template di input:
+4. Riprende un'esecuzione interrotta:
+   python blog_generator_enhanced.py --resume 20250101_120000_ab12cd34
+
+5. Genera template di input:
    python blog_generator_enhanced.py --generate-template
+
+6. Verifica input e configurazione senza chiamare le API:
+   python blog_generator_enhanced.py --input-file config_articolo.yaml --dry-run
+
+7. Batch da file JSONL/YAML con 8 worker:
+   python blog_generator_enhanced.py --batch-file articoli.jsonl --workers 8
         """
     )
     
@@ -333,6 +1314,18 @@ Esempi di utilizzo:
                        help="File YAML/JSON con configurazione completa")
     parser.add_argument("--generate-template", action="store_true",
                        help="Genera template di input")
+    parser.add_argument("--dry-run", action="store_true",
+                       help="Valida input e configurazione e mostra gli stage previsti senza chiamare le API")
+    parser.add_argument("--batch-file", type=str,
+                       help="File JSONL/YAML con un BlogInput per record da elaborare in batch")
+    parser.add_argument("--resume", type=str, metavar="RUN_ID",
+                       help="Riprende un'esecuzione interrotta dal primo stage non completato")
+    
+    # Opzioni batch
+    parser.add_argument("--workers", type=int,
+                       help="Numero di job batch eseguiti in parallelo (default da config.yaml)")
+    parser.add_argument("--executor", choices=["thread", "process"],
+                       help="Tipo di pool per il batch (default da config.yaml)")
     
     # Opzioni output
     parser.add_argument("--save", action="store_true", default=True,
@@ -341,6 +1334,12 @@ Esempi di utilizzo:
                        help="Directory di output")
     parser.add_argument("--config", type=str, default="config.yaml",
                        help="File di configurazione")
+    parser.add_argument("--stream", action="store_true",
+                       help="Mostra in tempo reale i token di drafting e optimization su stdout")
+    parser.add_argument("--metrics-jsonl", type=str,
+                       help="File JSONL a cui aggiungere le metriche per stage di ogni esecuzione")
+    parser.add_argument("--metrics-prom", type=str,
+                       help="File in formato testuale Prometheus con le metriche aggregate")
     
     return parser
 
@@ -349,49 +1348,110 @@ def main():
     parser = setup_argument_parser()
     args = parser.parse_args()
     
+    # Template e dry run non generano articoli: niente log su file
+    setup_logging(None if args.generate_template or args.dry_run else 'blog_generator.log')
+    
     try:
+        # Genera template se richiesto (basta la configurazione, non serve il generatore)
+        if args.generate_template:
+            InputManager(args.config).save_input_template()
+            print("Template di input generato: input_template.yaml")
+            return
+        
         # Inizializza il generatore
         generator = BlogGeneratorEnhanced(
             config_path=args.config,
             prompts_path="prompts.yaml"
         )
         
-        # Genera template se richiesto
-        if args.generate_template:
-            generator.input_manager.save_input_template()
-            print("Template di input generato: input_template.yaml")
+        if args.stream:
+            generator.input_manager.config.setdefault('streaming', {}).update({'enabled': True, 'stdout': True})
+        if args.metrics_jsonl:
+            generator.input_manager.config.setdefault('metrics', {})['jsonl_path'] = args.metrics_jsonl
+        if args.metrics_prom:
+            generator.input_manager.config.setdefault('metrics', {})['prometheus_path'] = args.metrics_prom
+        
+        # Dry run del batch: valida ogni record senza eseguire job
+        if args.batch_file and args.dry_run:
+            valid, invalid = 0, 0
+            for index, data in iter_batch_records(args.batch_file):
+                try:
+                    if isinstance(data, Exception):
+                        raise data
+                    generator.plan(BlogInput(**data))
+                    valid += 1
+                except Exception as e:
+                    invalid += 1
+                    print(f"❌ Record {index} non valido: {e}")
+            print(f"\n🧪 Dry run batch: {valid} record validi, {invalid} non validi")
             return
         
-        # Crea input in base alla modalità
-        if args.interactive:
-            blog_input = generator.input_manager.create_input_interactive()
-        elif args.input_file:
-            blog_input = generator.input_manager.create_input_from_file(args.input_file)
-        else:
-            blog_input = generator.input_manager.create_input_from_args(args)
-            if not blog_input.topic:
-                blog_input.topic = "Case Vacanza in Costiera Amalfitana 2025"  # Default
+        # Modalità batch: elabora tutti i record del file con un pool di worker
+        if args.batch_file:
+            runner = BatchRunner(
+                generator,
+                workers=args.workers,
+                executor=args.executor,
+                output_dir=args.output_dir
+            )
+            summary = runner.run(args.batch_file)
+            print(f"\n✅ Batch completato: {summary['succeeded']} riusciti, {summary['partial']} parziali, "
+                  f"{summary['failed']} falliti")
+            print(f"📋 Manifest salvato in: {summary['manifest']}")
+            print(f"\n⏱️  Tempo di esecuzione: {summary['execution_time']:.2f} secondi")
+            return
         
-        # Esegui generazione
-        logger.info("Avvio processo di generazione...")
-        result_data = generator.run(blog_input)
+        if args.resume:
+            # Riprende dal checkpoint: input e stage completati vengono dal run originale
+            blog_input, result_data = generator.resume(args.resume)
+        else:
+            # Crea input in base alla modalità
+            if args.interactive:
+                blog_input = generator.input_manager.create_input_interactive()
+            elif args.input_file:
+                blog_input = generator.input_manager.create_input_from_file(args.input_file)
+            else:
+                blog_input = generator.input_manager.create_input_from_args(args)
+                if not blog_input.topic:
+                    blog_input.topic = "Case Vacanza in Costiera Amalfitana 2025"  # Default
+            
+            if args.dry_run:
+                plan = generator.plan(blog_input)
+                print(f"\n🧪 Dry run per: {plan['topic']}")
+                for stage in plan['stages']:
+                    source = "cache" if stage['cached'] else stage['mode']
+                    print(f"  - {stage['stage']:<15} {stage['model']:<45} {source}")
+                if plan['variants']:
+                    print(f"  Varianti ({', '.join(plan['variants'])}): ricerca e analisi condivise, "
+                          f"gli altri stage eseguiti per ciascuna")
+                if plan['missing_keys']:
+                    print(f"⚠️  Variabili d'ambiente mancanti: {', '.join(plan['missing_keys'])}")
+                return
+            
+            # Esegui generazione
+            logger.info("Avvio processo di generazione...")
+            result_data = generator.run(blog_input)
         
         # Salva risultato
-        if args.save:
-            filename = generator.save_final_result(result_data['result'], blog_input)
-            print(f"\n✅ Articolo generato e salvato in: {filename}")
-            
-            # Salva analytics se abilitato
-            if result_data['analytics']:
-                analytics_file = filename.replace('.md', '_analytics.json')
-                with open(analytics_file, 'w', encoding='utf-8') as f:
-                    json.dump(result_data['analytics'], f, indent=2, ensure_ascii=False)
-                print(f"📊 Report analytics salvato in: {analytics_file}")
+        if args.save and 'variants' in result_data:
+            for name, files in generator.save_outputs(result_data, blog_input, args.output_dir).items():
+                print(f"\n✅ Variante {name} salvata in: {files['article']}")
+            for name, error in result_data['failed'].items():
+                print(f"\n❌ Variante {name} fallita: {error}")
+        elif args.save:
+            files = generator.save_outputs(result_data, blog_input, args.output_dir, result_data['run_id'])
+            print(f"\n✅ Articolo generato e salvato in: {files['article']}")
+            if 'analytics' in files:
+                print(f"📊 Report analytics salvato in: {files['analytics']}")
+            if 'archive' in files:
+                print(f"🗄️  Esecuzione archiviata in: {files['archive']} "
+                      f"(python run_archive.py show {result_data['run_id']})")
         else:
-            print("\n" + "="*50)
-            print("RISULTATO FINALE:")
-            print("="*50)
-            print(result_data['result'])
+            for name, data in result_data.get('variants', {'': result_data}).items():
+                print("\n" + "="*50)
+                print(f"RISULTATO FINALE{f' ({name})' if name else ''}:")
+                print("="*50)
+                print(data['result'])
         
         print(f"\n⏱️  Tempo di esecuzione: {result_data['execution_time']:.2f} secondi")
         
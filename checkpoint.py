@@ -0,0 +1,94 @@
+"""Checkpoint per Blog Generator
+Salvataggio crash-safe degli output di ogni stage per riprendere esecuzioni interrotte
+"""
+
+import json
+import os
+import uuid
+import logging
+from datetime import datetime
+from typing import Any, Dict
+from stage_cache import atomic_write_json
+
+logger = logging.getLogger(__name__)
+
+
+def new_run_id() -> str:
+    """Genera un identificativo univoco per un'esecuzione"""
+    return f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+
+
+def _comparable_input(input_dict: Dict[str, Any]) -> Dict[str, Any]:
+    """Input normalizzato come nel JSON salvato, senza i campi non impostati"""
+    return {key: value for key, value in json.loads(json.dumps(input_dict)).items() if value is not None}
+
+
+class CheckpointStore:
+    """Gestisce i checkpoint delle esecuzioni, una directory per run ID"""
+
+    def __init__(self, directory: str = ".checkpoints"):
+        self.directory = directory
+
+    def _run_dir(self, run_id: str) -> str:
+        return os.path.join(self.directory, run_id)
+
+    def exists(self, run_id: str) -> bool:
+        """Verifica se esiste un checkpoint per il run ID"""
+        return os.path.exists(os.path.join(self._run_dir(run_id), 'run.json'))
+
+    def start(self, run_id: str, input_dict: Dict[str, Any]) -> None:
+        """Registra l'input dell'esecuzione (se non già presente) e rifiuta di riprendere un run con input diverso"""
+        if self.exists(run_id):
+            if _comparable_input(self.load_run(run_id)['input']) != _comparable_input(input_dict):
+                raise ValueError(f"Il checkpoint del run {run_id} appartiene a un input diverso, impossibile riprenderlo")
+            self.set_status(run_id, 'running')
+            return
+        atomic_write_json(os.path.join(self._run_dir(run_id), 'run.json'), {
+            'run_id': run_id,
+            'input': input_dict,
+            'status': 'running',
+            'started_at': datetime.now().isoformat()
+        })
+
+    def set_status(self, run_id: str, status: str, error: str = "") -> None:
+        """Aggiorna lo stato dell'esecuzione (running, completed, failed)"""
+        run_data = self.load_run(run_id)
+        run_data['status'] = status
+        run_data['updated_at'] = datetime.now().isoformat()
+        if error:
+            run_data['error'] = error
+        atomic_write_json(os.path.join(self._run_dir(run_id), 'run.json'), run_data)
+
+    def load_run(self, run_id: str) -> Dict[str, Any]:
+        """Carica i metadati dell'esecuzione"""
+        path = os.path.join(self._run_dir(run_id), 'run.json')
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Nessun checkpoint trovato per il run {run_id}")
+        with open(path, 'r', encoding='utf-8') as file:
+            return json.load(file)
+
+    def save_stage(self, run_id: str, stage: str, output: str, parsed: Any = None) -> None:
+        """Salva l'output di uno stage completato, insieme al risultato tipizzato"""
+        atomic_write_json(os.path.join(self._run_dir(run_id), f"stage_{stage}.json"), {
+            'stage': stage,
+            'completed_at': datetime.now().isoformat(),
+            'output': output,
+            'parsed': parsed
+        })
+
+    def load_stages(self, run_id: str) -> Dict[str, str]:
+        """Carica gli output degli stage già completati"""
+        outputs = {}
+        run_dir = self._run_dir(run_id)
+        if not os.path.isdir(run_dir):
+            return outputs
+        for filename in os.listdir(run_dir):
+            if not (filename.startswith('stage_') and filename.endswith('.json')):
+                continue
+            try:
+                with open(os.path.join(run_dir, filename), 'r', encoding='utf-8') as file:
+                    data = json.load(file)
+                outputs[data['stage']] = data['output']
+            except (json.JSONDecodeError, KeyError) as e:
+                logger.warning(f"Checkpoint {filename} del run {run_id} non leggibile, lo stage verrà rieseguito: {e}")
+        return outputs
@@ -0,0 +1,32 @@
+"""Fixture comuni dei test per Blog Generator
+Generatore con configurazione del repository e archivi locali confinati nella directory temporanea del test
+"""
+
+import os
+
+import pytest
+import yaml
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+@pytest.fixture
+def make_generator(tmp_path):
+    """Crea un BlogGeneratorEnhanced che scrive solo in tmp_path (cache, checkpoint e archivi)"""
+    from blog_generator import BlogGeneratorEnhanced
+
+    def factory(**sections):
+        with open(os.path.join(ROOT, 'config.yaml'), 'r', encoding='utf-8') as file:
+            config = yaml.safe_load(file)
+        config['stage_cache'] = {'enabled': True, 'directory': str(tmp_path / 'stages')}
+        config['checkpoint'] = {'enabled': True, 'directory': str(tmp_path / 'checkpoints')}
+        config['search_cache'] = {'enabled': False}
+        config['knowledge_store'] = {'enabled': False}
+        config['archive'] = {'enabled': False}
+        config['rate_limits'] = {'enabled': False}
+        for name, values in sections.items():
+            config.setdefault(name, {}).update(values)
+        return BlogGeneratorEnhanced(os.path.join(ROOT, 'config.yaml'), os.path.join(ROOT, 'prompts.yaml'),
+                                     config=config)
+
+    return factory
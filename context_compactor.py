@@ -0,0 +1,135 @@
+"""Context Compactor per Blog Generator
+Riduce il contesto passato tra gli stage entro un budget di token stimato localmente
+"""
+
+import json
+import re
+import logging
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CONTEXT_SEPARATOR = "\n\n----------\n\n"
+TRUNCATION_MARKER = "\n[... contenuto ridotto per limite di contesto ...]"
+
+_JSON_FENCE_RE = re.compile(r"```(?:json)?\s*\n(.*?)```", re.DOTALL)
+
+
+@lru_cache(maxsize=1)
+def _get_encoding():
+    """Carica l'encoding tiktoken alla prima stima (None se tiktoken non è disponibile)"""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("o200k_base")
+    except Exception:  # tiktoken opzionale: in sua assenza si usa una stima per caratteri
+        return None
+
+
+def estimate_tokens(text: str) -> int:
+    """Stima i token di un testo (tiktoken se disponibile, altrimenti ~4 caratteri per token)"""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return max(1, len(text) // 4)
+
+
+def truncate_to_budget(text: str, max_tokens: int) -> str:
+    """Tronca il testo entro il budget di token, segnalando il taglio"""
+    tokens = estimate_tokens(text)
+    if tokens <= max_tokens:
+        return text
+    if max_tokens <= 0:
+        return ""
+    keep_chars = int(len(text) * max_tokens / tokens)
+    return text[:keep_chars].rstrip() + TRUNCATION_MARKER
+
+
+def parse_json_output(text: str) -> Optional[Any]:
+    """Estrae il JSON dall'output di un agente (anche racchiuso in un blocco di codice)"""
+    match = _JSON_FENCE_RE.search(text)
+    candidate = match.group(1) if match else text
+    try:
+        return json.loads(candidate)
+    except json.JSONDecodeError:
+        start, end = candidate.find('{'), candidate.rfind('}')
+        if start == -1 or end <= start:
+            return None
+        try:
+            return json.loads(candidate[start:end + 1])
+        except json.JSONDecodeError:
+            return None
+
+
+def _shorten(value: Any, max_chars: int) -> Any:
+    if isinstance(value, str) and len(value) > max_chars:
+        return value[:max_chars].rstrip() + "…"
+    if isinstance(value, dict):
+        return {key: _shorten(item, max_chars) for key, item in value.items()}
+    return value
+
+
+def distill_research(research_text: str, max_facts: int = 15, max_sources: int = 10,
+                     max_keywords: int = 10, max_chars: int = 300) -> Optional[str]:
+    """Riduce il report di ricerca a un digest di fatti, fonti e keyword"""
+    data = parse_json_output(research_text)
+    if not isinstance(data, dict):
+        return None
+
+    sources = []
+    raw_sources = data.get('sources')
+    for source in (raw_sources if isinstance(raw_sources, list) else [])[:max_sources]:
+        if isinstance(source, dict):
+            sources.append({key: source[key] for key in ('url', 'title', 'titolo', 'data', 'date') if key in source})
+        else:
+            sources.append(_shorten(source, max_chars))
+
+    keywords = data.get('keywords', {})
+    if isinstance(keywords, dict):
+        keywords = {group: values[:max_keywords] if isinstance(values, list) else values
+                    for group, values in keywords.items()}
+    elif isinstance(keywords, list):
+        keywords = keywords[:max_keywords]
+
+    facts = data.get('facts')
+    digest = {
+        'facts': [_shorten(fact, max_chars) for fact in (facts if isinstance(facts, list) else [])[:max_facts]],
+        'sources': sources,
+        'keywords': keywords,
+        'opportunities': [_shorten(item, max_chars) for item in data.get('opportunities', [])[:5]]
+        if isinstance(data.get('opportunities'), list) else _shorten(data.get('opportunities', ''), max_chars)
+    }
+    return json.dumps(digest, ensure_ascii=False, separators=(',', ':'))
+
+
+def compact_context(stage_outputs: List[Tuple[str, str]], budget: int,
+                    digest_limits: Optional[Dict[str, int]] = None) -> str:
+    """Compatta il contesto: lo stage immediatamente precedente resta sempre integro,
+    la ricerca diventa un digest e gli altri stage si dividono il budget rimanente"""
+    if not stage_outputs:
+        return ""
+
+    parts = []
+    for name, text in stage_outputs[:-1]:
+        if name == 'research':
+            text = distill_research(text, **(digest_limits or {})) or text
+        parts.append([name, text])
+    primary_name, primary_text = stage_outputs[-1]
+
+    if budget and budget > 0:
+        # L'output principale (es. la bozza da ottimizzare) non viene mai tagliato: si riducono solo gli altri stage
+        if estimate_tokens(primary_text) > budget:
+            logger.warning(f"L'output di {primary_name} supera da solo il budget di contesto ({budget} token): "
+                           f"viene passato integro senza il contesto degli altri stage")
+        remaining = budget - estimate_tokens(primary_text)
+        # Assegna il budget partendo dagli stage più brevi, ridistribuendo la quota non usata
+        order = sorted(range(len(parts)), key=lambda i: estimate_tokens(parts[i][1]))
+        for position, index in enumerate(order):
+            share = max(remaining // (len(order) - position), 0)
+            parts[index][1] = truncate_to_budget(parts[index][1], share)
+            remaining -= estimate_tokens(parts[index][1])
+
+    texts = [text for _, text in parts if text] + [primary_text]
+    return CONTEXT_SEPARATOR.join(texts)
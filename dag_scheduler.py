@@ -0,0 +1,115 @@
+"""DAG Scheduler per Blog Generator
+Esegue gli stage secondo le dipendenze dichiarate: quelli indipendenti girano in parallelo e la latenza
+totale segue il percorso critico
+"""
+
+import time
+import logging
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, List
+
+logger = logging.getLogger(__name__)
+
+
+def topological_order(dependencies: Dict[str, List[str]]) -> List[str]:
+    """Ordina gli stage rispettando le dipendenze (a parità, nell'ordine di dichiarazione)"""
+    for stage, inputs in dependencies.items():
+        unknown = [dep for dep in inputs if dep not in dependencies]
+        if unknown:
+            raise ValueError(f"Lo stage {stage} dipende da stage non definiti: {', '.join(unknown)}")
+    order: List[str] = []
+    remaining = dict(dependencies)
+    while remaining:
+        ready = [stage for stage, inputs in remaining.items() if all(dep in order for dep in inputs)]
+        if not ready:
+            raise ValueError(f"Dipendenze cicliche tra gli stage: {', '.join(remaining)}")
+        order.extend(ready)
+        for stage in ready:
+            del remaining[stage]
+    return order
+
+
+def critical_path(dependencies: Dict[str, List[str]], timings: Dict[str, Dict[str, float]]) -> List[str]:
+    """Catena di stage che ha determinato la fine dell'esecuzione (a ritroso dalla dipendenza finita per ultima)"""
+    if not timings:
+        return []
+    stage = max(timings, key=lambda name: timings[name]['end'])
+    path = [stage]
+    while True:
+        inputs = [dep for dep in dependencies[stage] if dep in timings]
+        if not inputs:
+            return path[::-1]
+        stage = max(inputs, key=lambda name: timings[name]['end'])
+        path.append(stage)
+
+
+class DAGScheduler:
+    """Grafo di stage con dipendenze dichiarate; gli stage opzionali possono fallire senza fermare gli altri"""
+
+    def __init__(self, dependencies: Dict[str, List[str]], max_workers: int = 4,
+                 optional: Iterable[str] = ()):
+        self.dependencies = dependencies
+        self.order = topological_order(dependencies)
+        self.max_workers = max(1, max_workers)
+        self.optional = set(optional)
+
+    def run(self, execute: Callable[[str], Any]) -> Dict[str, Any]:
+        """Esegue tutti gli stage e restituisce tempi, percorso critico e stage falliti o saltati"""
+        start = time.monotonic()
+        timings: Dict[str, Dict[str, float]] = {}
+        done: List[str] = []
+        failed: Dict[str, str] = {}
+        skipped: List[str] = []
+        pending = list(self.order)
+        running: Dict[Future, str] = {}
+
+        def timed(stage: str) -> None:
+            stage_start = time.monotonic() - start
+            try:
+                execute(stage)
+            finally:
+                timings[stage] = {'start': round(stage_start, 3), 'end': round(time.monotonic() - start, 3)}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='dag') as pool:
+            while pending or running:
+                # Salta gli stage che dipendono da uno stage opzionale fallito o saltato
+                for stage in list(pending):
+                    if any(dep in failed or dep in skipped for dep in self.dependencies[stage]):
+                        pending.remove(stage)
+                        skipped.append(stage)
+                        logger.warning(f"Stage {stage} saltato: dipende da uno stage non completato")
+
+                for stage in [stage for stage in pending if all(dep in done for dep in self.dependencies[stage])]:
+                    pending.remove(stage)
+                    running[pool.submit(timed, stage)] = stage
+
+                if not running:
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    stage = running.pop(future)
+                    try:
+                        future.result()
+                        done.append(stage)
+                    except Exception as e:
+                        if stage not in self.optional:
+                            # Gli stage già avviati terminano, quelli non ancora partiti non vengono eseguiti
+                            for other in running:
+                                other.cancel()
+                            raise
+                        failed[stage] = str(e)
+                        logger.warning(f"Stage opzionale {stage} fallito, l'esecuzione continua: {e}")
+
+        path = critical_path(self.dependencies, {stage: timings[stage] for stage in done})
+        total = time.monotonic() - start
+        for stage in timings:
+            timings[stage]['seconds'] = round(timings[stage]['end'] - timings[stage]['start'], 3)
+        return {
+            'timings': timings,
+            'critical_path': path,
+            'critical_path_seconds': round(sum(timings[stage]['seconds'] for stage in path), 3),
+            'sequential_seconds': round(sum(timing['seconds'] for timing in timings.values()), 3),
+            'total_seconds': round(total, 3),
+            'failed': failed,
+            'skipped': skipped
+        }
@@ -4,8 +4,9 @@ Gestisce input completi e configurazioni avanzate
 
 import yaml
 import json
-from typing import Dict, Any, Optional
-from dataclasses import dataclass, asdict
+import re
+from typing import Dict, Any, List, Optional, Tuple
+from dataclasses import dataclass, asdict, fields, replace
 import logging
 
 logger = logging.getLogger(__name__)
@@ -23,10 +24,15 @@ class BlogInput:
     word_count: int = 2000
     include_cta: bool = True
     seo_focus: bool = True
+    # Varianti dello stesso topic (es. [{"name": "casual", "tone": "casual"}]): ricerca e analisi condivise
+    variants: Optional[List[Dict[str, Any]]] = None
 
     def to_dict(self) -> Dict[str, Any]:
-        """Converte l'input in dizionario per i prompt"""
-        return asdict(self)
+        """Converte l'input in dizionario per i prompt (senza variants se non indicate)"""
+        data = asdict(self)
+        if data['variants'] is None:
+            del data['variants']
+        return data
 
     def validate(self) -> bool:
         """Valida gli input obbligatori"""
@@ -35,14 +41,36 @@ class BlogInput:
             if not getattr(self, field):
                 logger.error(f"Campo obbligatorio mancante: {field}")
                 return False
+        allowed = {item.name for item in fields(self)} - {'topic', 'variants'} | {'name'}
+        for index, overrides in enumerate(self.variants or []):
+            if not isinstance(overrides, dict):
+                logger.error(f"Variante {index + 1} non valida: attesi campi da sovrascrivere")
+                return False
+            invalid = sorted(set(overrides) - allowed)
+            if invalid:
+                logger.error(f"Variante {index + 1}: campi non sovrascrivibili {', '.join(invalid)}")
+                return False
         return True
 
+    def variant_inputs(self) -> List[Tuple[str, 'BlogInput']]:
+        """Input di ciascuna variante (nome, input base con i campi sovrascritti)"""
+        inputs = []
+        for index, overrides in enumerate(self.variants or []):
+            overrides = dict(overrides)
+            name = str(overrides.pop('name', '') or f"v{index + 1}")
+            name = re.sub(r'[^a-z0-9_-]+', '-', name.lower()).strip('-') or f"v{index + 1}"
+            if name in dict(inputs):
+                name = f"{name}-{index + 1}"
+            inputs.append((name, replace(self, variants=None, **overrides)))
+        return inputs
+
 class InputManager:
     """Gestisce la configurazione e gli input del sistema"""
     
-    def __init__(self, config_path: str = "config.yaml"):
+    def __init__(self, config_path: str = "config.yaml", config: Optional[Dict[str, Any]] = None):
         self.config_path = config_path
-        self.config = self.load_config()
+        # Una configurazione già caricata (es. con override da CLI) ha la precedenza sul file
+        self.config = config if config is not None else self.load_config()
     
     def load_config(self) -> Dict[str, Any]:
         """Carica la configurazione dal file YAML"""
@@ -61,21 +89,160 @@ class InputManager:
         return {
             'models': {
                 'research': 'gpt-4o-mini',
-                'outline': 'gpt-4o',
-                'drafting': 'gpt-4o',
-                'optimization': 'gpt-4o',
-                'analysis': 'gpt-4o-mini'
+                'outline': ['gpt-4o-mini', 'gpt-4o'],
+                'drafting': ['gpt-4o-mini', 'gpt-4o'],
+                'optimization': ['gpt-4o-mini', 'gpt-4o'],
+                'analysis': 'gpt-4o-mini',
+                'meta_tags': 'gpt-4o-mini',
+                'faq': 'gpt-4o-mini',
+                'internal_links': 'gpt-4o-mini',
+                'schema': 'gpt-4o-mini'
+            },
+            'validation': {
+                'required_keys': {'research': ['facts', 'sources', 'keywords']},
+                'min_outline_sections': 3,
+                'word_count_min_ratio': 0.7,
+                'word_count_max_ratio': 1.6,
+                'max_stage_attempts': 2,
+                'max_repairs': 1,
+                'fail_on_invalid': ['research', 'analysis', 'outline']
+            },
+            'llm': {
+                'base_url': 'https://openrouter.ai/api/v1',
+                'http2': True,
+                'max_connections': 20,
+                'max_keepalive_connections': 10,
+                'timeout': 120
             },
             'seo_config': {
                 'keyword_density': {'primary': 1.5, 'secondary': 0.8},
-                'readability_target': 65,
+                'readability_index': 'gulpease',
+                'readability_target': 60,
                 'internal_links_min': 3,
-                'external_links_min': 5
+                'external_links_min': 5,
+                'meta_title_max': 60,
+                'meta_desc_max': 155,
+                'keyword_density_tolerance': 0.5,
+                'word_count_tolerance': 0.1
+            },
+            'seo_analysis': {
+                'enabled': True,
+                'mode': 'gate'
             },
             'output': {
                 'save_intermediate': True,
                 'generate_analytics': True,
                 'format': 'markdown'
+            },
+            'variants': {
+                'max_parallel': 3
+            },
+            'side_stages': {
+                'enabled': False,
+                'stages': ['meta_tags', 'faq', 'internal_links', 'schema'],
+                'max_parallel': 4
+            },
+            'daemon': {
+                'host': '127.0.0.1',
+                'port': 8765,
+                'workers': 4,
+                'queue_path': '.queue/jobs.sqlite',
+                'poll_interval_seconds': 2.0,
+                'lease_seconds': 60,
+                'output_dir': 'output',
+                'max_body_bytes': 1048576,
+                'auth_token': ''
+            },
+            'context_compaction': {
+                'enabled': True,
+                'budgets': {
+                    'analysis': 8000,
+                    'outline': 6000,
+                    'drafting': 8000,
+                    'optimization': 10000,
+                    'meta_tags': 3000,
+                    'faq': 4000,
+                    'internal_links': 3000,
+                    'schema': 3000
+                },
+                'research_digest': {
+                    'max_facts': 15,
+                    'max_sources': 10,
+                    'max_keywords': 10
+                }
+            },
+            'drafting': {
+                'mode': 'single',
+                'max_parallel_sections': 4,
+                'stitch_model': 'gpt-4o-mini'
+            },
+            'streaming': {
+                'enabled': False,
+                'stages': ['drafting', 'optimization'],
+                'stdout': False,
+                'write_file': True,
+                'directory': 'stream'
+            },
+            'prompt_cache': {
+                'split_templates': True,
+                'report': True
+            },
+            'tavily': {
+                'max_parallel_queries': 5,
+                'result_shaping': {
+                    'enabled': True,
+                    'max_tokens_per_result': 120,
+                    'fields': ['title', 'url', 'content', 'score', 'published_date'],
+                    'dedupe': True,
+                    'min_score': 0.0
+                }
+            },
+            'search_cache': {
+                'enabled': True,
+                'path': '.cache/tavily_cache.sqlite',
+                'ttl_hours': 72,
+                'max_entries': 5000
+            },
+            'stage_cache': {
+                'enabled': True,
+                'directory': '.cache/stages'
+            },
+            'checkpoint': {
+                'enabled': True,
+                'directory': '.checkpoints'
+            },
+            'archive': {
+                'enabled': True,
+                'path': '.archive/runs.sqlite',
+                'compression_level': 6,
+                'loose_files': False
+            },
+            'knowledge_store': {
+                'enabled': True,
+                'path': '.cache/knowledge.sqlite',
+                'max_age_days': 30,
+                'similarity_threshold': 0.5,
+                'max_prior_topics': 3,
+                'max_prior_facts': 20,
+                'max_results': 10
+            },
+            'rate_limits': {
+                'enabled': True,
+                'retry': {'max_attempts': 5, 'base_delay_seconds': 1.0, 'max_delay_seconds': 60.0},
+                'providers': {
+                    'openrouter': {'requests_per_second': 2.0, 'burst': 4, 'max_concurrency': 8},
+                    'tavily': {'requests_per_second': 5.0, 'burst': 10, 'max_concurrency': 10,
+                               'latency_target_seconds': 15}
+                }
+            },
+            'metrics': {
+                'jsonl_path': '',
+                'prometheus_path': ''
+            },
+            'batch': {
+                'workers': 4,
+                'executor': 'thread',
+                'queue_factor': 2
             }
         }
     
@@ -156,17 +323,98 @@ class InputManager:
         )
     
     def get_model_config(self, agent_type: str) -> str:
-        """Ottiene la configurazione del modello per un agente specifico"""
-        return self.config.get('models', {}).get(agent_type, 'gpt-4o')
+        """Ottiene la configurazione del modello per un agente specifico (il primo della cascata)"""
+        return self.get_model_cascade(agent_type)[0]
+    
+    def get_model_cascade(self, agent_type: str) -> List[str]:
+        """Ottiene i modelli di un agente in ordine di escalation (un modello singolo o una lista)"""
+        models = self.config.get('models', {}).get(agent_type) or 'gpt-4o'
+        return [models] if isinstance(models, str) else list(models)
+    
+    def get_validation_config(self) -> Dict[str, Any]:
+        """Ottiene la configurazione della validazione degli output degli stage"""
+        return self.config.get('validation', {})
+    
+    def get_llm_config(self) -> Dict[str, Any]:
+        """Ottiene la configurazione dei client LLM (endpoint e connessioni)"""
+        return self.config.get('llm', {})
     
     def get_seo_config(self) -> Dict[str, Any]:
         """Ottiene la configurazione SEO"""
         return self.config.get('seo_config', {})
     
+    def get_seo_analysis_config(self) -> Dict[str, Any]:
+        """Ottiene la configurazione dell'analisi SEO locale"""
+        return self.config.get('seo_analysis', {})
+    
     def get_output_config(self) -> Dict[str, Any]:
         """Ottiene la configurazione di output"""
         return self.config.get('output', {})
     
+    def get_stage_cache_config(self) -> Dict[str, Any]:
+        """Ottiene la configurazione della cache degli output degli stage"""
+        return self.config.get('stage_cache', {})
+    
+    def get_checkpoint_config(self) -> Dict[str, Any]:
+        """Ottiene la configurazione dei checkpoint per stage"""
+        return self.config.get('checkpoint', {})
+    
+    def get_archive_config(self) -> Dict[str, Any]:
+        """Ottiene la configurazione dell'archivio delle esecuzioni"""
+        return self.config.get('archive', {})
+    
+    def get_knowledge_store_config(self) -> Dict[str, Any]:
+        """Ottiene la configurazione del knowledge store delle ricerche"""
+        return self.config.get('knowledge_store', {})
+    
+    def get_rate_limits_config(self) -> Dict[str, Any]:
+        """Ottiene la configurazione dei rate limit per provider e modello"""
+        return self.config.get('rate_limits', {})
+    
+    def get_metrics_config(self) -> Dict[str, Any]:
+        """Ottiene la configurazione dell'export delle metriche"""
+        return self.config.get('metrics', {})
+    
+    def get_batch_config(self) -> Dict[str, Any]:
+        """Ottiene la configurazione della modalità batch"""
+        return self.config.get('batch', {})
+    
+    def get_variants_config(self) -> Dict[str, Any]:
+        """Ottiene la configurazione delle varianti di un input"""
+        return self.config.get('variants', {})
+    
+    def get_side_stages_config(self) -> Dict[str, Any]:
+        """Ottiene la configurazione degli stage SEO secondari eseguiti in parallelo"""
+        return self.config.get('side_stages', {})
+    
+    def get_daemon_config(self) -> Dict[str, Any]:
+        """Ottiene la configurazione del worker residente e della coda dei job"""
+        return self.config.get('daemon', {})
+    
+    def get_context_compaction_config(self) -> Dict[str, Any]:
+        """Ottiene la configurazione della compattazione del contesto tra stage"""
+        return self.config.get('context_compaction', {})
+    
+    def get_drafting_config(self) -> Dict[str, Any]:
+        """Ottiene la configurazione della stesura (unica chiamata o per sezioni)"""
+        return self.config.get('drafting', {})
+    
+    def get_streaming_config(self) -> Dict[str, Any]:
+        """Ottiene la configurazione dello streaming dei token"""
+        return self.config.get('streaming', {})
+    
+    def get_prompt_cache_config(self) -> Dict[str, Any]:
+        """Ottiene la configurazione del layout dei prompt per la prompt cache del provider"""
+        return self.config.get('prompt_cache', {})
+    
+    def get_tavily_config(self) -> Dict[str, Any]:
+        """Ottiene la configurazione delle ricerche Tavily"""
+        return self.config.get('tavily', {})
+    
+    def get_search_cache_config(self) -> Dict[str, Any]:
+        """Ottiene la configurazione della cache delle ricerche Tavily"""
+        return self.config.get('search_cache', {})
+    
     def save_input_template(self, filename: str = "input_template.yaml") -> None:
         """Salva un template di input per riferimento"""
         template = BlogInput(
@@ -180,6 +428,6 @@ class InputManager:
         )
         
         with open(filename, 'w', encoding='utf-8') as file:
-            yaml.dump(asdict(template), file, default_flow_style=False, allow_unicode=True)
+            yaml.dump(template.to_dict(), file, default_flow_style=False, allow_unicode=True)
         
         logger.info(f"Template di input salvato in {filename}")
@@ -0,0 +1,176 @@
+"""Job Queue per Blog Generator
+Coda persistente (SQLite) dei job di generazione con priorità, cancellazione e stato interrogabile
+"""
+
+import json
+import os
+import sqlite3
+import time
+import logging
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+JOB_STATUSES = ('queued', 'running', 'completed', 'failed', 'cancelled')
+_COLUMNS = ('id', 'run_id', 'status', 'priority', 'topic', 'input', 'output_dir', 'result', 'error',
+            'cancel_requested', 'attempts', 'created_at', 'started_at', 'finished_at', 'owner', 'lease_expires')
+
+
+class JobQueue:
+    """Job ordinati per priorità (più alta prima) e anzianità; sopravvivono al riavvio del worker
+
+    Un job preso in carico appartiene a un owner (host:pid) finché ne rinnova il lease: solo i job con
+    lease scaduto (worker terminato) vengono rimessi in coda, anche se più daemon condividono la coda.
+    """
+
+    def __init__(self, path: str, lease_seconds: float = 60.0):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, run_id TEXT UNIQUE, status TEXT, priority INTEGER, "
+                "topic TEXT, input TEXT, output_dir TEXT, result TEXT, error TEXT, "
+                "cancel_requested INTEGER DEFAULT 0, attempts INTEGER DEFAULT 0, "
+                "created_at REAL, started_at REAL, finished_at REAL, owner TEXT, lease_expires REAL)"
+            )
+            # Code create prima dei lease: aggiunge le colonne mancanti
+            existing = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, column_type in (('owner', 'TEXT'), ('lease_expires', 'REAL')):
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {column_type}")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_queue ON jobs(status, priority DESC, id)")
+
+    def _connect(self) -> sqlite3.Connection:
+        """Apre una connessione dedicata (sicura tra thread e processi)"""
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    @staticmethod
+    def _to_dict(row: Any) -> Dict[str, Any]:
+        job = dict(zip(_COLUMNS, row))
+        for name in ('input', 'result'):
+            job[name] = json.loads(job[name]) if job[name] else None
+        job['cancel_requested'] = bool(job['cancel_requested'])
+        return job
+
+    def submit(self, run_id: str, input_dict: Dict[str, Any], output_dir: str, priority: int = 0) -> Dict[str, Any]:
+        """Accoda un job e lo restituisce"""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO jobs (run_id, status, priority, topic, input, output_dir, created_at) "
+                "VALUES (?, 'queued', ?, ?, ?, ?, ?)",
+                (run_id, priority, input_dict.get('topic'), json.dumps(input_dict, ensure_ascii=False),
+                 output_dir, time.time())
+            )
+            job_id = cursor.lastrowid
+        logger.info(f"Job {job_id} accodato (run {run_id}, priorità {priority}): {input_dict.get('topic')}")
+        return self.get(job_id)
+
+    def claim(self, owner: str) -> Optional[Dict[str, Any]]:
+        """Prende in carico il prossimo job in coda (atomico anche tra più processi worker)"""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE status = 'queued' ORDER BY priority DESC, id LIMIT 1"
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            now = time.time()
+            conn.execute(
+                "UPDATE jobs SET status = 'running', started_at = ?, attempts = attempts + 1, owner = ?, "
+                "lease_expires = ? WHERE id = ?",
+                (now, owner, now + self.lease_seconds, row[0])
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return self.get(row[0])
+
+    def heartbeat(self, owner: str, job_ids: List[int]) -> int:
+        """Rinnova il lease dei job in esecuzione dell'owner; restituisce quanti sono ancora suoi"""
+        if not job_ids:
+            return 0
+        with self._connect() as conn:
+            cursor = conn.execute(
+                f"UPDATE jobs SET lease_expires = ? WHERE owner = ? AND status = 'running' "
+                f"AND id IN ({','.join('?' for _ in job_ids)})",
+                [time.time() + self.lease_seconds, owner] + list(job_ids)
+            )
+        return cursor.rowcount
+
+    def finish(self, job_id: int, status: str, result: Optional[Dict[str, Any]] = None, error: str = "",
+               owner: Optional[str] = None) -> bool:
+        """Registra l'esito di un job preso in carico (ignorato se nel frattempo è passato a un altro owner)"""
+        query = "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, lease_expires = NULL WHERE id = ?"
+        params: List[Any] = [status, json.dumps(result, ensure_ascii=False, default=str) if result is not None else None,
+                             error or None, time.time(), job_id]
+        if owner is not None:
+            query += " AND owner = ? AND status = 'running'"
+            params.append(owner)
+        with self._connect() as conn:
+            cursor = conn.execute(query, params)
+        if not cursor.rowcount:
+            logger.warning(f"Esito del job {job_id} ignorato: il job non appartiene più a {owner}")
+        return bool(cursor.rowcount)
+
+    def cancel(self, job_id: int) -> Optional[Dict[str, Any]]:
+        """Annulla un job in coda; per un job in esecuzione richiede l'interruzione al prossimo stage"""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ? AND status = 'queued'",
+                (time.time(), job_id)
+            )
+            conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = 'running'", (job_id,))
+        return self.get(job_id)
+
+    def is_cancel_requested(self, job_id: int) -> bool:
+        with self._connect() as conn:
+            row = conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def get(self, job_id: int) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute(f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def list(self, status: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """Job più recenti, filtrabili per stato (senza input e risultato, per risposte leggere)"""
+        query = "SELECT id, run_id, status, priority, topic, error, created_at, started_at, finished_at FROM jobs"
+        params: List[Any] = []
+        if status:
+            query += " WHERE status = ?"
+            params.append(status)
+        with self._connect() as conn:
+            rows = conn.execute(query + " ORDER BY id DESC LIMIT ?", params + [limit]).fetchall()
+        names = ('id', 'run_id', 'status', 'priority', 'topic', 'error', 'created_at', 'started_at', 'finished_at')
+        return [dict(zip(names, row)) for row in rows]
+
+    def counts(self) -> Dict[str, int]:
+        with self._connect() as conn:
+            counts = dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        return {status: counts.get(status, 0) for status in JOB_STATUSES}
+
+    def requeue_expired(self) -> int:
+        """Rimette in coda i job il cui owner ha smesso di rinnovare il lease (ripresi dai checkpoint)"""
+        now = time.time()
+        expired = "status = 'running' AND (lease_expires IS NULL OR lease_expires < ?)"
+        with self._connect() as conn:
+            conn.execute(
+                f"UPDATE jobs SET status = 'cancelled', finished_at = ?, lease_expires = NULL "
+                f"WHERE {expired} AND cancel_requested = 1",
+                (now, now)
+            )
+            cursor = conn.execute(
+                f"UPDATE jobs SET status = 'queued', started_at = NULL, owner = NULL, lease_expires = NULL WHERE {expired}",
+                (now,)
+            )
+        return cursor.rowcount
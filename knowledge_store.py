@@ -0,0 +1,231 @@
+"""Knowledge Store per Blog Generator
+Archivio locale (SQLite FTS5) di fatti, fonti e keyword delle ricerche passate, con indice MinHash dei topic
+"""
+
+import hashlib
+import json
+import os
+import random
+import re
+import sqlite3
+import time
+import logging
+from typing import Any, Dict, List, Optional
+
+from context_compactor import parse_json_output
+
+logger = logging.getLogger(__name__)
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_NORMALIZE_RE = re.compile(r"[^\w\s]", re.UNICODE)
+# Parole che non distinguono un topic dall'altro (articoli, preposizioni, anni)
+_TOPIC_STOPWORDS = {
+    'il', 'lo', 'la', 'i', 'gli', 'le', 'un', 'uno', 'una', 'di', 'a', 'da', 'in', 'con', 'su', 'per',
+    'tra', 'fra', 'e', 'o', 'del', 'della', 'dei', 'delle', 'degli', 'al', 'alla', 'ai', 'alle',
+    'nel', 'nella', 'nei', 'nelle', 'come', 'cosa', 'guida', 'migliori', 'the', 'and', 'of', 'for'
+}
+
+
+def topic_shingles(topic: str, size: int = 4) -> List[str]:
+    """Shingle di caratteri del topic normalizzato (minuscole, senza punteggiatura, stopword e anni)"""
+    words = [word for word in _NORMALIZE_RE.sub(' ', topic.lower()).split()
+             if word not in _TOPIC_STOPWORDS and not re.fullmatch(r"(19|20)\d\d", word)]
+    text = ' '.join(words)
+    if len(text) <= size:
+        return [text] if text else []
+    return sorted({text[i:i + size] for i in range(len(text) - size + 1)})
+
+
+class MinHasher:
+    """Firme MinHash per stimare la similarità di Jaccard tra insiemi di shingle"""
+
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self._params = [(rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+                        for _ in range(num_perm)]
+
+    def signature(self, shingles: List[str]) -> List[int]:
+        """Calcola la firma (un minimo per permutazione)"""
+        if not shingles:
+            return [_MAX_HASH] * self.num_perm
+        hashes = [int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=8).digest(), 'big')
+                  for s in shingles]
+        return [min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes) for a, b in self._params]
+
+    @staticmethod
+    def similarity(first: List[int], second: List[int]) -> float:
+        """Similarità di Jaccard stimata da due firme"""
+        if not first or len(first) != len(second):
+            return 0.0
+        return sum(1 for a, b in zip(first, second) if a == b) / len(first)
+
+
+class KnowledgeStore:
+    """Fatti, fonti e keyword estratti dagli output di ricerca, cercabili per testo e per topic simile"""
+
+    def __init__(self, path: str, max_age_days: float = 30, num_perm: int = 64, bands: int = 16,
+                 similarity_threshold: float = 0.5):
+        if num_perm % bands:
+            raise ValueError("num_perm deve essere multiplo di bands")
+        self.path = path
+        self.max_age_seconds = max_age_days * 86400
+        self.hasher = MinHasher(num_perm)
+        self.bands = bands
+        self.similarity_threshold = similarity_threshold
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS research ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, topic TEXT, run_id TEXT, "
+                "signature TEXT, keywords TEXT, created_at REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_research_created ON research(created_at)")
+            conn.execute("CREATE TABLE IF NOT EXISTS topic_bands (band INTEGER, bucket TEXT, research_id INTEGER)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_topic_bands ON topic_bands(band, bucket)")
+            try:
+                conn.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS knowledge USING fts5("
+                    "content, kind UNINDEXED, url UNINDEXED, research_id UNINDEXED, tokenize='unicode61 remove_diacritics 2')"
+                )
+                self.full_text = True
+            except sqlite3.OperationalError:
+                logger.warning("SQLite senza FTS5, la ricerca nel knowledge store userà LIKE")
+                conn.execute("CREATE TABLE IF NOT EXISTS knowledge (content TEXT, kind TEXT, url TEXT, research_id INTEGER)")
+                self.full_text = False
+
+    def _connect(self) -> sqlite3.Connection:
+        """Apre una connessione dedicata (sicura tra thread e processi)"""
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _bands(self, signature: List[int]) -> List[str]:
+        rows = len(signature) // self.bands
+        return [hashlib.sha1(json.dumps(signature[i * rows:(i + 1) * rows]).encode('utf-8')).hexdigest()[:16]
+                for i in range(self.bands)]
+
+    def add_research(self, topic: str, research_output: str, run_id: Optional[str] = None) -> Optional[int]:
+        """Estrae fatti, fonti e keyword dall'output dello stage di ricerca e li archivia"""
+        data = parse_json_output(research_output)
+        if not isinstance(data, dict):
+            logger.warning(f"Output di ricerca per '{topic}' non in formato JSON, non archiviato")
+            return None
+
+        entries = []
+        for fact in data.get('facts', []) or []:
+            if isinstance(fact, dict):
+                text = fact.get('fact') or fact.get('fatto') or fact.get('text') or json.dumps(fact, ensure_ascii=False)
+                entries.append(('fact', str(text), fact.get('url') or fact.get('source') or fact.get('fonte')))
+            elif fact:
+                entries.append(('fact', str(fact), None))
+        for source in data.get('sources', []) or []:
+            if isinstance(source, dict):
+                title = source.get('title') or source.get('titolo') or ''
+                entries.append(('source', f"{title} {source.get('url', '')}".strip(), source.get('url')))
+            elif source:
+                entries.append(('source', str(source), None))
+        for insight in data.get('market_insights', []) or []:
+            if isinstance(insight, str):
+                entries.append(('insight', insight, None))
+
+        signature = self.hasher.signature(topic_shingles(topic))
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO research (topic, run_id, signature, keywords, created_at) VALUES (?, ?, ?, ?, ?)",
+                (topic, run_id, json.dumps(signature), json.dumps(data.get('keywords', {}), ensure_ascii=False), time.time())
+            )
+            research_id = cursor.lastrowid
+            conn.executemany("INSERT INTO topic_bands (band, bucket, research_id) VALUES (?, ?, ?)",
+                             [(band, bucket, research_id) for band, bucket in enumerate(self._bands(signature))])
+            conn.executemany("INSERT INTO knowledge (content, kind, url, research_id) VALUES (?, ?, ?, ?)",
+                             [(content, kind, url, research_id) for kind, content, url in entries])
+            # Ogni nuova ricerca elimina quelle scadute: l'archivio resta limitato alla finestra di freschezza
+            pruned = self._prune(conn)
+        logger.info(f"Ricerca su '{topic}' archiviata nel knowledge store ({len(entries)} voci"
+                    f"{f', {pruned} ricerche scadute eliminate' if pruned else ''})")
+        return research_id
+
+    def similar_topics(self, topic: str, limit: int = 3) -> List[Dict[str, Any]]:
+        """Ricerche recenti su topic quasi duplicati, ordinate per similarità"""
+        signature = self.hasher.signature(topic_shingles(topic))
+        buckets = self._bands(signature)
+        min_created = time.time() - self.max_age_seconds
+        with self._connect() as conn:
+            clauses = " OR ".join("(b.band = ? AND b.bucket = ?)" for _ in buckets)
+            params = [value for pair in enumerate(buckets) for value in pair]
+            rows = conn.execute(
+                f"SELECT DISTINCT r.id, r.topic, r.signature, r.created_at FROM topic_bands b "
+                f"JOIN research r ON r.id = b.research_id WHERE ({clauses}) AND r.created_at >= ?",
+                params + [min_created]
+            ).fetchall()
+
+        matches = []
+        for research_id, prior_topic, prior_signature, created_at in rows:
+            similarity = self.hasher.similarity(signature, json.loads(prior_signature))
+            if similarity >= self.similarity_threshold:
+                matches.append({'id': research_id, 'topic': prior_topic, 'similarity': round(similarity, 3),
+                                'age_days': round((time.time() - created_at) / 86400, 1)})
+        matches.sort(key=lambda match: (-match['similarity'], match['age_days']))
+        return matches[:limit]
+
+    def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Cerca fatti e fonti recenti per testo"""
+        min_created = time.time() - self.max_age_seconds
+        with self._connect() as conn:
+            if self.full_text:
+                terms = ' OR '.join(f'"{term}"' for term in _NORMALIZE_RE.sub(' ', query).split())
+                if not terms:
+                    return []
+                rows = conn.execute(
+                    "SELECT k.content, k.kind, k.url, r.topic, r.created_at FROM knowledge k "
+                    "JOIN research r ON r.id = k.research_id "
+                    "WHERE knowledge MATCH ? AND r.created_at >= ? ORDER BY bm25(knowledge) LIMIT ?",
+                    (terms, min_created, limit)
+                ).fetchall()
+            else:
+                rows = conn.execute(
+                    "SELECT k.content, k.kind, k.url, r.topic, r.created_at FROM knowledge k "
+                    "JOIN research r ON r.id = k.research_id "
+                    "WHERE k.content LIKE ? AND r.created_at >= ? ORDER BY r.created_at DESC LIMIT ?",
+                    (f"%{query}%", min_created, limit)
+                ).fetchall()
+        return [{'content': content, 'kind': kind, 'url': url, 'topic': topic,
+                 'age_days': round((time.time() - created_at) / 86400, 1)}
+                for content, kind, url, topic, created_at in rows]
+
+    def prior_research(self, topic: str, max_topics: int = 3, max_facts: int = 20) -> Optional[Dict[str, Any]]:
+        """Digest delle ricerche su topic simili, da offrire come contesto iniziale alla ricerca"""
+        matches = self.similar_topics(topic, max_topics)
+        if not matches:
+            return None
+        ids = [match['id'] for match in matches]
+        placeholders = ','.join('?' for _ in ids)
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT content, kind, url FROM knowledge WHERE research_id IN ({placeholders})", ids
+            ).fetchall()
+            keywords = conn.execute("SELECT keywords FROM research WHERE id = ?", (ids[0],)).fetchone()
+
+        facts = list(dict.fromkeys(content for content, kind, _ in rows if kind in ('fact', 'insight')))
+        sources = list(dict.fromkeys(url for _, kind, url in rows if kind == 'source' and url))
+        return {
+            'topics': matches,
+            'facts': facts[:max_facts],
+            'sources': sources[:max_facts],
+            'keywords': json.loads(keywords[0]) if keywords else {}
+        }
+
+    def _prune(self, conn: sqlite3.Connection) -> int:
+        expired = "SELECT id FROM research WHERE created_at < ?"
+        min_created = (time.time() - self.max_age_seconds,)
+        conn.execute(f"DELETE FROM knowledge WHERE research_id IN ({expired})", min_created)
+        conn.execute(f"DELETE FROM topic_bands WHERE research_id IN ({expired})", min_created)
+        return conn.execute("DELETE FROM research WHERE created_at < ?", min_created).rowcount
+
+    def prune(self) -> int:
+        """Elimina le ricerche più vecchie del limite di freschezza"""
+        with self._connect() as conn:
+            return self._prune(conn)
@@ -0,0 +1,148 @@
+"""LLM Client Pool per Blog Generator
+Registro process-wide dei client LLM per modello, con connessioni HTTP condivise
+"""
+
+import importlib.util
+import json
+import threading
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+
+from rate_limiter import LIMITERS
+
+logger = logging.getLogger(__name__)
+
+OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+DEFAULT_HEADERS = {
+    "HTTP-Referer": "http://localhost:3000",
+    "X-Title": "Blog Generator Enhanced"
+}
+
+_pools: Dict[Tuple[str, str], 'LLMClientPool'] = {}
+_pools_lock = threading.Lock()
+
+
+class LimitedTransport(httpx.BaseTransport):
+    """Applica rate limit, concorrenza adattiva e retry a ogni singola richiesta HTTP al provider
+
+    Una crew con tool esegue più richieste: ciascuna occupa uno slot e un token, e un 429 ripete solo
+    quella richiesta, non lo stage. Per le risposte in streaming lo slot copre l'attesa degli header.
+    """
+
+    def __init__(self, transport: httpx.BaseTransport, provider: str = 'openrouter'):
+        self.transport = transport
+        self.provider = provider
+
+    @staticmethod
+    def _model(request: httpx.Request) -> Optional[str]:
+        """Modello indicato nel corpo JSON della richiesta, per i limiti per modello"""
+        try:
+            return json.loads(request.content).get('model')
+        except (httpx.RequestNotRead, ValueError, AttributeError):
+            return None
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        def send() -> httpx.Response:
+            response = self.transport.handle_request(request)
+            if response.status_code in (408, 429) or response.status_code >= 500:
+                response.read()
+                raise httpx.HTTPStatusError(f"HTTP {response.status_code}", request=request, response=response)
+            return response
+
+        try:
+            return LIMITERS.call(self.provider, send, model=self._model(request))
+        except httpx.HTTPStatusError as e:
+            # Tentativi esauriti: la risposta d'errore torna al client, che solleva la sua eccezione tipizzata
+            return e.response
+
+    def close(self) -> None:
+        self.transport.close()
+
+
+class LLMClientPool:
+    """Client LLM riutilizzabili, uno per modello, senza modificare le variabili d'ambiente"""
+
+    def __init__(self, api_key: str, base_url: str = OPENROUTER_BASE_URL, settings: Optional[Dict[str, Any]] = None):
+        settings = settings or {}
+        self.api_key = api_key
+        self.base_url = base_url
+        self.headers = dict(DEFAULT_HEADERS, **settings.get('headers', {}))
+        self._lock = threading.Lock()
+        self._chat_models: Dict[str, Any] = {}
+        self._agent_llms: Dict[str, Any] = {}
+
+        http2 = settings.get('http2', True)
+        if http2 and importlib.util.find_spec('h2') is None:
+            logger.warning("Pacchetto h2 non installato, connessioni LLM in HTTP/1.1 keep-alive")
+            http2 = False
+        limits = httpx.Limits(
+            max_connections=settings.get('max_connections', 20),
+            max_keepalive_connections=settings.get('max_keepalive_connections', 10),
+            keepalive_expiry=settings.get('keepalive_expiry', 60)
+        )
+        timeout = httpx.Timeout(settings.get('timeout', 120), connect=10)
+        # Rate limit e retry sulle singole richieste: i client SDK non ritentano a loro volta
+        self.rate_limited = settings.get('rate_limited', True)
+        transport: httpx.BaseTransport = httpx.HTTPTransport(http2=http2, limits=limits)
+        if self.rate_limited:
+            transport = LimitedTransport(transport)
+        self.http_client = httpx.Client(transport=transport, timeout=timeout)
+        # Le chiamate della pipeline sono sincrone: il client asincrono resta senza limiter
+        self.http_async_client = httpx.AsyncClient(http2=http2, limits=limits, timeout=timeout)
+        self._configure_litellm()
+
+    def _configure_litellm(self) -> None:
+        """Fa usare a LiteLLM (backend degli agenti CrewAI) le stesse connessioni condivise"""
+        try:
+            import litellm
+        except ImportError:
+            return
+        litellm.client_session = self.http_client
+        litellm.aclient_session = self.http_async_client
+
+    def chat_model(self, model_name: str):
+        """Restituisce il ChatOpenAI condiviso per il modello (chiamate dirette e streaming)"""
+        with self._lock:
+            if model_name not in self._chat_models:
+                from langchain_openai import ChatOpenAI
+                self._chat_models[model_name] = ChatOpenAI(
+                    model=model_name,
+                    api_key=self.api_key,
+                    base_url=self.base_url,
+                    default_headers=self.headers,
+                    stream_usage=True,
+                    max_retries=0 if self.rate_limited else 2,
+                    http_client=self.http_client,
+                    http_async_client=self.http_async_client
+                )
+            return self._chat_models[model_name]
+
+    def agent_llm(self, model_name: str):
+        """Restituisce l'LLM CrewAI condiviso per il modello, configurato in modo esplicito"""
+        with self._lock:
+            if model_name not in self._agent_llms:
+                from crewai import LLM
+                self._agent_llms[model_name] = LLM(
+                    model=model_name,
+                    api_key=self.api_key,
+                    base_url=self.base_url,
+                    extra_headers=self.headers,
+                    max_retries=0 if self.rate_limited else 2
+                )
+            return self._agent_llms[model_name]
+
+    def close(self) -> None:
+        """Chiude le connessioni HTTP condivise"""
+        self.http_client.close()
+
+
+def get_llm_pool(api_key: str, base_url: str = OPENROUTER_BASE_URL,
+                 settings: Optional[Dict[str, Any]] = None) -> LLMClientPool:
+    """Restituisce il pool del processo per la coppia chiave/endpoint, creandolo alla prima richiesta"""
+    key = (api_key, base_url)
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = LLMClientPool(api_key, base_url, settings)
+        return _pools[key]
@@ -0,0 +1,192 @@
+"""Metrics per Blog Generator
+Strumentazione per stage (tempi, token, tool call, retry, cache) ed export JSONL/Prometheus
+"""
+
+import json
+import os
+import threading
+import time
+import logging
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+TOKEN_FIELDS = ('prompt_tokens', 'completion_tokens', 'cached_prompt_tokens', 'total_tokens', 'successful_requests')
+
+
+def _usage_value(usage: Any, name: str) -> int:
+    """Legge un campo di utilizzo token da UsageMetrics CrewAI o da un dizionario"""
+    value = usage.get(name) if isinstance(usage, dict) else getattr(usage, name, None)
+    return int(value or 0)
+
+
+class RunMetrics:
+    """Metriche di una singola esecuzione, aggiornabili da più thread"""
+
+    def __init__(self, run_id: str):
+        self.run_id = run_id
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self.tools: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def _stage(self, stage: str) -> Dict[str, Any]:
+        if stage not in self.stages:
+            self.stages[stage] = {
+                'wall_seconds': 0.0, 'model': None, 'source': None,
+                'tool_calls': 0, 'retries': 0, 'cache_hits': 0, 'escalations': 0,
+                **{name: 0 for name in TOKEN_FIELDS}
+            }
+        return self.stages[stage]
+
+    @contextmanager
+    def stage(self, stage: str, model: Optional[str] = None) -> Iterator[None]:
+        """Misura il tempo (monotono) speso in uno stage"""
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - start
+            with self._lock:
+                metrics = self._stage(stage)
+                metrics['wall_seconds'] += elapsed
+                metrics['model'] = model or metrics['model']
+
+    def add(self, stage: str, name: str, value: float = 1) -> None:
+        """Incrementa un contatore dello stage (tool_calls, retries, cache_hits, ...)"""
+        with self._lock:
+            metrics = self._stage(stage)
+            metrics[name] = metrics.get(name, 0) + value
+
+    def set(self, stage: str, name: str, value: Any) -> None:
+        """Imposta un valore dello stage (es. source: executed, stage_cache, checkpoint)"""
+        with self._lock:
+            self._stage(stage)[name] = value
+
+    def record_usage(self, stage: str, usage: Any) -> None:
+        """Somma l'utilizzo token riportato dal provider allo stage"""
+        if usage is None:
+            return
+        with self._lock:
+            metrics = self._stage(stage)
+            for name in TOKEN_FIELDS:
+                metrics[name] += _usage_value(usage, name)
+
+    @contextmanager
+    def tool_call(self, tool: str) -> Iterator[None]:
+        """Misura una chiamata a un tool esterno (es. Tavily)"""
+        start = time.monotonic()
+        failed = False
+        try:
+            yield
+        except Exception:
+            failed = True
+            raise
+        finally:
+            elapsed = time.monotonic() - start
+            with self._lock:
+                metrics = self.tools.setdefault(tool, {'calls': 0, 'errors': 0, 'total_seconds': 0.0, 'max_seconds': 0.0})
+                metrics['calls'] += 1
+                metrics['errors'] += int(failed)
+                metrics['total_seconds'] += elapsed
+                metrics['max_seconds'] = max(metrics['max_seconds'], elapsed)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'stages': {stage: dict(values) for stage, values in self.stages.items()},
+                'tools': {tool: dict(values) for tool, values in self.tools.items()}
+            }
+
+
+class MetricsRegistry:
+    """Aggrega le metriche di tutte le esecuzioni del processo per l'export Prometheus"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.runs = defaultdict(int)
+        self.stage_seconds = defaultdict(float)
+        self.stage_count = defaultdict(int)
+        self.stage_tokens = defaultdict(int)
+        self.stage_events = defaultdict(int)
+        self.tool_calls = defaultdict(int)
+        self.tool_errors = defaultdict(int)
+        self.tool_seconds = defaultdict(float)
+
+    def observe(self, run_metrics: RunMetrics, status: str) -> None:
+        """Registra le metriche di un'esecuzione conclusa"""
+        data = run_metrics.to_dict()
+        with self._lock:
+            self.runs[status] += 1
+            for stage, values in data['stages'].items():
+                labels = (stage, values.get('model') or '', values.get('source') or '')
+                self.stage_seconds[labels] += values['wall_seconds']
+                self.stage_count[labels] += 1
+                for name in ('prompt_tokens', 'completion_tokens', 'cached_prompt_tokens'):
+                    self.stage_tokens[labels[:2] + (name.replace('_tokens', ''),)] += values[name]
+                for name in ('tool_calls', 'retries', 'cache_hits', 'escalations'):
+                    self.stage_events[(stage, name)] += values.get(name, 0)
+            for tool, values in data['tools'].items():
+                self.tool_calls[tool] += values['calls']
+                self.tool_errors[tool] += values['errors']
+                self.tool_seconds[tool] += values['total_seconds']
+
+    @staticmethod
+    def _labels(**labels: Any) -> str:
+        def escape(value: Any) -> str:
+            return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        return "{" + ",".join(f'{key}="{escape(value)}"' for key, value in labels.items()) + "}"
+
+    def render_prometheus(self) -> str:
+        """Restituisce le metriche aggregate nel formato testuale Prometheus"""
+        lines = []
+
+        def metric(name: str, kind: str, help_text: str, samples) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{self._labels(**labels)} {value}")
+
+        with self._lock:
+            metric("blog_generator_runs_total", "counter", "Esecuzioni della pipeline per esito",
+                   [({'status': status}, count) for status, count in self.runs.items()])
+            metric("blog_generator_stage_duration_seconds_total", "counter", "Tempo totale speso per stage",
+                   [({'stage': s, 'model': m, 'source': src}, round(v, 6)) for (s, m, src), v in self.stage_seconds.items()])
+            metric("blog_generator_stage_executions_total", "counter", "Esecuzioni per stage",
+                   [({'stage': s, 'model': m, 'source': src}, v) for (s, m, src), v in self.stage_count.items()])
+            metric("blog_generator_stage_tokens_total", "counter", "Token per stage e tipo",
+                   [({'stage': s, 'model': m, 'type': t}, v) for (s, m, t), v in self.stage_tokens.items()])
+            metric("blog_generator_stage_events_total", "counter", "Tool call, retry, cache hit ed escalation di modello per stage",
+                   [({'stage': s, 'event': e}, v) for (s, e), v in self.stage_events.items()])
+            metric("blog_generator_tool_calls_total", "counter", "Chiamate ai tool esterni",
+                   [({'tool': t}, v) for t, v in self.tool_calls.items()])
+            metric("blog_generator_tool_errors_total", "counter", "Chiamate ai tool esterni fallite",
+                   [({'tool': t}, v) for t, v in self.tool_errors.items()])
+            metric("blog_generator_tool_duration_seconds_total", "counter", "Tempo totale delle chiamate ai tool",
+                   [({'tool': t}, round(v, 6)) for t, v in self.tool_seconds.items()])
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str) -> None:
+        """Scrive le metriche in un file per il textfile collector di node_exporter"""
+        directory = os.path.dirname(path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            file.write(self.render_prometheus())
+        os.replace(tmp_path, path)
+
+
+# Registro condiviso da tutte le esecuzioni del processo
+METRICS = MetricsRegistry()
+_jsonl_lock = threading.Lock()
+
+
+def export_jsonl(path: str, record: Dict[str, Any]) -> None:
+    """Aggiunge una riga JSON con le metriche di un'esecuzione"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+    with _jsonl_lock, open(path, 'a', encoding='utf-8') as file:
+        file.write(line)
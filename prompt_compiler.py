@@ -0,0 +1,79 @@
+"""Prompt Compiler per Blog Generator
+Compila i template in un prefisso statico (identico tra esecuzioni, riusabile dalla prompt cache del provider)
+seguito da un suffisso con i valori specifici dell'articolo
+"""
+
+import string
+import logging
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+DYNAMIC_HEADER = "DATI SPECIFICI DI QUESTA RICHIESTA (sostituiscono i segnaposto [campo] nelle istruzioni):"
+
+
+class CompiledPrompt:
+    """Template diviso in prefisso statico e campi da valorizzare nel suffisso"""
+
+    def __init__(self, name: str, template: str):
+        self.name = name
+        self.template = template
+        self.fields: List[str] = []
+        parts = []
+        for literal, field_name, format_spec, conversion in string.Formatter().parse(template):
+            parts.append(literal.replace('{', '{{').replace('}', '}}'))
+            if field_name is None:
+                continue
+            if field_name not in self.fields:
+                self.fields.append(field_name)
+            parts.append(f"[{field_name}]")
+        # Il prefisso non contiene valori: è lo stesso testo per ogni articolo
+        self.static = ''.join(parts).format().rstrip()
+
+    def dynamic(self, values: Dict[str, Any]) -> str:
+        """Suffisso con i soli campi usati dal template, nell'ordine in cui compaiono"""
+        missing = [name for name in self.fields if name not in values]
+        if missing:
+            raise KeyError(f"Campi mancanti per il prompt {self.name}: {', '.join(missing)}")
+        lines = [f"- [{name}]: {values[name]}" for name in self.fields]
+        return DYNAMIC_HEADER + "\n" + "\n".join(lines) if lines else ""
+
+    def render(self, values: Dict[str, Any]) -> str:
+        dynamic = self.dynamic(values)
+        return f"{self.static}\n\n{dynamic}" if dynamic else self.static
+
+
+class PromptCompiler:
+    """Compila una volta tutti i template e li rende nel layout prefisso statico + suffisso dinamico"""
+
+    def __init__(self, prompts: Dict[str, str], split: bool = True):
+        self.prompts = prompts
+        self.split = split
+        self.compiled: Dict[str, CompiledPrompt] = {
+            name: CompiledPrompt(name, template) for name, template in prompts.items() if isinstance(template, str)
+        }
+
+    def render(self, name: str, **values: Any) -> str:
+        """Rende il template: layout diviso se abilitato, altrimenti interpolazione classica"""
+        if not self.split:
+            return self.prompts[name].format(**values)
+        return self.compiled[name].render(values)
+
+
+def cached_token_report(stages: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Quota dei token di input serviti dalla prompt cache del provider, per stage e in totale"""
+    report = {}
+    total_prompt = total_cached = 0
+    for stage, values in stages.items():
+        prompt_tokens = values.get('prompt_tokens', 0)
+        cached_tokens = values.get('cached_prompt_tokens', 0)
+        if not prompt_tokens:
+            continue
+        total_prompt += prompt_tokens
+        total_cached += cached_tokens
+        report[stage] = {'prompt_tokens': prompt_tokens, 'cached_prompt_tokens': cached_tokens,
+                         'cached_ratio': round(cached_tokens / prompt_tokens, 3)}
+    if total_prompt:
+        report['total'] = {'prompt_tokens': total_prompt, 'cached_prompt_tokens': total_cached,
+                           'cached_ratio': round(total_cached / total_prompt, 3)}
+    return report
@@ -0,0 +1,257 @@
+"""Rate Limiter per Blog Generator
+Token bucket per provider e per modello con concorrenza adattiva (AIMD) e retry con backoff esponenziale e jitter
+"""
+
+import random
+import threading
+import time
+import logging
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+RetryCallback = Callable[[BaseException, int, float], None]
+# Callback dei retry per il chiamante corrente (es. lo stage in esecuzione), senza passarlo a ogni livello
+_retry_listener: ContextVar[Optional[RetryCallback]] = ContextVar('retry_listener', default=None)
+
+_RETRYABLE_NAMES = ('timeout', 'connection', 'ratelimit', 'toomanyrequests', 'serviceunavailable',
+                    'internalserver', 'badgateway', 'overloaded')
+
+
+def error_status(error: BaseException) -> Optional[int]:
+    """Codice HTTP associato all'errore, se ricavabile (OpenAI, LiteLLM, httpx, requests)"""
+    for attr in ('status_code', 'http_status'):
+        value = getattr(error, attr, None)
+        if isinstance(value, int):
+            return value
+    value = getattr(getattr(error, 'response', None), 'status_code', None)
+    if isinstance(value, int):
+        return value
+    name = type(error).__name__.lower()
+    if 'ratelimit' in name or 'toomanyrequests' in name:
+        return 429
+    return None
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Secondi indicati dall'header Retry-After della risposta, se presente"""
+    headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+    try:
+        value = headers.get('retry-after') or headers.get('Retry-After')
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Errori transitori: 429, 408, 5xx, timeout e problemi di connessione"""
+    status = error_status(error)
+    if status is not None:
+        return status in (408, 429) or status >= 500
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    name = type(error).__name__.lower()
+    return any(part in name for part in _RETRYABLE_NAMES)
+
+
+class TokenBucket:
+    """Token bucket: al massimo `rate` richieste al secondo con raffiche fino a `burst`"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.capacity = max(1.0, burst)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Attende un token e restituisce i secondi di attesa"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class AdaptiveLimiter:
+    """Limite di concorrenza AIMD sopra un token bucket: cresce con i successi, si dimezza su 429 e latenze alte"""
+
+    def __init__(self, name: str, requests_per_second: float = 2.0, burst: float = 4,
+                 max_concurrency: int = 8, min_concurrency: int = 1,
+                 latency_target_seconds: Optional[float] = None,
+                 additive_increase: float = 1.0, multiplicative_decrease: float = 0.5):
+        self.name = name
+        self.bucket = TokenBucket(requests_per_second, burst) if requests_per_second else None
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.limit = float(self.max_concurrency)
+        self.latency_target = latency_target_seconds
+        self.additive_increase = additive_increase
+        self.multiplicative_decrease = multiplicative_decrease
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.stats = {'calls': 0, 'throttled': 0, 'errors': 0, 'retries': 0, 'wait_seconds': 0.0}
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """Occupa uno slot di concorrenza e un token per la durata della chiamata"""
+        start = time.monotonic()
+        with self._cond:
+            while self.in_flight >= int(self.limit) or time.monotonic() < self.blocked_until:
+                pause = self.blocked_until - time.monotonic()
+                self._cond.wait(timeout=pause if pause > 0 else 1.0)
+            self.in_flight += 1
+        try:
+            if self.bucket is not None:
+                self.bucket.acquire()
+            with self._cond:
+                self.stats['calls'] += 1
+                self.stats['wait_seconds'] += time.monotonic() - start
+            yield
+        finally:
+            with self._cond:
+                self.in_flight -= 1
+                self._cond.notify_all()
+
+    def _decrease(self) -> None:
+        self.limit = max(float(self.min_concurrency), self.limit * self.multiplicative_decrease)
+
+    def on_success(self, latency: float) -> None:
+        with self._cond:
+            if self.latency_target and latency > self.latency_target:
+                self._decrease()
+            else:
+                self.limit = min(float(self.max_concurrency), self.limit + self.additive_increase / max(self.limit, 1.0))
+            self._cond.notify_all()
+
+    def on_throttle(self, pause: Optional[float] = None) -> None:
+        with self._cond:
+            self.stats['throttled'] += 1
+            self._decrease()
+            if pause:
+                self.blocked_until = max(self.blocked_until, time.monotonic() + pause)
+
+    def on_error(self) -> None:
+        with self._cond:
+            self.stats['errors'] += 1
+
+    def on_retry(self) -> None:
+        with self._cond:
+            self.stats['retries'] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._cond:
+            return dict(self.stats, concurrency_limit=round(self.limit, 2), in_flight=self.in_flight)
+
+
+class RetryPolicy:
+    """Backoff esponenziale con jitter completo"""
+
+    def __init__(self, max_attempts: int = 5, base_delay_seconds: float = 1.0, max_delay_seconds: float = 60.0):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay_seconds
+        self.max_delay = max_delay_seconds
+
+    def delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+class RateLimiterRegistry:
+    """Limiter condivisi dal processo per provider e per (provider, modello)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._limiters: Dict[Tuple[str, Optional[str]], AdaptiveLimiter] = {}
+        self.settings: Dict[str, Any] = {}
+        self.retry = RetryPolicy()
+
+    def configure(self, settings: Dict[str, Any]) -> None:
+        """Imposta i limiti (sezione rate_limits); i limiter già creati mantengono i loro parametri"""
+        with self._lock:
+            self.settings = settings
+            self.retry = RetryPolicy(**settings.get('retry', {}))
+
+    def get(self, provider: str, model: Optional[str] = None) -> Optional[AdaptiveLimiter]:
+        """Restituisce il limiter del provider o del modello, creandolo alla prima richiesta"""
+        key = (provider, model)
+        with self._lock:
+            if key not in self._limiters:
+                provider_settings = dict(self.settings.get('providers', {}).get(provider, {}))
+                model_settings = provider_settings.pop('models', {})
+                if model is not None:
+                    if model not in model_settings:
+                        return None
+                    provider_settings = model_settings[model]
+                name = f"{provider}:{model}" if model else provider
+                self._limiters[key] = AdaptiveLimiter(name, **provider_settings)
+            return self._limiters[key]
+
+    @contextmanager
+    def retry_listener(self, callback: RetryCallback) -> Iterator[None]:
+        """Notifica a callback i retry delle chiamate eseguite in questo contesto senza un on_retry esplicito"""
+        token = _retry_listener.set(callback)
+        try:
+            yield
+        finally:
+            _retry_listener.reset(token)
+
+    def call(self, provider: str, fn: Callable[[], Any], model: Optional[str] = None,
+             on_retry: Optional[RetryCallback] = None) -> Any:
+        """Esegue fn rispettando i limiti del provider (e del modello) e ritentando gli errori transitori"""
+        # Prima lo slot del modello (più ristretto), poi quello del provider
+        candidates = (self.get(provider, model) if model else None, self.get(provider))
+        limiters: List[AdaptiveLimiter] = [limiter for limiter in candidates if limiter is not None]
+        attempt = 0
+        while True:
+            try:
+                with ExitStack() as stack:
+                    for limiter in limiters:
+                        stack.enter_context(limiter.slot())
+                    start = time.monotonic()
+                    result = fn()
+            except Exception as e:
+                retryable = is_retryable(e)
+                pause = retry_after(e)
+                for limiter in limiters:
+                    if error_status(e) == 429:
+                        limiter.on_throttle(pause)
+                    elif retryable:
+                        limiter.on_error()
+                if not retryable or attempt + 1 >= self.retry.max_attempts:
+                    raise
+                delay = max(self.retry.delay(attempt), pause or 0)
+                attempt += 1
+                for limiter in limiters:
+                    limiter.on_retry()
+                logger.warning(f"Errore transitorio su {provider}{f' ({model})' if model else ''}: {e}. "
+                               f"Tentativo {attempt + 1}/{self.retry.max_attempts} tra {delay:.1f} secondi")
+                # Un solo destinatario per retry: il callback esplicito prevale sul listener del contesto
+                callback = on_retry or _retry_listener.get()
+                if callback is not None:
+                    callback(e, attempt, delay)
+                time.sleep(delay)
+                continue
+            latency = time.monotonic() - start
+            for limiter in limiters:
+                limiter.on_success(latency)
+            return result
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Stato dei limiter (limite di concorrenza corrente, 429 ricevuti, retry, attese)"""
+        with self._lock:
+            limiters = list(self._limiters.values())
+        return {limiter.name: limiter.snapshot() for limiter in limiters}
+
+
+# Limiter condivisi da tutti i job concorrenti del processo
+LIMITERS = RateLimiterRegistry()
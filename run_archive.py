@@ -0,0 +1,263 @@
+"""Run Archive per Blog Generator
+Archivio append-only (SQLite, contenuti compressi con zlib) di input, output degli stage, articoli e analytics
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import time
+import zlib
+import logging
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import quote
+
+from input_manager import InputManager
+
+logger = logging.getLogger(__name__)
+
+RECORD_KINDS = ('input', 'stage', 'article', 'analytics')
+
+
+def _compress(data: Any, level: int) -> Tuple[bytes, int]:
+    """Comprime testo o JSON compatto, restituendo anche la dimensione originale in byte"""
+    text = data if isinstance(data, str) else json.dumps(data, ensure_ascii=False, separators=(',', ':'), default=str)
+    encoded = text.encode('utf-8')
+    return zlib.compress(encoded, level), len(encoded)
+
+
+def _decompress(blob: bytes, is_json: int) -> Any:
+    text = zlib.decompress(blob).decode('utf-8')
+    return json.loads(text) if is_json else text
+
+
+class RunArchive:
+    """Un database per tutte le esecuzioni: i record si aggiungono e non vengono mai riscritti"""
+
+    def __init__(self, path: str, compression_level: int = 6, read_only: bool = False):
+        self.path = path
+        self.compression_level = compression_level
+        self.read_only = read_only
+        # In sola lettura non si crea né si modifica nulla (nemmeno lo schema o il journal mode)
+        if read_only:
+            return
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS runs ("
+                "seq INTEGER PRIMARY KEY AUTOINCREMENT, run_id TEXT, topic TEXT, status TEXT, "
+                "execution_time REAL, error TEXT, created_at REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_runs_run_id ON runs(run_id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_runs_created ON runs(created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_runs_topic ON runs(topic)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS records ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, run_seq INTEGER, kind TEXT, name TEXT, "
+                "is_json INTEGER, size INTEGER, data BLOB)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_records_run ON records(run_seq, kind)")
+
+    def _connect(self) -> sqlite3.Connection:
+        """Apre una connessione dedicata (sicura tra thread e processi)"""
+        if self.read_only:
+            return sqlite3.connect(f"file:{quote(os.path.abspath(self.path))}?mode=ro", uri=True, timeout=30)
+        return sqlite3.connect(self.path, timeout=30)
+
+    def archive_run(self, run_id: str, topic: str, status: str, input_dict: Dict[str, Any],
+                    stages: Optional[Dict[str, Any]] = None, article: Optional[str] = None,
+                    analytics: Optional[Dict[str, Any]] = None, execution_time: Optional[float] = None,
+                    error: str = "") -> int:
+        """Aggiunge un'esecuzione con tutti i suoi record in un'unica transazione (tutto o niente)"""
+        records = [('input', 'input', input_dict)]
+        records += [('stage', stage, output) for stage, output in (stages or {}).items() if output is not None]
+        if article is not None:
+            records.append(('article', 'article', article))
+        if analytics:
+            records.append(('analytics', 'analytics', analytics))
+
+        rows = []
+        for kind, name, data in records:
+            blob, size = _compress(data, self.compression_level)
+            rows.append((kind, name, int(not isinstance(data, str)), size, blob))
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO runs (run_id, topic, status, execution_time, error, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (run_id, topic, status, execution_time, error or None, time.time())
+            )
+            seq = cursor.lastrowid
+            conn.executemany("INSERT INTO records (run_seq, kind, name, is_json, size, data) VALUES (?, ?, ?, ?, ?, ?)",
+                             [(seq,) + row for row in rows])
+        logger.info(f"Run {run_id} archiviato in {self.path} ({len(rows)} record, stato {status})")
+        return seq
+
+    def list_runs(self, topic: Optional[str] = None, status: Optional[str] = None,
+                  since: Optional[float] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Esecuzioni archiviate, dalla più recente; un run ripreso compare una volta per tentativo"""
+        clauses, params = [], []
+        if topic:
+            clauses.append("topic LIKE ?")
+            params.append(f"%{topic}%")
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT seq, run_id, topic, status, execution_time, error, created_at FROM runs {where} "
+                f"ORDER BY seq DESC LIMIT ?", params + [limit]
+            ).fetchall()
+        return [{'seq': seq, 'run_id': run_id, 'topic': topic, 'status': status, 'execution_time': execution_time,
+                 'error': error, 'created_at': created_at}
+                for seq, run_id, topic, status, execution_time, error, created_at in rows]
+
+    def get_run(self, run_id: str, kinds: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        """Ultimo tentativo archiviato di un run con i suoi record (filtrabili per tipo)"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT seq, topic, status, execution_time, error, created_at FROM runs "
+                "WHERE run_id = ? ORDER BY seq DESC LIMIT 1", (run_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            seq, topic, status, execution_time, error, created_at = row
+            query = "SELECT kind, name, is_json, data FROM records WHERE run_seq = ?"
+            params: List[Any] = [seq]
+            if kinds:
+                query += f" AND kind IN ({','.join('?' for _ in kinds)})"
+                params += list(kinds)
+            records = conn.execute(query + " ORDER BY id", params).fetchall()
+
+        run = {'run_id': run_id, 'topic': topic, 'status': status, 'execution_time': execution_time,
+               'error': error, 'created_at': created_at, 'stages': {}}
+        for kind, name, is_json, data in records:
+            value = _decompress(data, is_json)
+            if kind == 'stage':
+                run['stages'][name] = value
+            else:
+                run[kind] = value
+        return run
+
+    def iter_runs(self, run_ids: List[str], kinds: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+        """Carica più run uno alla volta (memoria costante durante gli export)"""
+        for run_id in run_ids:
+            run = self.get_run(run_id, kinds)
+            if run is None:
+                logger.warning(f"Run {run_id} non presente nell'archivio")
+                continue
+            yield run
+
+    def export_run(self, run_id: str, output_dir: str) -> Dict[str, str]:
+        """Esporta un run come file (articolo Markdown, analytics e input/stage in JSON)"""
+        run = self.get_run(run_id)
+        if run is None:
+            raise KeyError(f"Run {run_id} non presente nell'archivio")
+        run_dir = os.path.join(output_dir, run_id)
+        os.makedirs(run_dir, exist_ok=True)
+        files = {}
+        if run.get('article') is not None:
+            files['article'] = os.path.join(run_dir, 'article.md')
+            with open(files['article'], 'w', encoding='utf-8') as file:
+                file.write(run['article'])
+        for name in ('input', 'analytics', 'stages'):
+            if run.get(name):
+                files[name] = os.path.join(run_dir, f"{name}.json")
+                with open(files[name], 'w', encoding='utf-8') as file:
+                    json.dump(run[name], file, indent=2, ensure_ascii=False, default=str)
+        return files
+
+    def stats(self) -> Dict[str, Any]:
+        """Numero di run e record e dimensione dei contenuti compressi"""
+        with self._connect() as conn:
+            runs = dict(conn.execute("SELECT status, COUNT(*) FROM runs GROUP BY status").fetchall())
+            records, size, compressed = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(LENGTH(data)), 0) FROM records"
+            ).fetchone()
+        return {'runs': runs, 'records': records, 'raw_bytes': size, 'compressed_bytes': compressed,
+                'file_bytes': os.path.getsize(self.path) if os.path.exists(self.path) else 0}
+
+
+def setup_argument_parser() -> argparse.ArgumentParser:
+    """Configura il parser degli argomenti della CLI dell'archivio"""
+    parser = argparse.ArgumentParser(description="Interroga ed esporta l'archivio delle esecuzioni del Blog Generator")
+    parser.add_argument("--config", type=str, default="config.yaml", help="File di configurazione")
+    parser.add_argument("--archive", type=str, help="Percorso dell'archivio (default: archive.path da config.yaml)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    list_parser = subparsers.add_parser('list', help="Elenca le esecuzioni archiviate")
+    list_parser.add_argument("--topic", type=str, help="Filtra per topic (sottostringa)")
+    list_parser.add_argument("--status", choices=["completed", "failed", "cancelled"], help="Filtra per esito")
+    list_parser.add_argument("--days", type=float, help="Solo le esecuzioni degli ultimi N giorni")
+    list_parser.add_argument("--limit", type=int, default=50, help="Numero massimo di esecuzioni")
+
+    show = subparsers.add_parser('show', help="Mostra i record di un'esecuzione in JSON")
+    show.add_argument("run_id", type=str, help="Run ID")
+    show.add_argument("--kind", choices=RECORD_KINDS, nargs='+', help="Tipi di record da mostrare")
+
+    export = subparsers.add_parser('export', help="Esporta esecuzioni come file")
+    export.add_argument("run_ids", type=str, nargs='*', help="Run ID da esportare")
+    export.add_argument("--topic", type=str, help="Esporta le esecuzioni riuscite con questo topic")
+    export.add_argument("--output-dir", type=str, default="export", help="Directory di destinazione")
+    export.add_argument("--jsonl", type=str, help="Esporta invece in un unico file JSONL")
+
+    subparsers.add_parser('stats', help="Dimensioni e numero di record dell'archivio")
+    return parser
+
+
+def main():
+    """Funzione principale"""
+    args = setup_argument_parser().parse_args()
+    path = args.archive or InputManager(args.config).get_archive_config().get('path', '.archive/runs.sqlite')
+    if not os.path.exists(path):
+        print(f"Archivio {path} non trovato")
+        return
+    # Tutti i comandi leggono soltanto: l'archivio viene aperto in sola lettura
+    archive = RunArchive(path, read_only=True)
+
+    if args.command == 'list':
+        since = time.time() - args.days * 86400 if args.days else None
+        for run in archive.list_runs(args.topic, args.status, since, args.limit):
+            created = time.strftime('%Y-%m-%d %H:%M', time.localtime(run['created_at']))
+            duration = f"{run['execution_time']:.1f}s" if run['execution_time'] is not None else "-"
+            print(f"{run['run_id']:<26} {created}  {run['status']:<9} {duration:>8}  {run['topic']}")
+    elif args.command == 'show':
+        run = archive.get_run(args.run_id, args.kind)
+        if run is None:
+            print(f"Run {args.run_id} non presente nell'archivio")
+            return
+        print(json.dumps(run, indent=2, ensure_ascii=False, default=str))
+    elif args.command == 'export':
+        run_ids = list(args.run_ids)
+        if args.topic:
+            run_ids += [run['run_id'] for run in archive.list_runs(args.topic, 'completed', limit=-1)]
+        run_ids = list(dict.fromkeys(run_ids))
+        if args.jsonl:
+            with open(args.jsonl, 'w', encoding='utf-8') as file:
+                for run in archive.iter_runs(run_ids):
+                    file.write(json.dumps(run, ensure_ascii=False, default=str) + "\n")
+            print(f"{len(run_ids)} esecuzioni esportate in: {args.jsonl}")
+        else:
+            for run_id in run_ids:
+                try:
+                    files = archive.export_run(run_id, args.output_dir)
+                    print(f"{run_id}: {', '.join(files.values())}")
+                except KeyError as e:
+                    print(e)
+    else:
+        stats = archive.stats()
+        print(f"Esecuzioni: {sum(stats['runs'].values())} "
+              f"({', '.join(f'{status}: {count}' for status, count in stats['runs'].items())})")
+        print(f"Record: {stats['records']}, contenuti: {stats['raw_bytes'] / 1024:.1f} KB, "
+              f"compressi: {stats['compressed_bytes'] / 1024:.1f} KB, "
+              f"file: {stats['file_bytes'] / 1024:.1f} KB")
+
+
+if __name__ == "__main__":
+    main()
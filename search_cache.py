@@ -0,0 +1,124 @@
+"""Search Cache per Blog Generator
+Cache persistente su disco (SQLite) per le ricerche Tavily con TTL ed eviction LRU
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import logging
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(query: str) -> str:
+    """Normalizza la query per renderla confrontabile (minuscole, spazi compattati)"""
+    return ' '.join(query.lower().split())
+
+
+class SearchCache:
+    """Cache delle ricerche indicizzata per query normalizzata e max_results"""
+
+    def __init__(self, path: str, ttl_seconds: float = 72 * 3600, max_entries: int = 5000):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.stats = {'hits': 0, 'misses': 0, 'coalesced': 0}
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS searches ("
+                "key TEXT PRIMARY KEY, query TEXT, max_results INTEGER, "
+                "payload TEXT, created_at REAL, last_access REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_searches_access ON searches(last_access)")
+
+    def _connect(self) -> sqlite3.Connection:
+        """Apre una connessione dedicata (sicura tra thread e processi)"""
+        return sqlite3.connect(self.path, timeout=30)
+
+    @staticmethod
+    def make_key(query: str, max_results: int) -> str:
+        """Calcola la chiave della cache"""
+        return hashlib.sha256(f"{normalize_query(query)}|{max_results}".encode('utf-8')).hexdigest()
+
+    def get(self, query: str, max_results: int) -> Optional[Any]:
+        """Restituisce il risultato in cache se presente e non scaduto"""
+        key = self.make_key(query, max_results)
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT payload, created_at FROM searches WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl_seconds:
+                conn.execute("DELETE FROM searches WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE searches SET last_access = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def put(self, query: str, max_results: int, value: Any) -> None:
+        """Salva un risultato ed applica TTL e limite di dimensione"""
+        key = self.make_key(query, max_results)
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO searches VALUES (?, ?, ?, ?, ?, ?)",
+                (key, normalize_query(query), max_results, json.dumps(value, ensure_ascii=False), now, now)
+            )
+            conn.execute("DELETE FROM searches WHERE created_at < ?", (now - self.ttl_seconds,))
+            conn.execute(
+                "DELETE FROM searches WHERE key NOT IN "
+                "(SELECT key FROM searches ORDER BY last_access DESC LIMIT ?)",
+                (self.max_entries,)
+            )
+
+    def _count(self, name: str, run_stats: Optional[Dict[str, int]]) -> None:
+        """Aggiorna i contatori globali e quelli della singola esecuzione"""
+        with self._lock:
+            self.stats[name] += 1
+            if run_stats is not None:
+                run_stats[name] = run_stats.get(name, 0) + 1
+
+    def get_or_fetch(self, query: str, max_results: int, fetch: Callable[[], Any],
+                     run_stats: Optional[Dict[str, int]] = None) -> Any:
+        """Restituisce il risultato in cache oppure lo recupera, unendo richieste concorrenti identiche"""
+        cached = self.get(query, max_results)
+        if cached is not None:
+            self._count('hits', run_stats)
+            return cached
+
+        key = self.make_key(query, max_results)
+        with self._lock:
+            waiter = self._inflight.get(key)
+            leader = waiter is None
+            if leader:
+                waiter = Future()
+                self._inflight[key] = waiter
+
+        if not leader:
+            self._count('coalesced', run_stats)
+            return waiter.result()
+
+        self._count('misses', run_stats)
+        try:
+            value = fetch()
+            self.put(query, max_results, value)
+            waiter.set_result(value)
+            return value
+        except Exception as e:
+            waiter.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
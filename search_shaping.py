@@ -0,0 +1,172 @@
+"""Search Shaping per Blog Generator
+Riduce i risultati Tavily passati agli agenti: solo i campi utili, contenuto compattato e tagliato sulle frasi
+più pertinenti alla query, URL e frasi già restituiti nello stesso run omessi
+"""
+
+import json
+import re
+import threading
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Set
+from urllib.parse import urlsplit, urlunsplit
+
+from context_compactor import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FIELDS = ('title', 'url', 'content', 'score', 'published_date')
+ELLIPSIS = "…"
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+# Parole troppo comuni per indicare pertinenza (italiano e inglese)
+_STOPWORDS = frozenset((
+    'che', 'per', 'con', 'del', 'della', 'delle', 'dei', 'degli', 'nel', 'nella', 'una', 'uno', 'gli', 'le',
+    'come', 'sono', 'più', 'anche', 'the', 'and', 'for', 'with', 'from', 'that', 'this', 'are', 'how', 'what'
+))
+
+
+def compact_whitespace(text: str) -> str:
+    """Compatta spazi, tabulazioni e a capo in un singolo spazio"""
+    return ' '.join(str(text).split())
+
+
+def query_terms(query: str) -> Set[str]:
+    """Termini significativi della query (minuscole, senza parole comuni)"""
+    return {word for word in _WORD_RE.findall(query.lower()) if len(word) > 2 and word not in _STOPWORDS}
+
+
+def normalize_url(url: str) -> str:
+    """URL confrontabile: host in minuscolo, senza frammento né slash finale"""
+    parts = urlsplit(url.strip())
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip('/'), parts.query, ''))
+
+
+def _sentence_key(sentence: str) -> str:
+    return ' '.join(_WORD_RE.findall(sentence.lower()))
+
+
+def _cut(text: str, max_tokens: int) -> str:
+    """Taglia una singola frase troppo lunga entro il budget"""
+    tokens = estimate_tokens(text)
+    if tokens <= max_tokens:
+        return text
+    return text[:int(len(text) * max_tokens / tokens)].rstrip() + ELLIPSIS
+
+
+class ResultShaper:
+    """Stato di deduplica e contatori di un singolo run (condiviso dalle chiamate dei tool di ricerca)"""
+
+    def __init__(self, max_tokens_per_result: int = 120, fields: Iterable[str] = DEFAULT_FIELDS,
+                 dedupe: bool = True, min_score: float = 0.0):
+        self.max_tokens_per_result = max_tokens_per_result
+        self.fields = tuple(fields)
+        self.dedupe = dedupe
+        self.min_score = min_score
+        self._seen_urls: Set[str] = set()
+        self._seen_sentences: Set[str] = set()
+        self._lock = threading.Lock()
+        self.stats = {'calls': 0, 'results_in': 0, 'results_out': 0, 'duplicate_urls': 0,
+                      'duplicate_sentences': 0, 'low_score': 0, 'truncated': 0,
+                      'tokens_before': 0, 'tokens_after': 0}
+
+    def _select_sentences(self, content: str, terms: Set[str]) -> List[str]:
+        """Frasi nuove ordinate per pertinenza, tenute nell'ordine originale finché entrano nel budget"""
+        sentences = []
+        keys: Set[str] = set()
+        for sentence in _SENTENCE_RE.split(content):
+            key = _sentence_key(sentence)
+            if not key or key in keys:
+                continue
+            keys.add(key)
+            if self.dedupe and key in self._seen_sentences:
+                self.stats['duplicate_sentences'] += 1
+                continue
+            sentences.append((sentence, key))
+        if not sentences:
+            return []
+
+        def relevance(index: int) -> tuple:
+            words = set(sentences[index][1].split())
+            return (-len(terms & words), index)
+
+        chosen: List[int] = []
+        budget = self.max_tokens_per_result
+        for index in sorted(range(len(sentences)), key=relevance):
+            tokens = estimate_tokens(sentences[index][0])
+            if tokens <= budget:
+                chosen.append(index)
+                budget -= tokens
+            elif not chosen:
+                # Nemmeno la frase più pertinente entra: la si taglia
+                sentences[index] = (_cut(sentences[index][0], budget), sentences[index][1])
+                chosen.append(index)
+                break
+        if len(chosen) < len(sentences):
+            self.stats['truncated'] += 1
+        chosen.sort()
+        if self.dedupe:
+            self._seen_sentences.update(sentences[index][1] for index in chosen)
+        return [sentences[index][0] for index in chosen]
+
+    def _shape_result(self, result: Dict[str, Any], query: str) -> Optional[Dict[str, Any]]:
+        url = result.get('url') or ''
+        if url and self.dedupe:
+            key = normalize_url(url)
+            if key in self._seen_urls:
+                self.stats['duplicate_urls'] += 1
+                return None
+            self._seen_urls.add(key)
+        if result.get('score') is not None and result['score'] < self.min_score:
+            self.stats['low_score'] += 1
+            return None
+
+        shaped: Dict[str, Any] = {}
+        for name in self.fields:
+            value = result.get(name)
+            if value in (None, ''):
+                continue
+            if name == 'content':
+                terms = query_terms(' '.join(result.get('queries') or [query]))
+                value = ' '.join(self._select_sentences(compact_whitespace(value), terms))
+                if not value:
+                    continue
+            elif name == 'score':
+                value = round(value, 2)
+            elif isinstance(value, str):
+                value = compact_whitespace(value)
+            shaped[name] = value
+        # Un risultato il cui contenuto è già stato restituito per intero non aggiunge nulla
+        if 'content' in self.fields and result.get('content') and 'content' not in shaped:
+            return None
+        return shaped
+
+    def shape(self, query: str, results: List[Dict[str, Any]], raw_text: str,
+              errors: Optional[List[Dict[str, Any]]] = None) -> str:
+        """Restituisce il JSON compatto da passare all'agente e aggiorna i contatori di token"""
+        with self._lock:
+            shaped = [item for item in (self._shape_result(result, query) for result in results) if item]
+            payload: Dict[str, Any] = {'results': shaped}
+            omitted = len(results) - len(shaped)
+            if omitted:
+                payload['omitted'] = f"{omitted} risultati già restituiti in ricerche precedenti o poco pertinenti"
+            if errors:
+                payload['errors'] = errors
+            text = json.dumps(payload, ensure_ascii=False, separators=(',', ':'))
+            tokens_before, tokens_after = estimate_tokens(raw_text), estimate_tokens(text)
+
+            self.stats['calls'] += 1
+            self.stats['results_in'] += len(results)
+            self.stats['results_out'] += len(shaped)
+            self.stats['tokens_before'] += tokens_before
+            self.stats['tokens_after'] += tokens_after
+        logger.debug(f"Ricerca '{query}': {len(shaped)}/{len(results)} risultati, {tokens_before} → {tokens_after} token")
+        return text
+
+    def report(self) -> Dict[str, Any]:
+        """Contatori del run con la riduzione percentuale dei token passati agli agenti"""
+        with self._lock:
+            report: Dict[str, Any] = dict(self.stats)
+        before = report['tokens_before']
+        report['reduction'] = round(1 - report['tokens_after'] / before, 3) if before else 0.0
+        return report
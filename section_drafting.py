@@ -0,0 +1,109 @@
+"""Section Drafting per Blog Generator
+Suddivide l'outline YAML in sezioni da scrivere in parallelo e ricompone l'articolo
+"""
+
+import re
+import yaml
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Chiavi dell'outline che descrivono metadati e non sezioni da scrivere
+META_KEYS = {
+    'meta', 'metadata', 'seo', 'seo_notes', 'note_seo', 'note', 'keywords', 'keyword',
+    'schema', 'schema_markup', 'link', 'links', 'link_strategy', 'slug', 'title', 'titolo',
+    'h1', 'meta_title', 'meta_description', 'word_count', 'parole', 'stima_parole', 'totale_parole'
+}
+TITLE_KEYS = ('h2', 'titolo', 'title', 'heading', 'nome', 'sezione')
+H1_KEYS = ('h1', 'titolo', 'title', 'meta_title')
+TEXT_SECTION_HINTS = ('intro', 'conclus', 'faq')
+
+_FENCE_RE = re.compile(r"```(?:ya?ml)?\s*\n(.*?)```", re.DOTALL)
+_HEADING_RE = re.compile(r"^(#{1,2})\s+(.+)$", re.MULTILINE)
+
+
+def load_outline(outline_text: str) -> Any:
+    """Carica l'outline YAML, anche se racchiuso in un blocco di codice Markdown"""
+    match = _FENCE_RE.search(outline_text)
+    try:
+        return yaml.safe_load(match.group(1) if match else outline_text)
+    except yaml.YAMLError as e:
+        logger.warning(f"Outline non parsabile come YAML: {e}")
+        return None
+
+
+def _section_title(spec: Any, fallback: str) -> str:
+    """Ricava il titolo della sezione dalla sua specifica"""
+    if isinstance(spec, dict):
+        for key in TITLE_KEYS:
+            if spec.get(key):
+                return str(spec[key])
+    return fallback.replace('_', ' ').capitalize()
+
+
+def _make_section(spec: Any, fallback_title: str) -> Dict[str, str]:
+    return {
+        'title': _section_title(spec, fallback_title),
+        'spec': yaml.safe_dump(spec, allow_unicode=True, sort_keys=False).strip()
+    }
+
+
+def _collect_sections(data: Dict[str, Any]) -> List[Dict[str, str]]:
+    sections = []
+    for key, value in data.items():
+        if str(key).lower() in META_KEYS:
+            continue
+        if isinstance(value, list) and value and all(isinstance(item, dict) for item in value):
+            for index, item in enumerate(value, 1):
+                sections.append(_make_section(item, f"{key} {index}"))
+        elif isinstance(value, dict):
+            sections.append(_make_section(value, str(key)))
+        elif any(hint in str(key).lower() for hint in TEXT_SECTION_HINTS):
+            sections.append(_make_section({str(key): value}, str(key)))
+    return sections
+
+
+def parse_outline_sections(outline_text: str) -> Tuple[Optional[str], List[Dict[str, str]]]:
+    """Estrae titolo H1 e sezioni (titolo + specifica) dall'outline prodotto dallo stage outline"""
+    data = load_outline(outline_text)
+
+    # Outline racchiuso in una singola chiave radice (es. "outline:" o "articolo:")
+    while isinstance(data, dict) and len(data) == 1 and isinstance(next(iter(data.values())), dict):
+        data = next(iter(data.values()))
+
+    if isinstance(data, dict):
+        title = next((str(data[key]) for key in H1_KEYS if isinstance(data.get(key), str)), None)
+        return title, _collect_sections(data)
+    # Un outline Markdown con elenchi puntati è anche YAML valido (i titoli diventano commenti): con titoli H2
+    # fuori da un blocco YAML si usano le intestazioni
+    headings = list(_HEADING_RE.finditer(outline_text))
+    markdown = _FENCE_RE.search(outline_text) is None and any(len(match.group(1)) == 2 for match in headings)
+    if isinstance(data, list) and not markdown:
+        return None, [_make_section(item, f"sezione {index}") for index, item in enumerate(data, 1)]
+
+    # Fallback: outline in Markdown, titolo dall'H1 e una sezione per ogni H2
+    title = None
+    sections = []
+    for index, match in enumerate(headings):
+        if len(match.group(1)) == 1:
+            title = title or match.group(2).strip()
+            continue
+        end = headings[index + 1].start() if index + 1 < len(headings) else len(outline_text)
+        sections.append({'title': match.group(2).strip(), 'spec': outline_text[match.start():end].strip()})
+    return title, sections
+
+
+def boundary_excerpts(previous: str, following: str, max_chars: int = 600) -> Tuple[str, str]:
+    """Restituisce la fine della sezione precedente e l'inizio della successiva"""
+    return previous.strip()[-max_chars:], following.strip()[:max_chars]
+
+
+def assemble_article(title: Optional[str], sections: List[str], transitions: List[str]) -> str:
+    """Ricompone l'articolo inserendo le transizioni tra sezioni consecutive"""
+    parts = [f"# {title}"] if title and not sections[0].lstrip().startswith('# ') else []
+    for index, section in enumerate(sections):
+        if index > 0 and transitions[index - 1]:
+            parts.append(transitions[index - 1].strip())
+        parts.append(section.strip())
+    return "\n\n".join(parts) + "\n"
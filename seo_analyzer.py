@@ -0,0 +1,256 @@
+"""SEO Analyzer per Blog Generator
+Metriche SEO deterministiche calcolate localmente sul Markdown (densità keyword, Gulpease, link, titoli, meta)
+"""
+
+import re
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+_CODE_BLOCK_RE = re.compile(r"```.*?```", re.DOTALL)
+_IMAGE_RE = re.compile(r"!\[([^\]]*)\]\([^)]*\)")
+_LINK_RE = re.compile(r"(?<!!)\[([^\]]+)\]\(\s*<?([^)\s>]+)>?(?:\s+\"[^\"]*\")?\s*\)")
+_BARE_URL_RE = re.compile(r"(?<![(<\[])\bhttps?://[^\s)>\]]+")
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$", re.MULTILINE)
+_META_RE = re.compile(r"^\W*meta[\s_-]*(title|description)\W*?[:：]\s*(.+)$", re.IGNORECASE | re.MULTILINE)
+_FRONT_MATTER_RE = re.compile(r"\A---\s*\n(.*?)\n---\s*\n", re.DOTALL)
+_WORD_RE = re.compile(r"[^\W\d_]+(?:['’][^\W\d_]+)*|\d+(?:[.,]\d+)*", re.UNICODE)
+_SENTENCE_END_RE = re.compile(r"[.!?…]+(?=\s|$)")
+_VOWEL_GROUP_RE = re.compile(r"[aeiouyàèéìíòóùú]+", re.IGNORECASE)
+
+READABILITY_INDEXES = ('gulpease', 'flesch_vacca')
+
+
+def plain_text(markdown: str) -> str:
+    """Riduce il Markdown a testo semplice (una riga per blocco) per le metriche di leggibilità"""
+    text = _FRONT_MATTER_RE.sub('', markdown)
+    text = _CODE_BLOCK_RE.sub('', text)
+    text = _META_RE.sub('', text)
+    text = _IMAGE_RE.sub(r"\1", text)
+    text = _LINK_RE.sub(r"\1", text)
+    text = _BARE_URL_RE.sub('', text)
+    text = re.sub(r"^\s{0,3}(?:#{1,6}|>|[-*+]|\d+[.)])\s+", '', text, flags=re.MULTILINE)
+    text = re.sub(r"[*_`|]+", ' ', text)
+    return text
+
+
+def tokenize(text: str) -> List[str]:
+    """Parole del testo in minuscolo"""
+    return [word.lower() for word in _WORD_RE.findall(text)]
+
+
+def count_sentences(text: str) -> int:
+    """Conta le frasi: punteggiatura finale, più i blocchi (titoli, voci di elenco) che ne sono privi"""
+    sentences = 0
+    for line in text.splitlines():
+        line = line.strip()
+        if not _WORD_RE.search(line):
+            continue
+        sentences += len(_SENTENCE_END_RE.findall(line))
+        if not _SENTENCE_END_RE.search(line[-1:] + ' '):
+            sentences += 1
+    return sentences
+
+
+def gulpease_index(words: List[str], sentences: int) -> float:
+    """Indice Gulpease (0-100): 89 + (300 * frasi - 10 * lettere) / parole"""
+    if not words:
+        return 0.0
+    letters = sum(len(word) for word in words if not word[0].isdigit())
+    score = 89 + (300 * sentences - 10 * letters) / len(words)
+    return max(0.0, min(100.0, score))
+
+
+def flesch_vacca_index(words: List[str], sentences: int) -> float:
+    """Indice Flesch-Vacca: 206 - 0.65 * sillabe per 100 parole - parole per frase (sillabe stimate)"""
+    if not words or not sentences:
+        return 0.0
+    syllables = sum(max(1, len(_VOWEL_GROUP_RE.findall(word))) for word in words)
+    score = 206 - 0.65 * (100 * syllables / len(words)) - len(words) / sentences
+    return max(0.0, min(100.0, score))
+
+
+def _site_host(url: Optional[str]) -> str:
+    if not url:
+        return ''
+    host = urlparse(url if '://' in url else f"https://{url}").netloc.lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+def _phrase_counts(words: List[str], index: Dict[str, List[Tuple[str, ...]]]) -> Dict[Tuple[str, ...], int]:
+    """Occorrenze di tutte le keyword in un solo passaggio sulle parole (indice per prima parola)"""
+    counts = {phrase: 0 for phrases in index.values() for phrase in phrases}
+    for i, word in enumerate(words):
+        for phrase in index.get(word, ()):
+            if tuple(words[i:i + len(phrase)]) == phrase:
+                counts[phrase] += 1
+    return counts
+
+
+class SEOAnalyzer:
+    """Calcola le metriche SEO di uno o più articoli confrontandole con i target di seo_config"""
+
+    def __init__(self, seo_config: Dict[str, Any], primary_keywords: Optional[List[str]] = None,
+                 secondary_keywords: Optional[List[str]] = None, target_website: Optional[str] = None,
+                 word_count: Optional[int] = None):
+        self.seo_config = seo_config
+        self.primary_keywords = [tuple(tokenize(k)) for k in primary_keywords or [] if tokenize(k)]
+        self.secondary_keywords = [tuple(tokenize(k)) for k in secondary_keywords or [] if tokenize(k)]
+        # Keyword tokenizzate e indicizzate una volta, condivise da tutti gli articoli analizzati
+        self._keyword_index: Dict[str, List[Tuple[str, ...]]] = {}
+        for phrase in set(self.primary_keywords[:1] + self.secondary_keywords):
+            self._keyword_index.setdefault(phrase[0], []).append(phrase)
+        self.site_host = _site_host(target_website)
+        self.word_count = word_count
+        self.readability_index = seo_config.get('readability_index', 'gulpease')
+        if self.readability_index not in READABILITY_INDEXES:
+            logger.warning(f"Indice di leggibilità {self.readability_index} non supportato, uso gulpease")
+            self.readability_index = 'gulpease'
+
+    @staticmethod
+    def _density(words: List[str], counts: Dict[Tuple[str, ...], int], phrase: Tuple[str, ...]) -> float:
+        return 100 * counts[phrase] * len(phrase) / len(words) if words else 0.0
+
+    def _links(self, markdown: str) -> Dict[str, int]:
+        urls = [url for _, url in _LINK_RE.findall(markdown)] + _BARE_URL_RE.findall(markdown)
+        internal, external = 0, 0
+        for url in urls:
+            host = _site_host(url) if url.startswith(('http://', 'https://', 'www.')) else ''
+            if not host or (self.site_host and (host == self.site_host or host.endswith(f".{self.site_host}"))):
+                internal += 1
+            else:
+                external += 1
+        return {'internal': internal, 'external': external}
+
+    @staticmethod
+    def _headings(markdown: str) -> Dict[str, Any]:
+        levels = [(len(hashes), title) for hashes, title in _HEADING_RE.findall(_CODE_BLOCK_RE.sub('', markdown))]
+        skipped = sum(1 for (prev, _), (level, _) in zip(levels, levels[1:]) if level > prev + 1)
+        return {
+            'h1': sum(1 for level, _ in levels if level == 1),
+            'h2': sum(1 for level, _ in levels if level == 2),
+            'h3_plus': sum(1 for level, _ in levels if level >= 3),
+            'skipped_levels': skipped,
+            'title': next((title for level, title in levels if level == 1), None)
+        }
+
+    @staticmethod
+    def _meta(markdown: str, h1: Optional[str]) -> Dict[str, Any]:
+        meta = {name.lower(): value.strip().strip('"*_ ') for name, value in _META_RE.findall(markdown)}
+        front_matter = _FRONT_MATTER_RE.match(markdown)
+        if front_matter:
+            for line in front_matter.group(1).splitlines():
+                key, _, value = line.partition(':')
+                key = key.strip().lower().replace('meta_', '')
+                if key in ('title', 'description') and key not in meta:
+                    meta[key] = value.strip().strip('"\'')
+        title = meta.get('title') or h1
+        return {
+            'title': title,
+            'title_source': 'meta' if meta.get('title') else ('h1' if h1 else None),
+            'title_length': len(title) if title else 0,
+            'description': meta.get('description'),
+            'description_length': len(meta['description']) if meta.get('description') else 0
+        }
+
+    def analyze(self, markdown: str) -> Dict[str, Any]:
+        """Calcola le metriche di un articolo e l'esito di ogni controllo rispetto ai target"""
+        text = plain_text(markdown)
+        words = tokenize(text)
+        counts = _phrase_counts(words, self._keyword_index)
+        sentences = count_sentences(text)
+        headings = self._headings(markdown)
+        metrics = {
+            'word_count': len(words),
+            'sentences': sentences,
+            'words_per_sentence': round(len(words) / sentences, 1) if sentences else 0.0,
+            'gulpease': round(gulpease_index(words, sentences), 1),
+            'flesch_vacca': round(flesch_vacca_index(words, sentences), 1),
+            'keyword_density': {
+                'primary': round(self._density(words, counts, self.primary_keywords[0]), 2) if self.primary_keywords else None,
+                'secondary': round(sum(self._density(words, counts, k) for k in self.secondary_keywords)
+                                   / len(self.secondary_keywords), 2) if self.secondary_keywords else None
+            },
+            'links': self._links(markdown),
+            'headings': {key: value for key, value in headings.items() if key != 'title'},
+            'meta': self._meta(markdown, headings['title'])
+        }
+        checks = self._checks(metrics)
+        return {
+            'metrics': metrics,
+            'checks': checks,
+            'passed': all(check['passed'] for check in checks)
+        }
+
+    def analyze_many(self, documents: List[str]) -> List[Dict[str, Any]]:
+        """Analizza più articoli con indice delle keyword e pattern condivisi; i documenti identici una sola volta"""
+        reports: Dict[str, Dict[str, Any]] = {}
+        for document in documents:
+            if document not in reports:
+                reports[document] = self.analyze(document)
+        return [reports[document] for document in documents]
+
+    def _checks(self, metrics: Dict[str, Any]) -> List[Dict[str, Any]]:
+        config = self.seo_config
+        checks = []
+
+        def check(name: str, value: Any, target: str, passed: bool, warning: bool = False) -> None:
+            checks.append({'name': name, 'value': value, 'target': target, 'passed': passed, 'warning': warning})
+
+        tolerance = config.get('keyword_density_tolerance', 0.5)
+        for group in ('primary', 'secondary'):
+            target = config.get('keyword_density', {}).get(group)
+            value = metrics['keyword_density'][group]
+            if target is None or value is None:
+                continue
+            low, high = target * (1 - tolerance), target * (1 + tolerance)
+            check(f"keyword_density.{group}", f"{value}%", f"{low:.2f}-{high:.2f}%", low <= value <= high)
+
+        readability_target = config.get('readability_target')
+        if readability_target is not None:
+            value = metrics[self.readability_index]
+            check(self.readability_index, value, f">= {readability_target}", value >= readability_target)
+
+        for kind in ('internal', 'external'):
+            minimum = config.get(f"{kind}_links_min")
+            if minimum is not None:
+                value = metrics['links'][kind]
+                check(f"links.{kind}", value, f">= {minimum}", value >= minimum)
+
+        headings = metrics['headings']
+        check('headings.h1', headings['h1'], "= 1", headings['h1'] == 1)
+        check('headings.h2', headings['h2'], ">= 2", headings['h2'] >= 2)
+        check('headings.skipped_levels', headings['skipped_levels'], "= 0", headings['skipped_levels'] == 0)
+
+        meta = metrics['meta']
+        title_max = config.get('meta_title_max', 60)
+        check('meta.title_length', meta['title_length'], f"1-{title_max}", 0 < meta['title_length'] <= title_max)
+        desc_max = config.get('meta_desc_max', 155)
+        if meta['description']:
+            check('meta.description_length', meta['description_length'], f"<= {desc_max}",
+                  meta['description_length'] <= desc_max)
+        else:
+            # La description può essere ricavata dal CMS: assenza segnalata ma non bloccante
+            check('meta.description_length', 0, f"<= {desc_max}", True, warning=True)
+
+        if self.word_count:
+            word_tolerance = config.get('word_count_tolerance', 0.1)
+            low, high = int(self.word_count * (1 - word_tolerance)), int(self.word_count * (1 + word_tolerance))
+            check('word_count', metrics['word_count'], f"{low}-{high}", low <= metrics['word_count'] <= high)
+
+        return checks
+
+
+def format_report_diff(report: Dict[str, Any]) -> str:
+    """Riassume in poche righe i controlli fuori target, da passare al task di ottimizzazione"""
+    lines = []
+    for check in report['checks']:
+        if not check['passed']:
+            lines.append(f"- {check['name']}: {check['value']} (target {check['target']})")
+        elif check['warning']:
+            lines.append(f"- {check['name']}: assente (da aggiungere, target {check['target']})")
+    passed = sum(1 for check in report['checks'] if check['passed'] and not check['warning'])
+    lines.append(f"Controlli già superati: {passed}/{len(report['checks'])}; non modificare ciò che è già conforme.")
+    return "\n".join(lines)
@@ -0,0 +1,84 @@
+"""Stage Cache per Blog Generator
+Cache content-addressed degli output di ciascuno stage della pipeline
+"""
+
+import hashlib
+import json
+import os
+import string
+import tempfile
+import time
+import logging
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def template_fields(template: str) -> List[str]:
+    """Restituisce i campi interpolati da un template di prompt (es. {topic})"""
+    fields = set()
+    for _, field_name, _, _ in string.Formatter().parse(template):
+        if field_name:
+            fields.add(field_name.split('.')[0].split('[')[0])
+    return sorted(fields)
+
+
+def atomic_write_json(path: str, data: Any) -> None:
+    """Scrive un file JSON in modo atomico (file temporaneo + rename)"""
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            json.dump(data, file, indent=2, ensure_ascii=False, default=str)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class StageCache:
+    """Salva gli output degli stage indicizzati per modello, prompt e campi di input usati"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    @staticmethod
+    def make_key(stage: str, model: str, template: str, input_dict: Dict[str, Any],
+                 upstream_keys: List[str], extra: Optional[Dict[str, Any]] = None) -> str:
+        """Calcola la chiave dello stage considerando solo i campi referenziati dal template"""
+        payload = {
+            'stage': stage,
+            'model': model,
+            'template': template,
+            'fields': {name: input_dict.get(name) for name in template_fields(template)},
+            'upstream': upstream_keys,
+            'extra': extra or {}
+        }
+        encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[str]:
+        """Restituisce l'output in cache per la chiave, se presente"""
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as file:
+                return json.load(file)['output']
+        except FileNotFoundError:
+            return None
+        except (json.JSONDecodeError, KeyError) as e:
+            logger.warning(f"Voce della cache stage {key} non leggibile, verrà rigenerata: {e}")
+            return None
+
+    def put(self, key: str, stage: str, output: str) -> None:
+        """Salva l'output di uno stage"""
+        atomic_write_json(self._path(key), {
+            'stage': stage,
+            'created_at': time.time(),
+            'output': output
+        })
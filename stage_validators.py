@@ -0,0 +1,107 @@
+"""Stage Validators per Blog Generator
+Parsing tipizzato e controlli deterministici sull'output di ogni stage (riparazione, retry ed escalation)
+"""
+
+import logging
+from typing import Any, Callable, Dict, List
+
+from context_compactor import parse_json_output
+from section_drafting import load_outline, parse_outline_sections
+from seo_analyzer import plain_text, tokenize
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REQUIRED_KEYS = {
+    'research': ['facts', 'sources', 'keywords'],
+    'analysis': []
+}
+# Tipi attesi delle chiavi JSON, quando presenti
+SCHEMAS = {
+    'research': {'facts': list, 'sources': list, 'keywords': (dict, list), 'opportunities': (list, str),
+                 'market_insights': (list, str)},
+    'analysis': {}
+}
+# Stage secondari (meta tag, FAQ, link interni, schema) con output JSON
+JSON_SIDE_STAGES = ('meta_tags', 'faq', 'internal_links', 'schema')
+# Stage con output strutturato: un errore di formato si corregge con un prompt di riparazione
+REPAIRABLE_STAGES = ('research', 'analysis', 'outline')
+# Riga che separa l'articolo della bozza dalle note redazionali (conteggi, note SEO, link, schema)
+DRAFT_NOTES_MARKER = "---NOTE REDAZIONALI---"
+
+
+class StageValidationError(ValueError):
+    """Output di uno stage non valido anche dopo riparazioni, retry ed escalation"""
+
+    def __init__(self, stage: str, errors: List[str]):
+        super().__init__(f"Output dello stage {stage} non valido: {'; '.join(errors)}")
+        self.stage = stage
+        self.errors = errors
+
+
+def _validate_json(stage: str, output: str, settings: Dict[str, Any]) -> List[str]:
+    data = parse_json_output(output)
+    if not isinstance(data, dict):
+        return ["output non in formato JSON"]
+    required = settings.get('required_keys', {}).get(stage, DEFAULT_REQUIRED_KEYS.get(stage, []))
+    errors = []
+    missing = [key for key in required if not data.get(key)]
+    if missing:
+        errors.append(f"chiavi JSON mancanti o vuote: {', '.join(missing)}")
+    for key, expected in SCHEMAS.get(stage, {}).items():
+        if data.get(key) is not None and not isinstance(data[key], expected):
+            errors.append(f"chiave '{key}' di tipo {type(data[key]).__name__} non valido")
+    return errors
+
+
+def _validate_outline(stage: str, output: str, settings: Dict[str, Any]) -> List[str]:
+    if not isinstance(load_outline(output), (dict, list)):
+        return ["outline non parsabile come YAML"]
+    _, sections = parse_outline_sections(output)
+    min_sections = settings.get('min_outline_sections', 3)
+    if len(sections) < min_sections:
+        return [f"outline con {len(sections)} sezioni (minimo {min_sections})"]
+    return []
+
+
+def _validate_word_count(stage: str, output: str, settings: Dict[str, Any], word_count: int) -> List[str]:
+    words = len(tokenize(plain_text(output)))
+    low = int(word_count * settings.get('word_count_min_ratio', 0.7))
+    high = int(word_count * settings.get('word_count_max_ratio', 1.6))
+    if not low <= words <= high:
+        return [f"{words} parole, attese {low}-{high}"]
+    return []
+
+
+VALIDATORS: Dict[str, Callable[..., List[str]]] = {
+    'research': _validate_json,
+    'analysis': _validate_json,
+    'outline': _validate_outline
+}
+
+
+def validate_stage_output(stage: str, output: str, word_count: int, settings: Dict[str, Any]) -> List[str]:
+    """Restituisce gli errori di validazione dell'output di uno stage (lista vuota se valido)"""
+    if not output or not output.strip():
+        return ["output vuoto"]
+    if stage in ('drafting', 'optimization'):
+        return _validate_word_count(stage, strip_draft_notes(output), settings, word_count)
+    validator = VALIDATORS.get(stage)
+    return validator(stage, output, settings) if validator else []
+
+
+def strip_draft_notes(output: str) -> str:
+    """Articolo della bozza senza le note redazionali destinate solo all'ottimizzazione"""
+    return output.split(DRAFT_NOTES_MARKER, 1)[0].rstrip()
+
+
+def parse_stage_output(stage: str, output: str) -> Any:
+    """Risultato tipizzato di uno stage: JSON per ricerca, analisi e stage SEO secondari, sezioni per l'outline, Markdown con metriche per gli articoli"""
+    if stage in ('research', 'analysis') + JSON_SIDE_STAGES:
+        return parse_json_output(output)
+    if stage == 'outline':
+        title, sections = parse_outline_sections(output)
+        return {'title': title, 'sections': sections, 'data': load_outline(output)}
+    if stage in ('drafting', 'optimization'):
+        article = strip_draft_notes(output)
+        return {'markdown': article, 'word_count': len(tokenize(plain_text(article)))}
+    return None
@@ -0,0 +1,91 @@
+"""Streaming per Blog Generator
+Scrive i token degli LLM man mano che arrivano su file Markdown e/o stdout
+"""
+
+import os
+import sys
+import time
+import logging
+from typing import Any, Dict, Iterable, List, Optional, TextIO, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class StreamSink:
+    """Destinazione dei token in streaming: file Markdown incrementale e/o stdout"""
+
+    def __init__(self, path: Optional[str] = None, to_stdout: bool = False):
+        self.path = path
+        self.to_stdout = to_stdout
+        self._streams: List[TextIO] = []
+
+    def __enter__(self) -> 'StreamSink':
+        if self.path:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self._streams.append(open(self.path, 'w', encoding='utf-8'))
+        if self.to_stdout:
+            self._streams.append(sys.stdout)
+        return self
+
+    def write(self, text: str) -> None:
+        for stream in self._streams:
+            stream.write(text)
+            stream.flush()
+
+    def __exit__(self, *exc_info) -> None:
+        for stream in self._streams:
+            if stream is not sys.stdout:
+                stream.close()
+        if self.to_stdout:
+            sys.stdout.write("\n")
+            sys.stdout.flush()
+        self._streams = []
+
+
+def _chunk_text(chunk: Any) -> str:
+    """Estrae il testo da un chunk (messaggio LangChain o stringa)"""
+    content = getattr(chunk, 'content', chunk)
+    if isinstance(content, list):
+        return ''.join(part.get('text', '') if isinstance(part, dict) else str(part) for part in content)
+    return content or ''
+
+
+def _add_usage(usage: Dict[str, int], chunk: Any) -> None:
+    """Accumula l'utilizzo token riportato nei chunk (usage_metadata di LangChain)"""
+    metadata = getattr(chunk, 'usage_metadata', None)
+    if not metadata:
+        return
+    usage['prompt_tokens'] += metadata.get('input_tokens', 0)
+    usage['completion_tokens'] += metadata.get('output_tokens', 0)
+    usage['total_tokens'] += metadata.get('total_tokens', 0)
+    usage['cached_prompt_tokens'] += (metadata.get('input_token_details') or {}).get('cache_read', 0)
+    usage['successful_requests'] = 1
+
+
+def consume_stream(chunks: Iterable[Any], sink: StreamSink) -> Tuple[str, Dict[str, Any]]:
+    """Inoltra i chunk alla destinazione e misura time-to-first-token e tempo totale"""
+    start = time.monotonic()
+    first_token_at = None
+    parts = []
+    usage = {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0,
+             'cached_prompt_tokens': 0, 'successful_requests': 0}
+
+    for chunk in chunks:
+        _add_usage(usage, chunk)
+        text = _chunk_text(chunk)
+        if not text:
+            continue
+        if first_token_at is None:
+            first_token_at = time.monotonic()
+        parts.append(text)
+        sink.write(text)
+
+    total_time = time.monotonic() - start
+    stats = {
+        'time_to_first_token_seconds': (first_token_at - start) if first_token_at is not None else None,
+        'total_time_seconds': total_time,
+        'chunks': len(parts),
+        'output_path': sink.path,
+        'usage': usage
+    }
+    return ''.join(parts), stats
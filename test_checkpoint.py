@@ -0,0 +1,66 @@
+"""Test dei Checkpoint per Blog Generator
+Registrazione dell'input, ripresa degli stage completati e protezione dai run ID riutilizzati
+"""
+
+import pytest
+
+from blog_generator import RunContext
+from checkpoint import CheckpointStore, new_run_id
+from input_manager import BlogInput
+
+INPUT = {'topic': "Case vacanza ad Amalfi", 'target_audience': "famiglie", 'word_count': 1200}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return CheckpointStore(str(tmp_path / 'checkpoints'))
+
+
+def test_run_ids_are_unique_within_the_same_second():
+    assert len({new_run_id() for _ in range(100)}) == 100
+
+
+def test_restart_with_the_same_input_resumes(store):
+    store.start('run', INPUT)
+    store.set_status('run', 'failed', "timeout")
+    store.start('run', {**INPUT, 'variants': None})
+
+    assert store.load_run('run')['status'] == 'running'
+
+
+def test_restart_with_a_different_input_is_refused(store):
+    store.start('run', INPUT)
+    store.save_stage('run', 'research', "ricerca su Amalfi")
+
+    with pytest.raises(ValueError, match="input diverso"):
+        store.start('run', {**INPUT, 'topic': "Trekking in Val d'Aosta"})
+    assert store.load_run('run')['input'] == INPUT
+    assert store.load_stages('run') == {'research': "ricerca su Amalfi"}
+
+
+def test_completed_stages_are_loaded_and_unreadable_ones_skipped(store):
+    store.start('run', INPUT)
+    store.save_stage('run', 'research', "ricerca", parsed={'facts': []})
+    store.save_stage('run', 'analysis', "analisi")
+    with open(store._run_dir('run') + '/stage_analysis.json', 'w', encoding='utf-8') as file:
+        file.write("{troncato")
+
+    assert store.load_stages('run') == {'research': "ricerca"}
+    assert store.load_stages('missing') == {}
+
+
+def test_resumed_run_skips_checkpointed_stages(make_generator):
+    generator = make_generator(stage_cache={'enabled': False})
+    generator.checkpoints.start('run', INPUT)
+    generator.checkpoints.save_stage('run', 'research', '{"facts": ["fatto"]}')
+    executed = []
+    generator.run_stage = lambda stage, *args: executed.append(stage) or "analisi"
+
+    run_context = RunContext(run_id='run', completed=generator.checkpoints.load_stages('run'))
+    for stage in ('research', 'analysis'):
+        generator.execute_pipeline_stage(stage, BlogInput(**INPUT), run_context)
+
+    assert executed == ['analysis']
+    assert run_context.resumed_stages == ['research']
+    assert run_context.stage_results['research'] == {'facts': ["fatto"]}
+    assert generator.checkpoints.load_stages('run') == {'research': '{"facts": ["fatto"]}', 'analysis': "analisi"}
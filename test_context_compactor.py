@@ -0,0 +1,60 @@
+"""Test del Context Compactor per Blog Generator
+Digest della ricerca, ripartizione del budget tra gli stage e integrità dell'output principale
+"""
+
+import json
+
+from context_compactor import (TRUNCATION_MARKER, compact_context, distill_research, estimate_tokens,
+                               parse_json_output, truncate_to_budget)
+
+RESEARCH = {
+    'facts': [f"Fatto numero {index} sulla costiera amalfitana" for index in range(30)],
+    'sources': [{'url': f"https://example.com/{index}", 'title': f"Fonte {index}", 'content': "testo lungo"}
+                for index in range(20)],
+    'keywords': {'primary': [f"kw{index}" for index in range(20)]},
+    'opportunities': ["gap di contenuto"]
+}
+
+
+def test_parse_json_output_reads_fenced_and_embedded_json():
+    assert parse_json_output('```json\n{"a": 1}\n```') == {'a': 1}
+    assert parse_json_output('Ecco il report: {"a": 1} fine') == {'a': 1}
+    assert parse_json_output("nessun json") is None
+
+
+def test_truncate_to_budget_marks_the_cut():
+    text = "parola " * 400
+    truncated = truncate_to_budget(text, 50)
+    assert truncated.endswith(TRUNCATION_MARKER)
+    assert estimate_tokens(truncated) < estimate_tokens(text)
+    assert truncate_to_budget("breve", 50) == "breve"
+
+
+def test_distill_research_keeps_only_the_digest_fields():
+    digest = json.loads(distill_research(json.dumps(RESEARCH), max_facts=5, max_sources=3, max_keywords=4))
+    assert len(digest['facts']) == 5
+    assert digest['sources'][0] == {'url': "https://example.com/0", 'title': "Fonte 0"}
+    assert len(digest['sources']) == 3
+    assert digest['keywords'] == {'primary': ['kw0', 'kw1', 'kw2', 'kw3']}
+
+
+def test_distill_research_ignores_malformed_fields():
+    malformed = json.dumps({'facts': "un solo fatto", 'sources': {'url': "https://example.com"}, 'keywords': []})
+    digest = json.loads(distill_research(malformed))
+    assert digest['facts'] == [] and digest['sources'] == []
+    assert distill_research("report in prosa") is None
+
+
+def test_primary_output_is_never_truncated():
+    draft = "Paragrafo della bozza con molte parole. " * 2000
+    context = compact_context([('research', json.dumps(RESEARCH)), ('drafting', draft)], budget=1000)
+    assert context == draft
+
+
+def test_upstream_outputs_share_the_remaining_budget():
+    outline = "Sezione dello schema. " * 500
+    context = compact_context([('research', json.dumps(RESEARCH)), ('outline', outline), ('analysis', "breve")],
+                              budget=600)
+    assert context.endswith("breve")
+    assert TRUNCATION_MARKER in context
+    assert estimate_tokens(context) <= 600 + 2 * estimate_tokens(TRUNCATION_MARKER)
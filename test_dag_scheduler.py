@@ -0,0 +1,95 @@
+"""Test del DAG Scheduler per Blog Generator
+Ordinamento, parallelismo, stage opzionali falliti o saltati e percorso critico
+"""
+
+import threading
+import time
+
+import pytest
+
+from dag_scheduler import DAGScheduler, critical_path, topological_order
+
+PIPELINE = {
+    'research': [],
+    'outline': ['research'],
+    'drafting': ['outline'],
+    'meta_tags': ['research', 'outline'],
+    'faq': ['research', 'outline'],
+    'schema': ['outline', 'meta_tags', 'faq']
+}
+
+
+def test_topological_order_respects_dependencies():
+    order = topological_order(PIPELINE)
+    for stage, inputs in PIPELINE.items():
+        assert all(order.index(dep) < order.index(stage) for dep in inputs)
+
+
+def test_invalid_graphs_are_rejected():
+    with pytest.raises(ValueError, match="non definiti"):
+        topological_order({'a': ['missing']})
+    with pytest.raises(ValueError, match="cicliche"):
+        topological_order({'a': ['b'], 'b': ['a']})
+
+
+def test_critical_path_follows_the_last_finished_dependency():
+    timings = {
+        'research': {'start': 0, 'end': 1},
+        'outline': {'start': 1, 'end': 2},
+        'drafting': {'start': 2, 'end': 6},
+        'meta_tags': {'start': 2, 'end': 3},
+        'faq': {'start': 2, 'end': 4},
+        'schema': {'start': 4, 'end': 5}
+    }
+    assert critical_path(PIPELINE, timings) == ['research', 'outline', 'drafting']
+    assert critical_path(PIPELINE, {}) == []
+
+
+def test_independent_stages_run_concurrently():
+    running, peak = set(), []
+    lock = threading.Lock()
+
+    def execute(stage):
+        with lock:
+            running.add(stage)
+            peak.append(len(running))
+        time.sleep(0.05)
+        with lock:
+            running.discard(stage)
+
+    report = DAGScheduler(PIPELINE, max_workers=4).run(execute)
+
+    assert max(peak) >= 3  # drafting, meta_tags e faq dopo l'outline
+    assert set(report['timings']) == set(PIPELINE)
+    assert report['failed'] == {} and report['skipped'] == []
+    assert report['total_seconds'] < report['sequential_seconds']
+
+
+def test_failed_optional_stage_skips_its_dependents():
+    executed = []
+
+    def execute(stage):
+        if stage == 'faq':
+            raise ValueError("JSON non valido")
+        executed.append(stage)
+
+    report = DAGScheduler(PIPELINE, max_workers=4, optional=['meta_tags', 'faq', 'schema']).run(execute)
+
+    assert 'faq' in report['failed']
+    assert report['skipped'] == ['schema']
+    assert 'schema' not in executed
+    assert 'schema' not in report['timings']
+    assert 'faq' not in report['critical_path']
+
+
+def test_failed_required_stage_stops_the_run():
+    executed = []
+
+    def execute(stage):
+        if stage == 'outline':
+            raise RuntimeError("crew fallita")
+        executed.append(stage)
+
+    with pytest.raises(RuntimeError, match="crew fallita"):
+        DAGScheduler(PIPELINE, max_workers=4, optional=['meta_tags', 'faq', 'schema']).run(execute)
+    assert executed == ['research']
@@ -0,0 +1,124 @@
+"""Test della Job Queue per Blog Generator
+Priorità, presa in carico concorrente, cancellazione e lease dei job tra più daemon
+"""
+
+import threading
+
+import pytest
+
+import job_queue
+from job_queue import JobQueue
+
+
+class FakeClock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(job_queue.time, 'time', fake.time)
+    return fake
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path / 'jobs.sqlite'), lease_seconds=60)
+
+
+def submit(queue, name, priority=0):
+    return queue.submit(f"run_{name}", {'topic': name}, 'output', priority)
+
+
+def test_claim_follows_priority_then_age(queue):
+    submit(queue, 'a')
+    submit(queue, 'b', priority=10)
+    submit(queue, 'c')
+
+    assert [queue.claim('w')['topic'] for _ in range(3)] == ['b', 'a', 'c']
+    assert queue.claim('w') is None
+
+
+def test_concurrent_claims_take_each_job_once(tmp_path):
+    path = str(tmp_path / 'jobs.sqlite')
+    JobQueue(path)
+    for index in range(20):
+        submit(JobQueue(path), index)
+    claimed = []
+    lock = threading.Lock()
+
+    def worker(name):
+        queue = JobQueue(path)
+        while True:
+            job = queue.claim(name)
+            if job is None:
+                return
+            with lock:
+                claimed.append(job['id'])
+
+    threads = [threading.Thread(target=worker, args=(f"w{index}",)) for index in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(claimed) == list(range(1, 21))
+
+
+def test_cancel_queued_and_running_jobs(queue):
+    queued = submit(queue, 'queued')
+    running = submit(queue, 'running', priority=1)
+    assert queue.claim('w')['id'] == running['id']
+
+    assert queue.cancel(queued['id'])['status'] == 'cancelled'
+    assert queue.claim('w') is None
+
+    job = queue.cancel(running['id'])
+    assert job['status'] == 'running' and job['cancel_requested']
+    assert queue.is_cancel_requested(running['id'])
+    assert queue.cancel(999) is None
+
+
+def test_only_expired_leases_are_requeued(queue, clock):
+    first, second = submit(queue, 'a'), submit(queue, 'b')
+    queue.claim('daemon-1')
+    queue.claim('daemon-2')
+
+    # Un secondo daemon che si avvia non tocca i job ancora in esecuzione altrove
+    assert queue.requeue_expired() == 0
+
+    clock.now += 45
+    assert queue.heartbeat('daemon-1', [first['id'], second['id']]) == 1
+    clock.now += 30
+    assert queue.requeue_expired() == 1
+    assert queue.get(first['id'])['status'] == 'running'
+    requeued = queue.get(second['id'])
+    assert requeued['status'] == 'queued' and requeued['owner'] is None
+
+
+def test_finish_is_ignored_after_the_job_changed_owner(queue, clock):
+    job = submit(queue, 'a')
+    queue.claim('daemon-1')
+    clock.now += 61
+    queue.requeue_expired()
+    assert queue.claim('daemon-2')['id'] == job['id']
+
+    assert not queue.finish(job['id'], 'completed', {'files': {}}, owner='daemon-1')
+    assert queue.get(job['id'])['status'] == 'running'
+    assert queue.finish(job['id'], 'completed', {'files': {}}, owner='daemon-2')
+    assert queue.get(job['id'])['status'] == 'completed'
+
+
+def test_expired_job_with_cancel_request_is_cancelled(queue, clock):
+    job = submit(queue, 'a')
+    queue.claim('daemon-1')
+    queue.cancel(job['id'])
+    clock.now += 61
+
+    assert queue.requeue_expired() == 0
+    assert queue.get(job['id'])['status'] == 'cancelled'
+    assert queue.counts()['cancelled'] == 1
@@ -0,0 +1,85 @@
+"""Test del Knowledge Store per Blog Generator
+Topic quasi duplicati via MinHash/LSH, ricerca per testo, digest delle ricerche precedenti e scadenza
+"""
+
+import json
+
+import pytest
+
+import knowledge_store
+from knowledge_store import KnowledgeStore, MinHasher, topic_shingles
+
+RESEARCH = json.dumps({
+    'facts': ["Positano conta circa 4000 abitanti", {'fact': "Il Sentiero degli Dei parte da Bomerano",
+                                                    'url': "https://example.com/sentiero"}],
+    'sources': [{'title': "Guida Amalfi", 'url': "https://example.com/amalfi"}],
+    'keywords': {'primary': ["costiera amalfitana"]},
+    'market_insights': ["Domanda in crescita per maggio"]
+})
+
+
+class FakeClock:
+    def __init__(self, now: float = 1_000_000_000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(knowledge_store.time, 'time', fake.time)
+    return fake
+
+
+@pytest.fixture
+def store(tmp_path):
+    return KnowledgeStore(str(tmp_path / 'knowledge.sqlite'), max_age_days=30)
+
+
+def test_topic_shingles_ignore_stopwords_years_and_punctuation():
+    assert topic_shingles("Guida alla Costiera Amalfitana 2026!") == topic_shingles("costiera amalfitana")
+
+
+def test_minhash_similarity_tracks_topic_overlap():
+    hasher = MinHasher()
+    base = hasher.signature(topic_shingles("vacanze in costiera amalfitana"))
+    assert hasher.similarity(base, hasher.signature(topic_shingles("vacanze costiera amalfitana 2025"))) == 1.0
+    assert hasher.similarity(base, hasher.signature(topic_shingles("ricette di pasta fresca"))) < 0.3
+
+
+def test_similar_topics_finds_near_duplicates_only(store):
+    store.add_research("Vacanze in costiera amalfitana", RESEARCH, 'run_1')
+    store.add_research("Ricette di pasta fresca", RESEARCH, 'run_2')
+
+    matches = store.similar_topics("Guida alle vacanze in costiera amalfitana 2026")
+    assert [match['topic'] for match in matches] == ["Vacanze in costiera amalfitana"]
+
+
+def test_search_and_prior_research_return_stored_entries(store):
+    store.add_research("Vacanze in costiera amalfitana", RESEARCH, 'run_1')
+
+    assert store.search("Bomerano")[0]['url'] == "https://example.com/sentiero"
+    prior = store.prior_research("vacanze costiera amalfitana")
+    assert "Domanda in crescita per maggio" in prior['facts']
+    assert prior['sources'] == ["https://example.com/amalfi"]
+    assert prior['keywords'] == {'primary': ["costiera amalfitana"]}
+    assert store.prior_research("ricette di pasta fresca") is None
+
+
+def test_non_json_research_is_not_stored(store):
+    assert store.add_research("topic", "report in prosa") is None
+    assert store.search("report") == []
+
+
+def test_adding_research_prunes_expired_entries(store, clock):
+    store.add_research("Vacanze in costiera amalfitana", RESEARCH, 'run_1')
+    clock.now += 31 * 86400
+    store.add_research("Ricette di pasta fresca", RESEARCH, 'run_2')
+
+    with store._connect() as conn:
+        assert conn.execute("SELECT topic FROM research").fetchall() == [("Ricette di pasta fresca",)]
+        assert conn.execute("SELECT COUNT(DISTINCT research_id) FROM topic_bands").fetchone() == (1,)
+        assert conn.execute("SELECT COUNT(DISTINCT research_id) FROM knowledge").fetchone() == (1,)
+    assert store.prune() == 0
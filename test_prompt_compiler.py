@@ -0,0 +1,57 @@
+"""Test del Prompt Compiler per Blog Generator
+Prefisso statico identico tra articoli diversi, suffisso con i soli campi usati e report della prompt cache
+"""
+
+import os
+
+import pytest
+import yaml
+
+from input_manager import BlogInput
+from prompt_compiler import DYNAMIC_HEADER, CompiledPrompt, PromptCompiler, cached_token_report
+
+with open(os.path.join(os.path.dirname(__file__), 'prompts.yaml'), 'r', encoding='utf-8') as prompts_file:
+    PROMPTS = yaml.safe_load(prompts_file)
+
+FIRST = BlogInput(topic="Case vacanza ad Amalfi", target_audience="famiglie", word_count=1200).to_dict()
+SECOND = BlogInput(topic="Trekking in Val d'Aosta", tone="casual", intent="commerciale", word_count=2500).to_dict()
+
+
+def test_compiled_prompt_keeps_values_out_of_the_prefix():
+    prompt = CompiledPrompt('test', "Scrivi su {topic} in {language} (JSON: {{\"a\": 1}}). Ancora {topic}.")
+
+    assert prompt.fields == ['topic', 'language']
+    assert prompt.static == "Scrivi su [topic] in [language] (JSON: {\"a\": 1}). Ancora [topic]."
+    assert prompt.render({'topic': "Amalfi", 'language': "it", 'tone': "casual"}) == (
+        f"{prompt.static}\n\n{DYNAMIC_HEADER}\n- [topic]: Amalfi\n- [language]: it")
+    with pytest.raises(KeyError, match="language"):
+        prompt.dynamic({'topic': "Amalfi"})
+
+
+@pytest.mark.parametrize('name', [name for name in PROMPTS if name.endswith('_description')])
+def test_repository_prompts_share_the_prefix_across_articles(name):
+    compiler = PromptCompiler(PROMPTS)
+    static = compiler.compiled[name].static
+    # Campi non di BlogInput (sezioni, limiti SEO) uguali per entrambi gli articoli
+    shared = {field: f"<{field}>" for field in compiler.compiled[name].fields if field not in FIRST}
+    first, second = compiler.render(name, **FIRST, **shared), compiler.render(name, **SECOND, **shared)
+
+    assert first.startswith(static) and second.startswith(static)
+    for value in ("Amalfi", "Aosta", "famiglie"):
+        assert value not in static
+
+
+def test_split_layout_can_be_disabled():
+    compiler = PromptCompiler({'p': "Articolo su {topic}"}, split=False)
+    assert compiler.render('p', topic="Amalfi") == "Articolo su Amalfi"
+
+
+def test_cached_token_report():
+    report = cached_token_report({
+        'research': {'prompt_tokens': 1000, 'cached_prompt_tokens': 800},
+        'outline': {'prompt_tokens': 1000, 'cached_prompt_tokens': 0},
+        'faq': {}
+    })
+    assert report['research']['cached_ratio'] == 0.8
+    assert 'faq' not in report
+    assert report['total'] == {'prompt_tokens': 2000, 'cached_prompt_tokens': 800, 'cached_ratio': 0.4}
@@ -0,0 +1,178 @@
+"""Test del Rate Limiter per Blog Generator
+Concorrenza AIMD, Retry-After, classificazione degli errori e retry sulle singole richieste HTTP
+"""
+
+import json
+import time
+
+import pytest
+
+import rate_limiter
+from rate_limiter import AdaptiveLimiter, RateLimiterRegistry, is_retryable
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class APIError(Exception):
+    """Errore del provider con la risposta HTTP allegata, come quelli degli SDK"""
+
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.response = FakeResponse(status_code, headers)
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+    monkeypatch.setattr(rate_limiter.time, 'sleep', delays.append)
+    return delays
+
+
+def make_registry(max_attempts=3):
+    registry = RateLimiterRegistry()
+    registry.configure({
+        'retry': {'max_attempts': max_attempts, 'base_delay_seconds': 0.01, 'max_delay_seconds': 0.02},
+        'providers': {'openrouter': {'requests_per_second': 0, 'max_concurrency': 8,
+                                     'models': {'gpt-4o': {'requests_per_second': 0, 'max_concurrency': 2}}}}
+    })
+    return registry
+
+
+def test_aimd_halves_on_throttle_and_grows_additively():
+    limiter = AdaptiveLimiter('test', requests_per_second=0, max_concurrency=8, min_concurrency=1)
+    limiter.on_throttle()
+    assert limiter.limit == 4
+    limiter.on_success(latency=0.1)
+    assert limiter.limit == pytest.approx(4.25)
+    for _ in range(5):
+        limiter.on_throttle()
+    assert limiter.limit == 1
+    assert limiter.snapshot()['throttled'] == 6
+
+
+def test_latency_above_target_decreases_the_limit():
+    limiter = AdaptiveLimiter('test', requests_per_second=0, max_concurrency=8, latency_target_seconds=1.0)
+    limiter.on_success(latency=2.0)
+    assert limiter.limit == 4
+    limiter.on_success(latency=0.5)
+    assert limiter.limit > 4
+
+
+@pytest.mark.parametrize('error, expected', [
+    (APIError(429), True),
+    (APIError(503), True),
+    (APIError(408), True),
+    (APIError(401), False),
+    (APIError(400), False),
+    (TimeoutError(), True),
+    (ConnectionError(), True),
+    (KeyError('topic'), False),
+    (ValueError("output non valido"), False)
+])
+def test_is_retryable(error, expected):
+    assert is_retryable(error) is expected
+
+
+def test_retry_after_blocks_the_limiter_and_delays_the_retry(sleeps):
+    registry = make_registry()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) == 1:
+            raise APIError(429, {'retry-after': '0.2'})
+        return 'ok'
+
+    retries = []
+    started = time.monotonic()
+    assert registry.call('openrouter', fn, model='gpt-4o', on_retry=lambda e, attempt, delay: retries.append(delay)) == 'ok'
+    # Il secondo tentativo attende la pausa imposta dal provider anche senza il backoff
+    assert time.monotonic() - started >= 0.2
+    assert sleeps == [0.2] and retries == [0.2]
+    for name in ('openrouter', 'openrouter:gpt-4o'):
+        snapshot = registry.snapshot()[name]
+        assert snapshot['throttled'] == 1 and snapshot['retries'] == 1
+    assert registry.get('openrouter').blocked_until > 0
+
+
+def test_non_retryable_errors_are_not_retried(sleeps):
+    registry = make_registry()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        raise APIError(401)
+
+    with pytest.raises(APIError):
+        registry.call('openrouter', fn)
+    assert len(calls) == 1 and sleeps == []
+
+
+def test_retries_stop_after_max_attempts(sleeps):
+    registry = make_registry(max_attempts=3)
+    calls = []
+
+    def fn():
+        calls.append(1)
+        raise APIError(503)
+
+    with pytest.raises(APIError):
+        registry.call('openrouter', fn)
+    assert len(calls) == 3 and len(sleeps) == 2
+
+
+def test_retry_listener_receives_retries_of_the_current_context(sleeps):
+    registry = make_registry()
+    outcomes = iter([APIError(500), 'ok'])
+    seen = []
+
+    def fn():
+        outcome = next(outcomes)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    with registry.retry_listener(lambda error, attempt, delay: seen.append(attempt)):
+        registry.call('openrouter', fn)
+    assert seen == [1]
+
+
+def test_explicit_callback_replaces_the_listener(sleeps):
+    registry = make_registry()
+    outcomes = iter([APIError(500), 'ok'])
+    listener, explicit = [], []
+
+    def fn():
+        outcome = next(outcomes)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    # Ogni retry va contato una volta sola nelle metriche dello stage
+    with registry.retry_listener(lambda error, attempt, delay: listener.append(attempt)):
+        registry.call('openrouter', fn, on_retry=lambda error, attempt, delay: explicit.append(attempt))
+    assert explicit == [1] and listener == []
+
+
+def test_limited_transport_retries_single_requests(monkeypatch, sleeps):
+    httpx = pytest.importorskip('httpx')
+    import llm_pool
+    registry = make_registry(max_attempts=3)
+    monkeypatch.setattr(llm_pool, 'LIMITERS', registry)
+    statuses = iter([429, 200, 503, 503, 503])
+    models = []
+
+    def handler(request):
+        models.append(json.loads(request.content)['model'])
+        return httpx.Response(next(statuses), json={'model': models[-1]})
+
+    client = httpx.Client(transport=llm_pool.LimitedTransport(httpx.MockTransport(handler)))
+    assert client.post('https://openrouter.test/chat', json={'model': 'gpt-4o'}).status_code == 200
+    # Tentativi esauriti: il client riceve l'ultima risposta d'errore
+    assert client.post('https://openrouter.test/chat', json={'model': 'gpt-4o'}).status_code == 503
+    assert models == ['gpt-4o'] * 5
+    assert registry.snapshot()['openrouter:gpt-4o']['calls'] == 5
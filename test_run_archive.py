@@ -0,0 +1,82 @@
+"""Test del Run Archive per Blog Generator
+Archiviazione compressa e rilettura dei run, tentativi ripetuti, export e accesso in sola lettura
+"""
+
+import json
+import os
+import sqlite3
+
+import pytest
+
+from run_archive import RunArchive
+
+INPUT = {'topic': "Case vacanza ad Amalfi", 'word_count': 1200}
+STAGES = {'research': '{"facts": ["fatto"]}', 'drafting': "# Bozza\n\n" + "testo " * 500, 'faq': None}
+ARTICLE = "# Case vacanza ad Amalfi\n\n" + "Paragrafo dell'articolo. " * 200
+
+
+@pytest.fixture
+def archive(tmp_path):
+    return RunArchive(str(tmp_path / 'runs.sqlite'))
+
+
+def test_run_round_trip(archive):
+    archive.archive_run('run_1', INPUT['topic'], 'completed', INPUT, STAGES, ARTICLE,
+                        analytics={'execution_time_seconds': 12.5}, execution_time=12.5)
+
+    run = archive.get_run('run_1')
+    assert run['input'] == INPUT
+    assert run['stages'] == {'research': STAGES['research'], 'drafting': STAGES['drafting']}
+    assert run['article'] == ARTICLE
+    assert run['analytics'] == {'execution_time_seconds': 12.5}
+    assert run['status'] == 'completed' and run['execution_time'] == 12.5
+    assert archive.get_run('missing') is None
+
+
+def test_records_are_compressed(archive):
+    archive.archive_run('run_1', INPUT['topic'], 'completed', INPUT, STAGES, ARTICLE)
+    stats = archive.stats()
+    assert stats['runs'] == {'completed': 1}
+    assert stats['records'] == 4
+    assert stats['compressed_bytes'] < stats['raw_bytes'] / 5
+
+
+def test_retried_runs_keep_every_attempt(archive):
+    archive.archive_run('run_1', INPUT['topic'], 'failed', INPUT, {'research': "parziale"}, error="timeout")
+    archive.archive_run('run_1', INPUT['topic'], 'completed', INPUT, STAGES, ARTICLE)
+    archive.archive_run('run_2', "Trekking in Val d'Aosta", 'failed', INPUT, error="401")
+
+    assert [run['status'] for run in archive.list_runs(topic="Amalfi")] == ['completed', 'failed']
+    assert [run['run_id'] for run in archive.list_runs(status='failed')] == ['run_2', 'run_1']
+    assert archive.get_run('run_1')['status'] == 'completed'
+    article_only = archive.get_run('run_1', kinds=['article'])
+    assert article_only['article'] == ARTICLE and 'input' not in article_only and article_only['stages'] == {}
+    assert [run['run_id'] for run in archive.iter_runs(['run_2', 'missing', 'run_1'])] == ['run_2', 'run_1']
+
+
+def test_export_writes_article_and_json_files(archive, tmp_path):
+    archive.archive_run('run_1', INPUT['topic'], 'completed', INPUT, STAGES, ARTICLE)
+
+    files = archive.export_run('run_1', str(tmp_path / 'export'))
+
+    assert set(files) == {'article', 'input', 'stages'}
+    with open(files['article'], 'r', encoding='utf-8') as file:
+        assert file.read() == ARTICLE
+    with open(files['input'], 'r', encoding='utf-8') as file:
+        assert json.load(file) == INPUT
+    with pytest.raises(KeyError):
+        archive.export_run('missing', str(tmp_path / 'export'))
+
+
+def test_read_only_access_never_writes(archive, tmp_path):
+    archive.archive_run('run_1', INPUT['topic'], 'completed', INPUT, STAGES, ARTICLE)
+    reader = RunArchive(archive.path, read_only=True)
+
+    assert reader.get_run('run_1')['article'] == ARTICLE
+    with pytest.raises(sqlite3.OperationalError):
+        reader.archive_run('run_2', INPUT['topic'], 'completed', INPUT)
+
+    missing = str(tmp_path / 'missing.sqlite')
+    with pytest.raises(sqlite3.OperationalError):
+        RunArchive(missing, read_only=True).list_runs()
+    assert not os.path.exists(missing)
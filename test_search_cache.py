@@ -0,0 +1,110 @@
+"""Test della Search Cache per Blog Generator
+Cache, coalescing delle richieste concorrenti, TTL ed eviction LRU con il client Tavily simulato del benchmark
+"""
+
+import threading
+import time
+
+import pytest
+
+import search_cache
+from benchmark import StubTavilyClient, StubTimer
+from search_cache import SearchCache
+
+
+class FakeClock:
+    """Orologio controllato dal test (ogni lettura avanza di un istante per ordinare gli accessi)"""
+
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def time(self) -> float:
+        self.now += 0.001
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(search_cache.time, 'time', fake.time)
+    return fake
+
+
+@pytest.fixture
+def tavily():
+    return StubTavilyClient(StubTimer(), latency=0)
+
+
+def test_second_search_is_served_from_cache(tmp_path, tavily):
+    cache = SearchCache(str(tmp_path / 'cache.sqlite'))
+    run_stats = {}
+
+    def fetch():
+        return tavily.search("case vacanza amalfi", 3)['results']
+
+    first = cache.get_or_fetch("Case vacanza  Amalfi", 3, fetch, run_stats)
+    second = cache.get_or_fetch("case vacanza amalfi", 3, fetch, run_stats)
+
+    assert first == second
+    assert tavily.timer.calls['research'] == 1
+    assert run_stats == {'misses': 1, 'hits': 1}
+
+
+def test_concurrent_identical_searches_are_coalesced(tmp_path, tavily):
+    cache = SearchCache(str(tmp_path / 'cache.sqlite'))
+    followers = 7
+    results = []
+
+    def fetch():
+        # Il leader attende che tutti gli altri si siano accodati alla sua richiesta
+        deadline = time.monotonic() + 5
+        while cache.stats['coalesced'] < followers and time.monotonic() < deadline:
+            time.sleep(0.001)
+        return tavily.search("meteo positano", 2)['results']
+
+    def search():
+        results.append(cache.get_or_fetch("meteo positano", 2, fetch))
+
+    threads = [threading.Thread(target=search) for _ in range(followers + 1)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert tavily.timer.calls['research'] == 1
+    assert cache.stats == {'hits': 0, 'misses': 1, 'coalesced': followers}
+    assert all(result == results[0] for result in results)
+
+
+def test_failed_fetch_propagates_to_waiters_and_is_not_cached(tmp_path):
+    cache = SearchCache(str(tmp_path / 'cache.sqlite'))
+
+    def fetch():
+        raise ConnectionError("Tavily non raggiungibile")
+
+    with pytest.raises(ConnectionError):
+        cache.get_or_fetch("query", 5, fetch)
+    assert cache.get("query", 5) is None
+    assert cache.get_or_fetch("query", 5, lambda: ['ok']) == ['ok']
+
+
+def test_lru_eviction_keeps_recently_used_entries(tmp_path, clock):
+    cache = SearchCache(str(tmp_path / 'cache.sqlite'), max_entries=2)
+    cache.put("a", 5, ['a'])
+    cache.put("b", 5, ['b'])
+    assert cache.get("a", 5) == ['a']
+
+    cache.put("c", 5, ['c'])
+
+    assert cache.get("b", 5) is None
+    assert cache.get("a", 5) == ['a']
+    assert cache.get("c", 5) == ['c']
+
+
+def test_expired_entries_are_refetched(tmp_path, clock):
+    cache = SearchCache(str(tmp_path / 'cache.sqlite'), ttl_seconds=60)
+    cache.put("query", 5, ['vecchio'])
+    clock.now += 61
+
+    assert cache.get("query", 5) is None
+    assert cache.get_or_fetch("query", 5, lambda: ['nuovo']) == ['nuovo']
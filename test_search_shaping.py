@@ -0,0 +1,76 @@
+"""Test del Search Shaping per Blog Generator
+Campi ridotti, frasi più pertinenti entro il budget e deduplica di URL e frasi nello stesso run
+"""
+
+import json
+
+from context_compactor import estimate_tokens
+from search_shaping import ELLIPSIS, ResultShaper, normalize_url, query_terms
+
+CONTENT = ("Amalfi è una città della costiera. Il porto accoglie traghetti ogni giorno. "
+           "Le case vacanza ad Amalfi costano di più in agosto.   Il duomo risale al nono secolo.")
+
+
+def result(url, content=CONTENT, score=0.91234):
+    return {'title': "  Guida   ad Amalfi ", 'url': url, 'content': content, 'score': score,
+            'raw_content': "<html>pagina intera</html>", 'favicon': "https://example.com/favicon.ico"}
+
+
+def shape(shaper, query, results):
+    return json.loads(shaper.shape(query, results, json.dumps({'results': results})))
+
+
+def test_query_terms_and_normalize_url():
+    assert query_terms("Le case vacanza per Amalfi") == {'case', 'vacanza', 'amalfi'}
+    assert normalize_url("HTTPS://Example.com/Guida/#prezzi") == "https://example.com/Guida"
+
+
+def test_results_keep_only_useful_fields_in_compact_form():
+    shaped = shape(ResultShaper(max_tokens_per_result=200), "case vacanza amalfi", [result("https://example.com/a")])
+
+    item = shaped['results'][0]
+    assert set(item) == {'title', 'url', 'content', 'score'}
+    assert item['title'] == "Guida ad Amalfi" and item['score'] == 0.91
+    assert "  " not in item['content']
+
+
+def test_budget_keeps_the_most_relevant_sentences_in_original_order():
+    # Budget esatto per le due frasi con termini della query, con tiktoken o con la stima per caratteri
+    budget = estimate_tokens("Amalfi è una città della costiera.") + estimate_tokens(
+        "Le case vacanza ad Amalfi costano di più in agosto.")
+    shaper = ResultShaper(max_tokens_per_result=budget)
+    content = shape(shaper, "case vacanza amalfi agosto", [result("https://example.com/a")])['results'][0]['content']
+
+    assert content.startswith("Amalfi è una città")
+    assert "Le case vacanza ad Amalfi costano di più in agosto." in content
+    assert "duomo" not in content
+    assert shaper.stats['truncated'] == 1
+
+
+def test_single_long_sentence_is_cut_to_the_budget():
+    shaper = ResultShaper(max_tokens_per_result=10)
+    content = shape(shaper, "amalfi", [result("https://example.com/a", content="Amalfi " * 200)])['results'][0]['content']
+    assert content.endswith(ELLIPSIS) and len(content) < 100
+
+
+def test_repeated_urls_and_sentences_are_omitted_within_a_run():
+    shaper = ResultShaper(max_tokens_per_result=200)
+    shape(shaper, "amalfi", [result("https://example.com/a")])
+    shaped = shape(shaper, "amalfi", [result("https://EXAMPLE.com/a/"), result("https://example.com/b"),
+                                      result("https://example.com/c", content=CONTENT + " Nuova frase su Positano.")])
+
+    assert [item['url'] for item in shaped['results']] == ["https://example.com/c"]
+    assert shaped['results'][0]['content'] == "Nuova frase su Positano."
+    assert "2 risultati" in shaped['omitted']
+    report = shaper.report()
+    assert report['duplicate_urls'] == 1 and report['results_out'] == 2
+    assert 0 < report['reduction'] < 1
+
+
+def test_low_scores_are_dropped_and_dedupe_can_be_disabled():
+    shaper = ResultShaper(dedupe=False, min_score=0.5)
+    results = [result("https://example.com/a"), result("https://example.com/a"), result("https://example.com/b", score=0.2)]
+    shaped = shape(shaper, "amalfi", results)
+
+    assert len(shaped['results']) == 2
+    assert shaper.stats['low_score'] == 1
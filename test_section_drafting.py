@@ -0,0 +1,76 @@
+"""Test del Section Drafting per Blog Generator
+Estrazione delle sezioni da outline YAML o Markdown e ricomposizione dell'articolo
+"""
+
+from section_drafting import assemble_article, boundary_excerpts, load_outline, parse_outline_sections
+
+YAML_OUTLINE = """Ecco l'outline richiesto:
+
+```yaml
+outline:
+  h1: "Case vacanza ad Amalfi: guida 2026"
+  meta_description: "Come scegliere una casa vacanza"
+  introduzione: "Perché Amalfi"
+  sezioni:
+    - h2: "Quartieri migliori"
+      parole: 400
+    - h2: "Prezzi per stagione"
+      parole: 300
+  conclusione:
+    cta: "Prenota ora"
+  keywords: ["amalfi"]
+```
+"""
+
+MARKDOWN_OUTLINE = """# Case vacanza ad Amalfi
+
+## Quartieri migliori
+- centro storico
+
+## Prezzi per stagione
+- alta stagione
+"""
+
+
+def test_load_outline_reads_fenced_yaml():
+    assert load_outline(YAML_OUTLINE)['outline']['h1'].startswith("Case vacanza")
+    assert load_outline("chiave: [non chiusa") is None
+
+
+def test_yaml_outline_skips_metadata_and_keeps_section_order():
+    title, sections = parse_outline_sections(YAML_OUTLINE)
+
+    assert title == "Case vacanza ad Amalfi: guida 2026"
+    assert [section['title'] for section in sections] == [
+        "Introduzione", "Quartieri migliori", "Prezzi per stagione", "Conclusione"]
+    assert "parole: 400" in sections[1]['spec']
+
+
+def test_yaml_list_outline_numbers_untitled_sections():
+    title, sections = parse_outline_sections("- h2: Quartieri\n- punti: [prezzi]\n")
+    assert title is None
+    assert [section['title'] for section in sections] == ["Quartieri", "Sezione 2"]
+
+
+def test_markdown_outline_falls_back_to_headings():
+    title, sections = parse_outline_sections(MARKDOWN_OUTLINE)
+
+    assert title == "Case vacanza ad Amalfi"
+    assert [section['title'] for section in sections] == ["Quartieri migliori", "Prezzi per stagione"]
+    assert sections[0]['spec'] == "## Quartieri migliori\n- centro storico"
+
+
+def test_assemble_article_adds_title_and_transitions():
+    article = assemble_article("Titolo", ["## Uno\ntesto", "## Due\ntesto"], ["Passiamo ora al secondo punto."])
+    assert article == "# Titolo\n\n## Uno\ntesto\n\nPassiamo ora al secondo punto.\n\n## Due\ntesto\n"
+    assert assemble_article("Titolo", ["# Già titolato", "## Due"], [""]).startswith("# Già titolato\n\n## Due")
+
+
+def test_boundary_excerpts_take_the_edges_of_adjacent_sections():
+    assert boundary_excerpts("  inizio fine  ", "  primo secondo  ", max_chars=5) == (" fine", "primo")
+
+
+def test_yaml_comments_are_not_taken_for_headings():
+    title, sections = parse_outline_sections("# outline generato\n- h2: Quartieri\n- h2: Prezzi\n")
+    assert title is None
+    assert [section['title'] for section in sections] == ["Quartieri", "Prezzi"]
@@ -0,0 +1,99 @@
+"""Test del SEO Analyzer per Blog Generator
+Metriche locali (Gulpease, densità keyword, link, titoli, meta) e gate dell'ottimizzazione LLM
+"""
+
+import pytest
+
+from blog_generator import RunContext
+from input_manager import BlogInput
+from seo_analyzer import SEOAnalyzer, count_sentences, format_report_diff, gulpease_index, plain_text, tokenize
+from stage_validators import DRAFT_NOTES_MARKER
+
+ARTICLE = """---
+title: "Case vacanza ad Amalfi"
+---
+# Case vacanza ad Amalfi
+
+Le case vacanza ad Amalfi sono comode. Scegli una casa vicino al mare.
+
+## Dove dormire
+
+Leggi la [guida](/guida) e il [sito del comune](https://www.comune.amalfi.sa.it/turismo).
+
+#### Dettagli
+
+Visita https://example.com per le offerte.
+"""
+
+SEO_CONFIG = {'keyword_density': {}, 'readability_target': None, 'internal_links_min': None,
+              'external_links_min': None, 'meta_title_max': 60, 'word_count_tolerance': 0.2}
+
+
+def test_plain_text_strips_markdown_syntax():
+    text = plain_text("## Titolo\n\n- voce con **grassetto** e [link](https://example.com)\n")
+    assert tokenize(text) == ['titolo', 'voce', 'con', 'grassetto', 'e', 'link']
+    assert count_sentences("Una frase. Due frasi!\nTitolo senza punto") == 3
+
+
+def test_gulpease_index_formula():
+    words = ['precipitazioni', 'abbondanti', 'nella', 'stagione']
+    assert gulpease_index(words, 1) == pytest.approx(89 + (300 - 10 * 37) / 4)
+    assert gulpease_index([], 0) == 0.0
+
+
+def test_analyze_reports_keywords_links_headings_and_meta():
+    analyzer = SEOAnalyzer(SEO_CONFIG, primary_keywords=["case vacanza"], target_website="https://amalfi.example.com")
+    metrics = analyzer.analyze(ARTICLE)['metrics']
+
+    words = metrics['word_count']
+    assert metrics['keyword_density']['primary'] == round(100 * 2 * 2 / words, 2)
+    assert metrics['links'] == {'internal': 1, 'external': 2}
+    assert metrics['headings'] == {'h1': 1, 'h2': 1, 'h3_plus': 1, 'skipped_levels': 1}
+    assert metrics['meta']['title_source'] == 'meta'
+
+
+def test_failed_checks_are_summarized_for_the_optimization_prompt():
+    report = SEOAnalyzer(SEO_CONFIG).analyze(ARTICLE)
+    failed = {check['name'] for check in report['checks'] if not check['passed']}
+
+    assert not report['passed']
+    assert failed == {'headings.h2', 'headings.skipped_levels'}
+    diff = format_report_diff(report)
+    assert "- headings.h2: 1 (target >= 2)" in diff
+    assert "meta.description_length: assente" in diff
+
+
+def test_analyze_many_matches_single_analysis():
+    analyzer = SEOAnalyzer(SEO_CONFIG, primary_keywords=["amalfi"], secondary_keywords=["casa", "mare"])
+    other = ARTICLE.replace("Amalfi", "Positano")
+    assert analyzer.analyze_many([ARTICLE, other, ARTICLE]) == [
+        analyzer.analyze(ARTICLE), analyzer.analyze(other), analyzer.analyze(ARTICLE)]
+
+
+def compliant_draft():
+    article = ("# Case vacanza ad Amalfi\n\n## Dove dormire\n\nLa casa è vicina al mare.\n\n## Quando partire\n\n"
+               + "Maggio è il mese ideale per il mare. " * 8).rstrip()
+    return article, len(tokenize(plain_text(article)))
+
+
+def test_gate_skips_optimization_for_a_compliant_draft(make_generator):
+    generator = make_generator(seo_config=SEO_CONFIG, seo_analysis={'enabled': True, 'mode': 'gate'})
+    generator.execute_stage_with_retries = lambda *args: pytest.fail("ottimizzazione LLM non attesa")
+    article, words = compliant_draft()
+    run_context = RunContext(run_id='run')
+    outputs = {'drafting': f"{article}\n\n{DRAFT_NOTES_MARKER}\nParole: {words}"}
+
+    result = generator.run_stage('optimization', BlogInput(topic="Case vacanza ad Amalfi", word_count=words),
+                                 outputs, run_context)
+
+    assert result == article
+    assert run_context.seo_analysis['draft']['passed']
+
+
+@pytest.mark.parametrize('enabled', [True, False])
+def test_seo_diff_reaches_the_prompt_only_when_enabled(make_generator, enabled):
+    generator = make_generator(seo_config=SEO_CONFIG, seo_analysis={'enabled': enabled, 'mode': 'diff'})
+    article, words = compliant_draft()
+    description = generator.stage_description('optimization', BlogInput(topic="Amalfi", word_count=words),
+                                              {'drafting': article})
+    assert ("ANALISI SEO LOCALE DELLA BOZZA" in description) is enabled
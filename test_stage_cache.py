@@ -0,0 +1,78 @@
+"""Test della Stage Cache per Blog Generator
+Chiavi content-addressed per campo di input, lettura e scrittura delle voci e riuso tra esecuzioni
+"""
+
+import json
+
+import pytest
+
+from blog_generator import RunContext
+from input_manager import BlogInput
+from stage_cache import StageCache, template_fields
+
+TEMPLATE = "Ricerca su {topic} per {target_audience}"
+INPUT = {'topic': "Case vacanza ad Amalfi", 'target_audience': "famiglie", 'word_count': 1200}
+RESEARCH = json.dumps({'facts': ["fatto"], 'sources': ["https://example.com"], 'keywords': {'primary': ["amalfi"]}})
+
+
+def key(**changes):
+    values = {'stage': 'research', 'model': 'gpt-4o-mini', 'template': TEMPLATE,
+              'input_dict': INPUT, 'upstream_keys': []}
+    values.update(changes)
+    return StageCache.make_key(**values)
+
+
+def test_template_fields():
+    assert template_fields("{topic} e {keywords[0]} per {seo.title}") == ['keywords', 'seo', 'topic']
+
+
+def test_key_depends_only_on_fields_used_by_the_template():
+    assert key(input_dict={**INPUT, 'word_count': 2000}) == key()
+    assert key(input_dict={**INPUT, 'topic': "Trekking in Val d'Aosta"}) != key()
+
+
+@pytest.mark.parametrize('change', [
+    {'model': 'gpt-4o'},
+    {'template': TEMPLATE + " in italiano"},
+    {'upstream_keys': ['abc']},
+    {'extra': {'options': {'mode': 'sections'}}}
+])
+def test_key_changes_with_model_prompt_upstream_and_options(change):
+    assert key(**change) != key()
+
+
+def test_put_and_get_round_trip(tmp_path):
+    cache = StageCache(str(tmp_path))
+    assert cache.get(key()) is None
+    cache.put(key(), 'research', RESEARCH)
+    assert cache.get(key()) == RESEARCH
+
+
+def test_unreadable_entry_is_a_miss(tmp_path):
+    cache = StageCache(str(tmp_path))
+    cache.put(key(), 'research', RESEARCH)
+    with open(cache._path(key()), 'w', encoding='utf-8') as file:
+        file.write("{troncato")
+    assert cache.get(key()) is None
+
+
+def stub_run_stage(generator, output):
+    """Sostituisce l'esecuzione degli stage con un output prefissato e restituisce le chiamate"""
+    calls = []
+    generator.run_stage = lambda stage, *args: calls.append(stage) or output
+    return calls
+
+
+@pytest.mark.parametrize('output, cached', [(RESEARCH, True), ("Report in prosa senza JSON", False)])
+def test_only_valid_outputs_are_cached(make_generator, output, cached):
+    generator = make_generator()
+    calls = stub_run_stage(generator, output)
+    blog_input = BlogInput(**INPUT)
+
+    generator.execute_pipeline_stage('research', blog_input, RunContext(run_id='run_1'))
+    second = RunContext(run_id='run_2')
+    generator.execute_pipeline_stage('research', blog_input, second)
+
+    assert len(calls) == (1 if cached else 2)
+    assert second.reused_stages == (['research'] if cached else [])
+    assert second.outputs['research'] == output
@@ -0,0 +1,126 @@
+"""Test degli Stage Validators per Blog Generator
+Controlli deterministici sugli output, riparazione del formato, retry degli stage ed escalation della cascata
+"""
+
+import json
+
+import pytest
+
+from blog_generator import RunContext
+from input_manager import BlogInput
+from stage_validators import (DRAFT_NOTES_MARKER, StageValidationError, parse_stage_output, strip_draft_notes,
+                              validate_stage_output)
+
+RESEARCH = json.dumps({'facts': ["fatto"], 'sources': ["https://example.com"], 'keywords': {'primary': ["amalfi"]}})
+OUTLINE = "h1: Titolo\nintroduzione: testo\nsezioni:\n  - h2: Uno\n  - h2: Due\nconclusione: fine\n"
+SETTINGS = {'min_outline_sections': 3, 'word_count_min_ratio': 0.7, 'word_count_max_ratio': 1.6}
+
+
+class APIError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+@pytest.mark.parametrize('stage, output, errors', [
+    ('research', RESEARCH, []),
+    ('research', "report in prosa", ["output non in formato JSON"]),
+    ('research', '{"facts": [], "sources": ["s"], "keywords": ["k"]}', ["chiavi JSON mancanti o vuote: facts"]),
+    ('research', '{"facts": "uno", "sources": ["s"], "keywords": ["k"]}', ["chiave 'facts' di tipo str non valido"]),
+    ('outline', OUTLINE, []),
+    ('outline', "h1: Titolo\nsezioni:\n  - h2: Uno\n", ["outline con 1 sezioni (minimo 3)"]),
+    ('drafting', "parola " * 100, []),
+    ('drafting', "parola " * 50, ["50 parole, attese 70-160"]),
+    ('meta_tags', "   ", ["output vuoto"])
+])
+def test_validate_stage_output(stage, output, errors):
+    assert validate_stage_output(stage, output, 100, SETTINGS) == errors
+
+
+def test_draft_notes_are_excluded_from_word_count_and_results():
+    draft = "parola " * 100 + f"\n{DRAFT_NOTES_MARKER}\n" + "nota " * 200
+    assert strip_draft_notes(draft) == ("parola " * 100).rstrip()
+    assert validate_stage_output('drafting', draft, 100, SETTINGS) == []
+    assert parse_stage_output('drafting', draft)['word_count'] == 100
+
+
+def test_parse_stage_output_returns_typed_results():
+    assert parse_stage_output('research', f"```json\n{RESEARCH}\n```")['facts'] == ["fatto"]
+    outline = parse_stage_output('outline', OUTLINE)
+    assert outline['title'] == "Titolo"
+    assert [section['title'] for section in outline['sections']] == ["Introduzione", "Uno", "Due", "Conclusione"]
+
+
+def stub_execution(generator, outputs):
+    """Restituisce (o solleva) in ordine gli esiti dell'esecuzione degli stage, registrando i modelli usati"""
+    models = []
+    outcomes = iter(outputs)
+
+    def execute_stage(stage, model_name, *args):
+        models.append(model_name)
+        outcome = next(outcomes)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    generator.execute_stage = execute_stage
+    return models
+
+
+@pytest.fixture
+def generator(make_generator):
+    return make_generator(models={'research': ['economico', 'avanzato']},
+                          validation={'max_stage_attempts': 2, 'max_repairs': 1})
+
+
+def run_research(generator):
+    run_context = RunContext(run_id='run')
+    output = generator.run_stage('research', BlogInput(topic="Amalfi"), {}, run_context)
+    return output, run_context.cascade['research']
+
+
+def test_invalid_format_is_repaired_before_escalating(generator):
+    models = stub_execution(generator, ["report in prosa"])
+    generator.run_prompt = lambda *args: RESEARCH
+
+    output, cascade = run_research(generator)
+
+    assert output == RESEARCH
+    assert models == ['economico']
+    assert cascade['repairs'] == 1 and cascade['escalations'] == 0
+
+
+def test_unrepairable_output_escalates_to_the_next_model(generator):
+    models = stub_execution(generator, ["report in prosa", RESEARCH])
+    generator.run_prompt = lambda *args: "ancora in prosa"
+
+    output, cascade = run_research(generator)
+
+    assert output == RESEARCH
+    assert models == ['economico', 'avanzato']
+    assert cascade['escalations'] == 1 and cascade['final_model'] == 'avanzato'
+
+
+def test_invalid_output_of_the_last_model_fails_the_stage(generator):
+    stub_execution(generator, ["prosa", "prosa"])
+    generator.run_prompt = lambda *args: "prosa"
+
+    with pytest.raises(StageValidationError, match="research"):
+        run_research(generator)
+
+
+def test_transient_errors_retry_the_stage_then_escalate(generator):
+    models = stub_execution(generator, [TimeoutError(), TimeoutError(), RESEARCH])
+
+    output, cascade = run_research(generator)
+
+    assert output == RESEARCH
+    assert models == ['economico', 'economico', 'avanzato']
+
+
+def test_rejected_requests_are_neither_retried_nor_escalated(generator):
+    models = stub_execution(generator, [APIError(401), RESEARCH])
+
+    with pytest.raises(APIError):
+        run_research(generator)
+    assert models == ['economico']
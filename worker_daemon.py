@@ -0,0 +1,323 @@
+"""Worker Daemon per Blog Generator
+Processo residente con generatore e client già inizializzati che esegue i job di una coda SQLite
+ricevuti tramite API HTTP locale
+"""
+
+import argparse
+import hmac
+import importlib
+import json
+import os
+import socket
+import threading
+import time
+import logging
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from blog_generator import STAGES, STREAMABLE_STAGES, BlogGeneratorEnhanced, RunCancelled, setup_logging
+from checkpoint import new_run_id
+from input_manager import BlogInput
+from job_queue import JOB_STATUSES, JobQueue
+from metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+# Moduli pesanti importati all'avvio, così il primo job non ne paga il costo
+WARM_MODULES = ('crewai', 'langchain_openai', 'langchain_core.messages', 'tavily')
+
+
+class WorkerDaemon:
+    """Pool di worker che condividono un generatore caldo e prelevano job dalla coda"""
+
+    def __init__(self, generator: BlogGeneratorEnhanced, queue: JobQueue, workers: int = 4,
+                 poll_interval: float = 2.0, output_dir: str = "output"):
+        self.generator = generator
+        self.queue = queue
+        self.workers = max(1, workers)
+        self.poll_interval = poll_interval
+        self.output_dir = output_dir
+        # Identifica i job presi in carico da questo processo tra più daemon sulla stessa coda
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._active: Set[int] = set()
+        self._active_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def warm_up(self) -> None:
+        """Importa i moduli pesanti e crea i client prima del primo job"""
+        start = time.monotonic()
+        for name in WARM_MODULES:
+            try:
+                importlib.import_module(name)
+            except ImportError as e:
+                logger.warning(f"Modulo {name} non disponibile per il warm-up: {e}")
+        try:
+            self.generator.tavily_client
+        except ValueError as e:
+            logger.warning(f"Client Tavily non inizializzato: {e}")
+        self.warm_up_llms()
+        logger.info(f"Warm-up completato in {time.monotonic() - start:.2f} secondi")
+
+    def warm_up_llms(self) -> None:
+        """Crea il pool HTTP e i client LLM di tutti i modelli delle cascade configurate"""
+        input_manager = self.generator.input_manager
+        streaming_config = input_manager.get_streaming_config()
+        streamed = streaming_config.get('stages', STREAMABLE_STAGES) if streaming_config.get('enabled', False) else []
+        models: Dict[str, bool] = {}
+        for stage in STAGES + self.generator.side_stages():
+            for model in input_manager.get_model_cascade(stage):
+                models[model] = models.get(model, False) or stage in streamed
+        try:
+            for model, streaming in models.items():
+                self.generator.create_llm(model)
+                if streaming:
+                    self.generator.create_chat_model(model)
+        except (ImportError, ValueError) as e:
+            logger.warning(f"Client LLM non inizializzati: {e}")
+            return
+        logger.info(f"Client LLM pronti per {len(models)} modelli")
+
+    def submit(self, input_dict: Dict[str, Any], priority: int = 0) -> Dict[str, Any]:
+        """Valida l'input, accoda il job e sveglia un worker (i file vanno sempre nella directory configurata)"""
+        blog_input = BlogInput(**input_dict)
+        if not blog_input.validate():
+            raise ValueError("Input non valido: topic obbligatorio")
+        job = self.queue.submit(new_run_id(), blog_input.to_dict(), self.output_dir, priority)
+        self._wakeup.set()
+        return job
+
+    def start(self) -> None:
+        """Avvia i worker e il thread che rinnova i lease e recupera i job dei daemon terminati"""
+        targets = [(self._worker_loop, f"blog-worker-{index}") for index in range(self.workers)]
+        targets.append((self._lease_loop, "blog-lease"))
+        for target, name in targets:
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Avviati {self.workers} worker ({self.owner})")
+
+    def stop(self) -> None:
+        """Ferma il prelievo di nuovi job; quelli in corso verranno ripresi alla scadenza del lease"""
+        self._stop.set()
+        self._wakeup.set()
+
+    def _lease_loop(self) -> None:
+        """Rinnova i lease dei propri job e rimette in coda quelli con lease scaduto"""
+        while True:
+            try:
+                with self._active_lock:
+                    active = list(self._active)
+                self.queue.heartbeat(self.owner, active)
+                requeued = self.queue.requeue_expired()
+                if requeued:
+                    logger.info(f"{requeued} job interrotti rimessi in coda (ripresi dai checkpoint)")
+                    self._wakeup.set()
+            except Exception as e:
+                logger.error(f"Errore nel rinnovo dei lease: {e}")
+            if self._stop.wait(self.queue.lease_seconds / 3):
+                return
+
+    def _worker_loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                job = self.queue.claim(self.owner)
+            except Exception as e:
+                logger.error(f"Errore nel prelievo dalla coda: {e}")
+                job = None
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            with self._active_lock:
+                self._active.add(job['id'])
+            try:
+                self._process(job)
+            finally:
+                with self._active_lock:
+                    self._active.discard(job['id'])
+
+    def _process(self, job: Dict[str, Any]) -> None:
+        """Esegue un job e ne registra l'esito nella coda"""
+        job_id = job['id']
+        logger.info(f"Job {job_id} avviato (run {job['run_id']}): {job['topic']}")
+        try:
+            blog_input = BlogInput(**job['input'])
+            result_data = self.generator.run(blog_input, run_id=job['run_id'],
+                                             should_cancel=lambda: self.queue.is_cancel_requested(job_id))
+            files = self.generator.save_outputs(result_data, blog_input, job['output_dir'], job['run_id'])
+            self.queue.finish(job_id, 'completed', {'files': files, 'execution_time': result_data['execution_time']},
+                              owner=self.owner)
+            logger.info(f"Job {job_id} completato in {result_data['execution_time']:.2f} secondi")
+        except RunCancelled as e:
+            self.queue.finish(job_id, 'cancelled', error=str(e), owner=self.owner)
+            logger.info(f"Job {job_id} annullato")
+        except Exception as e:
+            self.queue.finish(job_id, 'failed', error=str(e), owner=self.owner)
+            logger.error(f"Job {job_id} fallito: {e}")
+
+
+def create_handler(daemon: WorkerDaemon, max_body_bytes: int = 1 << 20, auth_token: str = "") -> type:
+    """Crea l'handler HTTP dell'API dei job legato al daemon"""
+
+    class JobAPIHandler(BaseHTTPRequestHandler):
+        """API JSON: POST /jobs, GET /jobs, GET /jobs/<id>, POST /jobs/<id>/cancel, GET /health, GET /metrics
+
+        Con auth_token ogni endpoint tranne /health richiede "Authorization: Bearer <token>"; i POST
+        richiedono Content-Type application/json, che un form di una pagina web non può inviare senza preflight.
+        """
+
+        def log_message(self, format: str, *args: Any) -> None:
+            logger.debug(f"{self.address_string()} - {format % args}")
+
+        def _send(self, status: int, payload: Any, content_type: str = 'application/json') -> None:
+            body = payload if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False, default=str)
+            encoded = body.encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', f"{content_type}; charset=utf-8")
+            self.send_header('Content-Length', str(len(encoded)))
+            self.end_headers()
+            self.wfile.write(encoded)
+
+        def _route(self) -> Tuple[List[str], Dict[str, List[str]]]:
+            url = urlparse(self.path)
+            return [part for part in url.path.split('/') if part], parse_qs(url.query)
+
+        def _authorized(self) -> bool:
+            if not auth_token:
+                return True
+            header = self.headers.get('Authorization') or ''
+            if hmac.compare_digest(header.encode('utf-8'), f"Bearer {auth_token}".encode('utf-8')):
+                return True
+            self._send(401, {'error': "Token mancante o non valido"})
+            return False
+
+        def _json_request(self) -> bool:
+            content_type = (self.headers.get('Content-Type') or '').split(';')[0].strip().lower()
+            if content_type == 'application/json':
+                return True
+            self._send(415, {'error': "Content-Type deve essere application/json"})
+            return False
+
+        def _job_id(self, value: str) -> Optional[int]:
+            try:
+                return int(value)
+            except ValueError:
+                self._send(404, {'error': f"Job {value} non trovato"})
+                return None
+
+        def do_GET(self) -> None:
+            parts, query = self._route()
+            if parts == ['health']:
+                self._send(200, {'status': 'ok', 'workers': daemon.workers, 'jobs': daemon.queue.counts()})
+            elif not self._authorized():
+                return
+            elif parts == ['metrics']:
+                self._send(200, METRICS.render_prometheus(), 'text/plain; version=0.0.4')
+            elif parts == ['jobs']:
+                status = query.get('status', [None])[0]
+                if status is not None and status not in JOB_STATUSES:
+                    self._send(400, {'error': f"Stato non valido: {status}"})
+                    return
+                try:
+                    limit = int(query.get('limit', ['100'])[0])
+                except ValueError:
+                    self._send(400, {'error': "limit deve essere un intero"})
+                    return
+                self._send(200, daemon.queue.list(status, limit))
+            elif len(parts) == 2 and parts[0] == 'jobs':
+                job_id = self._job_id(parts[1])
+                if job_id is None:
+                    return
+                job = daemon.queue.get(job_id)
+                self._send(200 if job else 404, job or {'error': f"Job {job_id} non trovato"})
+            else:
+                self._send(404, {'error': "Endpoint non trovato"})
+
+        def do_POST(self) -> None:
+            parts, _ = self._route()
+            if not self._authorized() or not self._json_request():
+                return
+            if len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'cancel':
+                job_id = self._job_id(parts[1])
+                if job_id is None:
+                    return
+                job = daemon.queue.cancel(job_id)
+                self._send(200 if job else 404, job or {'error': f"Job {job_id} non trovato"})
+                return
+            if parts != ['jobs']:
+                self._send(404, {'error': "Endpoint non trovato"})
+                return
+
+            try:
+                length = int(self.headers.get('Content-Length') or 0)
+            except ValueError:
+                length = -1
+            # Una lunghezza negativa farebbe leggere fino alla chiusura della connessione
+            if length < 0:
+                self._send(400, {'error': "Content-Length non valido"})
+                return
+            if length > max_body_bytes:
+                self._send(413, {'error': f"Richiesta oltre {max_body_bytes} byte"})
+                return
+            try:
+                body = json.loads(self.rfile.read(length) or b'{}')
+                if not isinstance(body, dict) or not isinstance(body.get('input'), dict):
+                    raise ValueError("Il corpo deve contenere l'oggetto 'input' con i campi di BlogInput")
+                job = daemon.submit(body['input'], int(body.get('priority', 0)))
+            except (ValueError, TypeError) as e:
+                self._send(400, {'error': str(e)})
+                return
+            self._send(202, job)
+
+    return JobAPIHandler
+
+
+def setup_argument_parser() -> argparse.ArgumentParser:
+    """Configura il parser degli argomenti del daemon"""
+    parser = argparse.ArgumentParser(description="Worker residente del Blog Generator con coda dei job e API HTTP locale")
+    parser.add_argument("--config", type=str, default="config.yaml", help="File di configurazione")
+    parser.add_argument("--prompts", type=str, default="prompts.yaml", help="File dei prompt")
+    parser.add_argument("--host", type=str, help="Indirizzo di ascolto (default da config.yaml)")
+    parser.add_argument("--port", type=int, help="Porta di ascolto (default da config.yaml)")
+    parser.add_argument("--workers", type=int, help="Job eseguiti in parallelo (default da config.yaml)")
+    parser.add_argument("--output-dir", type=str, help="Directory di output predefinita dei job")
+    return parser
+
+
+def main():
+    """Funzione principale"""
+    args = setup_argument_parser().parse_args()
+    setup_logging('worker_daemon.log')
+
+    generator = BlogGeneratorEnhanced(config_path=args.config, prompts_path=args.prompts)
+    daemon_config = generator.input_manager.get_daemon_config()
+    daemon = WorkerDaemon(
+        generator,
+        JobQueue(daemon_config.get('queue_path', '.queue/jobs.sqlite'), daemon_config.get('lease_seconds', 60)),
+        workers=args.workers or daemon_config.get('workers', 4),
+        poll_interval=daemon_config.get('poll_interval_seconds', 2.0),
+        output_dir=args.output_dir or daemon_config.get('output_dir', 'output')
+    )
+    daemon.warm_up()
+    daemon.start()
+
+    host = args.host or daemon_config.get('host', '127.0.0.1')
+    port = args.port or daemon_config.get('port', 8765)
+    handler = create_handler(daemon, daemon_config.get('max_body_bytes', 1 << 20),
+                             os.getenv('BLOG_DAEMON_TOKEN') or daemon_config.get('auth_token', ''))
+    server = ThreadingHTTPServer((host, port), handler)
+    logger.info(f"API dei job in ascolto su http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Arresto del daemon richiesto dall'utente")
+    finally:
+        daemon.stop()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()